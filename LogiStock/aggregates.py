@@ -0,0 +1,215 @@
+import heapq
+import threading
+from contextlib import nullcontext
+from locks import all_product_locks
+
+DEFAULT_LOW_STOCK_THRESHOLD = 10
+
+
+class StockSummary:
+    """
+    Totals of a whole inventory.
+
+    Attributes:
+        products (int): Number of products.
+        units (int): Units in stock.
+        value (float): Sum of price * quantity.
+        base_value (float): Sum of base_price * quantity.
+    """
+
+    def __init__(self, products: int, units: int, value: float, base_value: float):
+        self.products = products
+        self.units = units
+        self.value = value
+        self.base_value = base_value
+
+    def __str__(self):
+        return (f"{self.products} products, {self.units} units. "
+                f"Stock value: ${self.value:.2f} (at base price: ${self.base_value:.2f})")
+
+
+class InventoryAggregates:
+    """
+    Running totals of an Inventory, updated on every change instead of looping over the products.
+
+    Inventory calls add/remove when products come and go and changed() from its product listener,
+    so each quantity or price change costs O(1) for the totals and the low stock set, plus O(log n)
+    for the stock heap. The totals are float sums updated by differences, so after millions of
+    changes they may drift by rounding; rebuild() recomputes everything from the products.
+    rebuild() and set_low_stock_threshold() read every product, holding source_lock (the lock under
+    which the inventory adds and removes products) and every stripe lock, so no product comes, goes or
+    changes its stock meanwhile.
+
+    Attributes:
+        products (int), units (int), value (float), base_value (float):
+            Same meaning as in StockSummary, always current.
+        low_stock_threshold (int):
+            Products with fewer units than this are in the low stock set.
+
+    Methods:
+        summary(self) -> StockSummary:
+            The current totals.
+        by_category(self) -> dict:
+            {category: (products, units, value)}, sorted by category.
+        category(self, category: str) -> tuple:
+            (products, units, value) of one category.
+        low_stock_ids(self) -> list, low_stock_count(self) -> int:
+            IDs and number of the products under low_stock_threshold.
+        lowest(self, n: int) -> list:
+            (quantity, id) of the n products with the least stock.
+        set_low_stock_threshold(self, threshold: int):
+            Changes the threshold and rebuilds the low stock set.
+    """
+
+    def __init__(self, products: dict, low_stock_threshold: int = DEFAULT_LOW_STOCK_THRESHOLD, source_lock=None):
+        self._source = products  # id -> Product of the inventory, to check heap entries
+        self._source_lock = source_lock if source_lock is not None else nullcontext()
+        self.low_stock_threshold = low_stock_threshold
+        self._lock = threading.Lock()  # Products change under different stripe locks
+        self.clear()
+
+    def clear(self):
+        self.products = 0
+        self.units = 0
+        self.value = 0.0
+        self.base_value = 0.0
+        self._categories = {}   # category -> [products, units, value, base value]
+        self._low_stock = {}    # ids under the threshold, an ordered set
+        self._heap = []         # (quantity, id), stale entries are skipped when read
+
+    def _totals(self, category: str):
+        totals = self._categories.get(category)
+        if totals is None:
+            totals = self._categories[category] = [0, 0, 0.0, 0.0]
+        return totals
+
+    def _add(self, product, sign: int):
+        quantity = product._quantity
+        units, value, base_value = sign * quantity, sign * product._price * quantity, sign * product._base_price * quantity
+        self.products += sign
+        self.units += units
+        self.value += value
+        self.base_value += base_value
+        totals = self._totals(product.category)
+        totals[0] += sign
+        totals[1] += units
+        totals[2] += value
+        totals[3] += base_value
+        if sign < 0:
+            self._low_stock.pop(product.id, None)
+            if not totals[0]:
+                del self._categories[product.category]
+        elif quantity < self.low_stock_threshold:
+            self._low_stock[product.id] = None
+
+    def add(self, product):
+        with self._lock:
+            self._add(product, 1)
+            heapq.heappush(self._heap, (product._quantity, product.id))
+
+    def add_many(self, products):
+        ''' add() for a loaded chunk: the heap is rebuilt once instead of a push per product '''
+        with self._lock:
+            for product in products:
+                self._add(product, 1)
+                self._heap.append((product._quantity, product.id))
+            heapq.heapify(self._heap)
+
+    def remove(self, product):
+        with self._lock:
+            self._add(product, -1)  # Its heap entries go stale
+
+    def changed(self, product, field: str, old):
+        if field == "quantity":
+            quantity = product._quantity
+            delta = quantity - old
+            with self._lock:
+                self.units += delta
+                self.value += product._price * delta
+                self.base_value += product._base_price * delta
+                totals = self._totals(product.category)
+                totals[1] += delta
+                totals[2] += product._price * delta
+                totals[3] += product._base_price * delta
+                if quantity < self.low_stock_threshold:
+                    self._low_stock[product.id] = None
+                else:
+                    self._low_stock.pop(product.id, None)
+                heapq.heappush(self._heap, (quantity, product.id))
+                if len(self._heap) > 2 * self.products + 1024:
+                    self._rebuild_heap()
+        elif field == "price" or field == "base_price":
+            delta = (product._price if field == "price" else product._base_price) - old
+            with self._lock:
+                amount = delta * product._quantity
+                index = 2 if field == "price" else 3
+                if field == "price":
+                    self.value += amount
+                else:
+                    self.base_value += amount
+                self._totals(product.category)[index] += amount
+
+    def _rebuild_heap(self):
+        # From the heap itself: every product has an entry with its current quantity, the stale and
+        # repeated ones are dropped. Only looks products up, the inventory may be adding or removing some
+        source = self._source
+        entries = []
+        for quantity, id in set(self._heap):
+            product = source.get(id)
+            if product is not None and product._quantity == quantity:
+                entries.append((quantity, id))
+        heapq.heapify(entries)
+        self._heap = entries
+
+    def rebuild(self):
+        ''' Recomputes every aggregate from the products of the inventory '''
+        with self._source_lock, all_product_locks(), self._lock:
+            products = list(self._source.values())
+            self.clear()
+            for product in products:
+                self._add(product, 1)
+            self._heap = [(product._quantity, product.id) for product in products]
+            heapq.heapify(self._heap)
+
+    def summary(self):
+        with self._lock:
+            return StockSummary(self.products, self.units, self.value, self.base_value)
+
+    def category(self, category: str):
+        totals = self._categories.get(category)
+        return (totals[0], totals[1], totals[2]) if totals is not None else (0, 0, 0.0)
+
+    def by_category(self):
+        with self._lock:
+            return {category: (totals[0], totals[1], totals[2]) for category, totals in sorted(self._categories.items())}
+
+    def low_stock_ids(self):
+        with self._lock:
+            return list(self._low_stock)
+
+    def low_stock_count(self):
+        return len(self._low_stock)
+
+    def set_low_stock_threshold(self, threshold: int):
+        with self._source_lock, all_product_locks(), self._lock:
+            self.low_stock_threshold = threshold
+            self._low_stock = {id: None for id, product in self._source.items() if product._quantity < threshold}
+
+    def lowest(self, n: int):
+        '''
+        (quantity, id) of the n products with the least stock, lowest first. Entries popped from the heap
+        that no longer match their product are dropped for good, the valid ones are pushed back.
+        '''
+        found, seen = [], set()
+        with self._lock:
+            heap = self._heap
+            while heap and len(found) < n:
+                quantity, id = heapq.heappop(heap)
+                product = self._source.get(id)
+                if product is None or product._quantity != quantity or id in seen:
+                    continue
+                seen.add(id)
+                found.append((quantity, id))
+            for entry in found:
+                heapq.heappush(heap, entry)
+        return found
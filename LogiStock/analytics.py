@@ -0,0 +1,262 @@
+import math
+from array import array
+from bisect import bisect_left, bisect_right
+from operator import mul, sub
+from datetime import datetime
+from history import _from_micros, _to_micros
+from locks import all_product_locks
+
+DAY = 24 * 60 * 60 * 1000000  # Periods are measured in microseconds, like QuantityHistory
+WEEK = 7 * DAY
+PERIODS = {"day": DAY, "week": WEEK}
+DEFAULT_DAYS = 365
+DEFAULT_ALPHA = 0.3        # Weight of the last period in the exponential smoothing
+DEFAULT_AVERAGE_PERIODS = 4
+
+
+def _window(end: datetime, days: int, period: str):
+    if period not in PERIODS:
+        raise ValueError(f"Period must be one of {', '.join(PERIODS)}.")
+    if days <= 0:
+        raise ValueError("The analysis must cover at least one day.")
+    end_micros = _to_micros(end if end is not None else datetime.now())
+    length = PERIODS[period]
+    return end_micros - days * DAY, end_micros, length, -(-days * DAY // length)
+
+
+def _movements(history, start: int, end: int):
+    '''
+    (first, last): the entries of a history that fall in [start, end), in microseconds since 1970, are first to last - 1.
+    The movement of entry i is quantities[i] - quantities[i - 1], so the first entry of a history is
+    the initial stock and not a movement.
+    '''
+    offsets = history.columns()[0]
+    first = max(bisect_right(offsets, start - history._base - 1), 1)
+    last = bisect_right(offsets, end - history._base - 1)
+    return first, last
+
+
+def movement_series(products, end: datetime = None, days: int = DEFAULT_DAYS, period: str = "week"):
+    '''
+    Units received and units shipped per period by the products together (e.g. the products of a category),
+    as two arrays, oldest period first. Every increase of a quantity history counts as received and every
+    decrease as shipped; the last period ends at end (now by default).
+    '''
+    start, end, length, periods = _window(end, days, period)
+    units_in, units_out = array("q", bytes(8 * periods)), array("q", bytes(8 * periods))
+    last_period = periods - 1
+    for product in products:
+        history = product.quantity_history
+        if history._base is None:
+            continue
+        first, last = _movements(history, start, end)
+        if first >= last:
+            continue
+        offsets, quantities = history.columns()
+        end_offset = end - history._base - 1
+        for offset, before, after in zip(offsets[first:last], quantities[first - 1:last - 1], quantities[first:last]):
+            if after > before:
+                units_in[last_period - (end_offset - offset) // length] += after - before
+            else:
+                units_out[last_period - (end_offset - offset) // length] += before - after
+    return units_in, units_out
+
+
+class ProductHistory:
+    """ What analyze reads from a product, with a copy of its quantity history (see copy_histories) """
+
+    __slots__ = ("id", "category", "_quantity", "quantity_history")
+
+    def __init__(self, product):
+        self.id = product.id
+        self.category = product.category
+        self._quantity = product._quantity
+        self.quantity_history = product.quantity_history.copy()
+
+
+def copy_histories(products):
+    '''
+    Copies the histories of the products while holding every product lock, so that a worker thread can
+    analyze them while register_entry / register_exit keep recording into the live ones.
+    '''
+    with all_product_locks():
+        return [ProductHistory(product) for product in products]
+
+
+class StockAnalysis:
+    """
+    Stock analytics of many products over a window of history, as array columns (one row per product)
+    plus totals per category.
+
+    Attributes:
+        start (datetime), end (datetime): The analyzed window.
+        period (str): "day" or "week", the unit of the demand figures.
+        ids (array): Product IDs, in the order of the other columns.
+        units_in (array), units_out (array): Units received and shipped in the window.
+        average_stock (array): Time-weighted average of the stock in the window (since the first entry
+            of the history if it starts later).
+        turnover (array): units_out / average_stock, how many times the stock was sold in the window.
+        moving_average (array): Average units shipped per period over the last average_periods periods.
+        forecast (array): Units expected to ship next period, by simple exponential smoothing of the
+            shipped units per period.
+        days_of_cover (array): Current stock / forecast demand per day; inf if no demand is forecast.
+        categories (dict): {category: CategoryAnalysis}.
+
+    Methods:
+        row(self, id: int) -> dict:
+            Every figure of one product.
+        top(self, column: str, n: int = 10, reverse: bool = False) -> list:
+            (value, id) of the n products with the lowest values of a column (highest with reverse).
+    """
+
+    def __init__(self, start: datetime, end: datetime, period: str):
+        self.start = start
+        self.end = end
+        self.period = period
+        self.ids = array("q")
+        self.units_in = array("q")
+        self.units_out = array("q")
+        self.average_stock = array("d")
+        self.turnover = array("d")
+        self.moving_average = array("d")
+        self.forecast = array("d")
+        self.days_of_cover = array("d")
+        self.categories = {}
+        self._rows = None
+
+    COLUMNS = ("units_in", "units_out", "average_stock", "turnover", "moving_average", "forecast", "days_of_cover")
+
+    def __len__(self):
+        return len(self.ids)
+
+    def row(self, id: int):
+        if self._rows is None:
+            self._rows = {id: row for row, id in enumerate(self.ids)}
+        row = self._rows.get(id)
+        if row is None:
+            return None
+        return {"id": id, **{column: getattr(self, column)[row] for column in self.COLUMNS}}
+
+    def top(self, column: str, n: int = 10, reverse: bool = False):
+        values = getattr(self, column)
+        rows = sorted(range(len(values)), key=values.__getitem__, reverse=reverse)[:n]
+        return [(values[row], self.ids[row]) for row in rows]
+
+    def __str__(self):
+        units_out = sum(self.units_out)
+        average_stock = sum(self.average_stock)
+        turnover = units_out / average_stock if average_stock else 0.0
+        return (f"{len(self)} products from {self.start:%Y-%m-%d} to {self.end:%Y-%m-%d}: "
+                f"{sum(self.units_in)} units received, {units_out} shipped, turnover {turnover:.2f}. "
+                f"Forecast demand: {sum(self.forecast):.1f} units next {self.period}.")
+
+
+class CategoryAnalysis:
+    """
+    Totals of the products of one category in a StockAnalysis.
+
+    Attributes:
+        products (int), units_in (int), units_out (int), average_stock (float), forecast (float), stock (int):
+            Sums over the products of the category.
+        turnover (float): units_out / average_stock.
+        days_of_cover (float): stock / forecast demand per day, inf if no demand is forecast.
+    """
+
+    def __init__(self):
+        self.products = 0
+        self.units_in = 0
+        self.units_out = 0
+        self.average_stock = 0.0
+        self.forecast = 0.0
+        self.stock = 0
+        self.turnover = 0.0
+        self.days_of_cover = math.inf
+
+    def __str__(self):
+        cover = "no demand" if math.isinf(self.days_of_cover) else f"{self.days_of_cover:.1f} days of cover"
+        return (f"{self.products} products, {self.units_in} in / {self.units_out} out, "
+                f"turnover {self.turnover:.2f}, {cover}")
+
+
+def analyze(products, end: datetime = None, days: int = DEFAULT_DAYS, period: str = "week",
+            alpha: float = DEFAULT_ALPHA, average_periods: int = DEFAULT_AVERAGE_PERIODS):
+    '''
+    Computes a StockAnalysis of products over the days before end (now by default).
+
+    The whole catalog is processed column by column: the movements of each history are read as slices
+    of its array columns, and the smoothing weights of every period age are computed once, so the
+    forecast of a product is a weighted sum over its movements instead of a pass over every period.
+    '''
+    if not 0 < alpha <= 1:
+        raise ValueError("alpha must be in (0, 1].")
+    if average_periods <= 0:
+        raise ValueError("average_periods must be at least 1.")
+    start, end, length, periods = _window(end, days, period)
+    analysis = StockAnalysis(_from_micros(start), _from_micros(end), period)
+
+    # Simple exponential smoothing started with the oldest period: the level after the last period is
+    # the sum of the periods weighted alpha * (1 - alpha) ** age, the oldest one (1 - alpha) ** age
+    weights = [alpha * (1 - alpha) ** age for age in range(periods)]
+    weights[-1] = (1 - alpha) ** (periods - 1)
+    recent = min(average_periods, periods)
+    days_per_period = length / DAY
+
+    ids, units_in_column, units_out_column = analysis.ids, analysis.units_in, analysis.units_out
+    average_column, turnover_column = analysis.average_stock, analysis.turnover
+    moving_column, forecast_column, cover_column = analysis.moving_average, analysis.forecast, analysis.days_of_cover
+    categories = analysis.categories
+    for product in products:
+        history = product.quantity_history
+        units_in = units_out = moving = 0
+        forecast = 0.0
+        average = float(product._quantity)
+        if history._base is not None:
+            base, (offsets, quantities) = history._base, history.columns()
+            first, last = _movements(history, start, end)
+            changes = list(map(sub, quantities[first:last], quantities[first - 1:last - 1])) if first < last else []
+            if changes:
+                # The units moved in and out follow from the sum of the absolute changes and the net change,
+                # summed in C over the slices; only the forecast needs the age of each shipment
+                moved, net = sum(map(abs, changes)), quantities[last - 1] - quantities[first - 1]
+                units_in, units_out = (moved + net) // 2, (moved - net) // 2
+                end_offset = end - base - 1
+                for offset, change in zip(offsets[first:last], changes):
+                    if change < 0:
+                        forecast -= weights[(end_offset - offset) // length] * change
+                recent_first = bisect_left(offsets, end - base - recent * length, first, last)
+                moving = (sum(map(abs, changes[recent_first - first:]))
+                          - (quantities[last - 1] - quantities[recent_first - 1])) // 2
+
+            # Time-weighted stock: each quantity lasts until the next entry, the last one until end. The sum
+            # of quantity * duration is taken by parts, so it only needs the changes and their times
+            since = max(start - base, offsets[0])
+            if end - base > since:
+                area = (quantities[last - 1] * (end - base) - quantities[first - 1] * since
+                        - sum(map(mul, offsets[first:last], changes)))
+                average = area / (end - base - since)
+
+        ids.append(product.id)
+        units_in_column.append(units_in)
+        units_out_column.append(units_out)
+        average_column.append(average)
+        turnover_column.append(units_out / average if average else 0.0)
+        moving_column.append(moving / recent)
+        forecast_column.append(forecast)
+        cover_column.append(product._quantity / (forecast / days_per_period) if forecast else math.inf)
+
+        category = categories.get(product.category)
+        if category is None:
+            category = categories[product.category] = CategoryAnalysis()
+        category.products += 1
+        category.units_in += units_in
+        category.units_out += units_out
+        category.average_stock += average
+        category.forecast += forecast
+        category.stock += product._quantity
+
+    for category in categories.values():
+        category.turnover = category.units_out / category.average_stock if category.average_stock else 0.0
+        if category.forecast:
+            category.days_of_cover = category.stock / (category.forecast / days_per_period)
+    analysis.categories = dict(sorted(categories.items()))
+    return analysis
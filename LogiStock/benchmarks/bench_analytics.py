@@ -0,0 +1,51 @@
+"""
+Full-catalog stock analytics (analytics.analyze) over a year of quantity history.
+
+Run from the LogiStock folder:
+    python -m benchmarks.bench_analytics [size] [movements per product]
+"""
+import random
+import sys
+import time
+from itertools import accumulate
+from datetime import datetime
+from analytics import DAY, analyze, movement_series
+from benchmarks.suite import generate_products
+from history import QuantityHistory, _to_micros
+
+DEFAULT_SIZE = 100000
+DEFAULT_MOVEMENTS = 100  # About two per week
+END = datetime(2025, 1, 1)
+
+
+def with_history(products, movements: int, seed: int = 42):
+    """ Gives every product a history of movements spread over the year before END, built from raw entries """
+    rng = random.Random(seed)
+    end = _to_micros(END)
+    changes = range(-25, 21)
+    for product in products:
+        times = sorted(int(end - 365 * DAY * rng.random()) for _ in range(movements + 1))
+        quantities = accumulate(rng.choices(changes, k=movements), lambda quantity, change: max(0, quantity + change),
+                                initial=rng.randint(50, 500))
+        product.quantity_history = QuantityHistory.from_raw(zip(times, quantities))
+        product._quantity = product.quantity_history.columns()[1][-1]
+    return products
+
+
+def main(size: int, movements: int):
+    start = time.perf_counter()
+    products = with_history(generate_products(size, history=0), movements)
+    print(f"{size} products with {movements} movements each generated in {time.perf_counter() - start:.1f} s")
+
+    for period in ("week", "day"):
+        start = time.perf_counter()
+        analysis = analyze(products, end=END, period=period)
+        print(f"analyze, {period:4} periods: {time.perf_counter() - start:6.2f} s  {analysis}")
+    start = time.perf_counter()
+    units_in, units_out = movement_series(products, end=END, period="day")
+    print(f"daily movement series:  {time.perf_counter() - start:6.2f} s  ({len(units_out)} days)")
+
+
+if __name__ == "__main__":
+    main(int(sys.argv[1]) if len(sys.argv) > 1 else DEFAULT_SIZE,
+         int(sys.argv[2]) if len(sys.argv) > 2 else DEFAULT_MOVEMENTS)
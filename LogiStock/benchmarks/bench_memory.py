@@ -0,0 +1,83 @@
+"""
+Memory benchmark: Inventory (one Product object per SKU) against ColumnarInventory, and the memory of
+one product's quantity history as a QuantityHistory against the list of (datetime, quantity) tuples it
+replaced.
+
+Run from the LogiStock folder:
+    python -m benchmarks.bench_memory [sizes...]
+"""
+import gc
+import os
+import sys
+import tempfile
+import time
+import tracemalloc
+from datetime import datetime, timedelta
+from columnar import ColumnarInventory
+from csv_loader import CSV_FIELDS
+from history import QuantityHistory
+from inventory import Inventory
+
+DEFAULT_SIZES = [100000, 1000000]
+HISTORY_LENGTHS = [1, 8, 100, 512]  # 1: a product that never moved, 512: the default max_entries
+HISTORY_PRODUCTS = 2000
+CATEGORIES = ["Comida", "Bebidas", "Aseo", "Papeleria", "Ferreteria", "Hogar", "Ropa", "Juguetes"]
+
+
+def write_synthetic_csv(filename: str, size: int):
+    with open(filename, mode="w", encoding="utf-8", newline="") as file:
+        file.write(",".join(CSV_FIELDS) + "\r\n")
+        for i in range(1, size + 1):
+            base_price = 1000 + (i * 37) % 50000
+            file.write(f"{i},Product {i},{base_price * 0.9:.1f},{base_price:.1f},{(i * 13) % 500},"
+                       f"{CATEGORIES[i % len(CATEGORIES)]},2024-{1 + i % 12:02d}-{1 + i % 28:02d},\r\n")
+
+
+def measure(factory, filename: str):
+    """ Returns (seconds, bytes still allocated after loading) for the inventory built by factory """
+    gc.collect()
+    tracemalloc.start()
+    start = time.perf_counter()
+    inventory = factory()
+    inventory.load_csv_stream(filename)
+    elapsed = time.perf_counter() - start
+    gc.collect()
+    current, _ = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+    del inventory
+    return elapsed, current
+
+
+def history_bytes(factory, entries: int, products: int = HISTORY_PRODUCTS):
+    """ Bytes per product of products histories of entries movements built by factory(pairs) """
+    start = datetime(2024, 1, 1)
+    pairs = [(start + timedelta(hours=5 * i, seconds=i % 60), 100 + i % 7) for i in range(entries)]
+    gc.collect()
+    tracemalloc.start()
+    histories = [factory([(when + timedelta(microseconds=n), quantity) for when, quantity in pairs])
+                 for n in range(products)]
+    gc.collect()
+    current, _ = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+    del histories
+    return current / products
+
+
+def main(sizes):
+    print("=== Quantity history, bytes per product ===")
+    print(f"{'entries':>8} {'list of tuples':>15} {'QuantityHistory':>16}")
+    for entries in HISTORY_LENGTHS:
+        print(f"{entries:8} {history_bytes(list, entries):15.0f} {history_bytes(QuantityHistory, entries):16.0f}")
+
+    with tempfile.TemporaryDirectory() as folder:
+        for size in sizes:
+            filename = os.path.join(folder, f"inventory_{size}.csv")
+            write_synthetic_csv(filename, size)
+            print(f"\n=== {size} products ===")
+            for label, factory in (("Inventory (Product objects)", Inventory), ("ColumnarInventory", ColumnarInventory)):
+                elapsed, current = measure(factory, filename)
+                print(f"{label:30} {current / 2**20:10.1f} MB {current / size:8.1f} B/product {elapsed:8.2f} s")
+
+
+if __name__ == "__main__":
+    main([int(arg) for arg in sys.argv[1:]] or DEFAULT_SIZES)
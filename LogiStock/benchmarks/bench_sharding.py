@@ -0,0 +1,78 @@
+"""
+Full-catalog operations on one Inventory against ShardedInventory with several shard counts.
+Speedups need as many free cores as shards.
+
+Run from the LogiStock folder:
+    python -m benchmarks.bench_sharding [size] [shard counts...]
+"""
+import os
+import sys
+import tempfile
+import time
+from benchmarks.bench_memory import write_synthetic_csv
+from inventory import Inventory
+from sharding import ShardedInventory, category_totals, stock_problems, stock_totals
+
+DEFAULT_SIZE = 1000000
+DEFAULT_SHARDS = [2, 4, 8]
+
+OPERATIONS = [
+    ("stock value", lambda inventory: inventory.stock_value()),
+    ("category summary", lambda inventory: inventory.category_summary()),
+    ("validate stock", lambda inventory: inventory.validate_stock()),
+    ("10% discount", lambda inventory: inventory.apply_bulk_discount(10)),
+    ("reset prices", lambda inventory: inventory.reset_prices()),
+]
+
+
+class SingleProcess:
+    """ The same operations over one Inventory, as the baseline """
+
+    def __init__(self, inventory):
+        self.inventory = inventory
+
+    def stock_value(self):
+        return stock_totals(self.inventory)
+
+    def category_summary(self):
+        return category_totals(self.inventory)
+
+    def validate_stock(self):
+        return stock_problems(self.inventory)
+
+    def apply_bulk_discount(self, discount_pct):
+        return self.inventory.apply_bulk_discount(discount_pct)
+
+    def reset_prices(self):
+        return self.inventory.reset_prices()
+
+
+def timed(operation, inventory):
+    start = time.perf_counter()
+    operation(inventory)
+    return time.perf_counter() - start
+
+
+def main(size, shard_counts):
+    with tempfile.TemporaryDirectory() as folder:
+        filename = os.path.join(folder, "inventory.csv")
+        write_synthetic_csv(filename, size)
+        inventory = Inventory()
+        inventory.load_csv_stream(filename)
+        baseline = {label: timed(operation, SingleProcess(inventory)) for label, operation in OPERATIONS}
+        print(f"=== {size} products, {os.cpu_count()} cores ===")
+        print(f"{'operation':20}{'1 process':>12}" + "".join(f"{f'{shards} shards':>18}" for shards in shard_counts))
+
+        results = {label: [] for label, _ in OPERATIONS}
+        for shards in shard_counts:
+            with ShardedInventory(shards) as sharded:
+                sharded.load_csv_stream(filename)
+                for label, operation in OPERATIONS:
+                    results[label].append(timed(operation, sharded))
+        for label, _ in OPERATIONS:
+            cells = "".join(f"{elapsed:8.3f} s x{baseline[label] / elapsed:5.1f}  " for elapsed in results[label])
+            print(f"{label:20}{baseline[label]:10.3f} s  {cells}")
+
+
+if __name__ == "__main__":
+    main(int(sys.argv[1]) if len(sys.argv) > 1 else DEFAULT_SIZE, [int(arg) for arg in sys.argv[2:]] or DEFAULT_SHARDS)
@@ -0,0 +1,104 @@
+"""
+Load generator for server.py: many concurrent clients pipelining requests.
+
+Without --port it starts an in-process server over a synthetic inventory on a free port.
+Run from the LogiStock folder:
+    python -m benchmarks.load_client --clients 200 --requests 500 --window 32
+    python -m benchmarks.load_client --port 8765 --products 1000   (against a running server)
+"""
+import argparse
+import asyncio
+import json
+import random
+import time
+from datetime import date
+from inventory import Inventory
+from product import Product
+from server import InventoryServer
+
+
+def synthetic_inventory(size: int):
+    inventory = Inventory()
+    for id in range(size):
+        inventory.add_product(Product(id, f"Product {id}", 100.0, 1000, f"Category {id % 20}", date.today()))
+    return inventory
+
+
+def make_request(rng, request_id: int, products: int):
+    product_id = rng.randrange(products)
+    choice = rng.random()
+    if choice < 0.5:
+        return {"id": request_id, "op": "search", "product_id": product_id}
+    if choice < 0.8:
+        return {"id": request_id, "op": "register_entry", "product_id": product_id, "quantity": rng.randint(1, 10)}
+    return {"id": request_id, "op": "register_exit", "product_id": product_id, "quantity": rng.randint(1, 5)}
+
+
+async def client(host: str, port: int, requests: int, window: int, products: int, seed: int, latencies: list, errors: list):
+    """ Keeps up to window requests in flight on one connection """
+    rng = random.Random(seed)
+    reader, writer = await asyncio.open_connection(host, port)
+    sent_at = {}
+    in_flight = asyncio.Semaphore(window)
+
+    async def receive():
+        for _ in range(requests):
+            response = json.loads(await reader.readline())
+            latencies.append(time.perf_counter() - sent_at.pop(response["id"]))
+            if not response["ok"]:
+                errors.append(response["error"])
+            in_flight.release()
+
+    receiver = asyncio.create_task(receive())
+    for request_id in range(requests):
+        await in_flight.acquire()
+        sent_at[request_id] = time.perf_counter()
+        writer.write((json.dumps(make_request(rng, request_id, products)) + "\n").encode("utf-8"))
+        if request_id % window == window - 1:
+            await writer.drain()
+    await writer.drain()
+    await receiver
+    writer.close()
+
+
+def percentile(values: list, pct: float):
+    return values[min(len(values) - 1, int(len(values) * pct / 100))] if values else 0.0
+
+
+async def run(args):
+    server = None
+    port = args.port
+    if port is None:
+        server = await InventoryServer(synthetic_inventory(args.products), args.host, 0).start()
+        port = server.port
+
+    latencies, errors = [], []
+    start = time.perf_counter()
+    await asyncio.gather(*(client(args.host, port, args.requests, args.window, args.products, seed, latencies, errors)
+                           for seed in range(args.clients)))
+    elapsed = time.perf_counter() - start
+    if server is not None:
+        await server.close()
+
+    latencies.sort()
+    total = args.clients * args.requests
+    print(f"{args.clients} clients x {args.requests} requests (window {args.window}): "
+          f"{total / elapsed:,.0f} requests/s in {elapsed:.2f} s")
+    print(f"latency ms: p50 {percentile(latencies, 50) * 1000:.2f}  p99 {percentile(latencies, 99) * 1000:.2f}  "
+          f"max {latencies[-1] * 1000 if latencies else 0:.2f}")
+    print(f"error responses: {len(errors)}" + (f" (e.g. {errors[0]})" if errors else ""))
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Benchmark the inventory socket server.")
+    parser.add_argument("--host", default="127.0.0.1")
+    parser.add_argument("--port", type=int, help="server to test; by default one is started in-process")
+    parser.add_argument("--clients", type=int, default=200)
+    parser.add_argument("--requests", type=int, default=500, help="requests per client")
+    parser.add_argument("--window", type=int, default=32, help="pipelined requests in flight per client")
+    parser.add_argument("--products", type=int, default=10000)
+    asyncio.run(run(parser.parse_args()))
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,123 @@
+"""
+Concurrency stress check for Inventory and Product.
+
+Many threads register entries and exits, apply movement batches and bulk discounts, add and
+remove extra products, take snapshots and rebuild the running aggregates at the same time. At the end
+the stock of every product must equal its initial stock plus the successful entries minus the successful
+exits, and the aggregates must match the totals computed from the products.
+
+Run from the LogiStock folder (exits with status 1 if a total is not conserved):
+    python -m benchmarks.stress_threads [threads] [operations per thread]
+"""
+import random
+import sys
+import threading
+import time
+from datetime import date
+from inventory import Inventory
+from product import Product
+
+PRODUCTS = 200
+INITIAL_STOCK = 50
+
+
+def worker(inventory, operations, seed, deltas, lock, errors):
+    rng = random.Random(seed)
+    local = {}
+    try:
+        for i in range(operations):
+            id = rng.randrange(PRODUCTS)
+            product = inventory.search_product(id)
+            choice = rng.random()
+            if choice < 0.4:
+                quantity = rng.randint(1, 5)
+                if product.register_entry(quantity):
+                    local[id] = local.get(id, 0) + quantity
+            elif choice < 0.8:
+                quantity = rng.randint(1, 5)
+                if product.register_exit(quantity):
+                    local[id] = local.get(id, 0) - quantity
+            elif choice < 0.9:
+                batch = [(rng.randrange(PRODUCTS), rng.choice([3, 2, -1])) for _ in range(20)]
+                if inventory.apply_movements(batch).applied:
+                    for id, quantity in batch:
+                        local[id] = local.get(id, 0) + quantity
+            elif choice < 0.95:
+                # Structural changes on products outside the checked range
+                extra = PRODUCTS + seed * operations + i
+                inventory.add_product(Product(extra, f"Extra {extra}", 1.0, 1, "Extra", date.today()))
+                inventory.remove_product(extra)
+            elif choice < 0.98:
+                snapshot = inventory.products
+                sum(product.quantity for product in snapshot)  # A reader iterating while others write
+            elif choice < 0.995:
+                inventory.apply_bulk_discount(rng.choice([0, 5, 10]), category="Stress")
+            elif choice < 0.9975:
+                inventory.aggregates.rebuild()  # Reads every product while others are added and removed
+            else:
+                inventory.aggregates.set_low_stock_threshold(rng.choice([INITIAL_STOCK - 10, INITIAL_STOCK + 10]))
+    except Exception as e:  # Reported by the main thread
+        errors.append(repr(e))
+    with lock:
+        for id, delta in local.items():
+            deltas[id] = deltas.get(id, 0) + delta
+
+
+def aggregate_problems(inventory):
+    """ Differences between the running aggregates and the totals computed from the products """
+    products = inventory.products
+    aggregates = inventory.aggregates
+    summary = aggregates.summary()
+    problems = []
+    units = sum(product.quantity for product in products)
+    value = sum(product.price * product.quantity for product in products)
+    if (summary.products, summary.units) != (len(products), units):
+        problems.append(f"totals: {summary.products} products, {summary.units} units, "
+                        f"expected {len(products)} products, {units} units")
+    if abs(summary.value - value) > 1e-6 * max(1.0, value):
+        problems.append(f"value: {summary.value:.2f}, expected {value:.2f}")
+    threshold = aggregates.low_stock_threshold
+    low = sorted(product.id for product in products if product.quantity < threshold)
+    if sorted(aggregates.low_stock_ids()) != low:
+        problems.append(f"low stock set: {aggregates.low_stock_count()} products, expected {len(low)}")
+    lowest = sorted((product.quantity, product.id) for product in products)[:10]
+    if aggregates.lowest(10) != lowest:
+        problems.append(f"lowest: {aggregates.lowest(10)}, expected {lowest}")
+    return problems
+
+
+def main(threads: int = 16, operations: int = 5000):
+    inventory = Inventory()
+    for id in range(PRODUCTS):
+        inventory.add_product(Product(id, f"Product {id}", 10.0, INITIAL_STOCK, "Stress", date.today()))
+
+    deltas, errors, lock = {}, [], threading.Lock()
+    workers = [threading.Thread(target=worker, args=(inventory, operations, seed, deltas, lock, errors))
+               for seed in range(threads)]
+    start = time.perf_counter()
+    for thread in workers:
+        thread.start()
+    for thread in workers:
+        thread.join()
+    elapsed = time.perf_counter() - start
+
+    wrong = [(id, inventory.search_product(id).quantity, INITIAL_STOCK + deltas.get(id, 0))
+             for id in range(PRODUCTS)
+             if inventory.search_product(id).quantity != INITIAL_STOCK + deltas.get(id, 0)]
+    negative = [product.id for product in inventory.products if product.quantity < 0]
+    problems = aggregate_problems(inventory)
+    print(f"{threads} threads x {operations} operations in {elapsed:.2f} s")
+    print(f"products: {len(inventory.products)} (expected {PRODUCTS}), wrong totals: {len(wrong)}, "
+          f"negative stock: {len(negative)}, errors: {len(errors)}, aggregate problems: {len(problems)}")
+    for line in errors[:5]:
+        print("  ", line)
+    for id, actual, expected in wrong[:5]:
+        print(f"   product {id}: {actual} units, expected {expected}")
+    for line in problems:
+        print("  ", line)
+    return not (wrong or negative or errors or problems or len(inventory.products) != PRODUCTS)
+
+
+if __name__ == "__main__":
+    args = [int(arg) for arg in sys.argv[1:]]
+    sys.exit(0 if main(*args) else 1)
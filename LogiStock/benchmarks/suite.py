@@ -0,0 +1,282 @@
+"""
+Headless benchmark suite for the inventory core: lookups, csv load and save, listing, reports,
+movements, pricing, search and stock analytics, over synthetic inventories of several sizes.
+
+Every operation is timed (best and median of several rounds, each one from the same state) and measured
+once more under tracemalloc for its peak memory. Results go to a JSON file that a later run can be
+compared with; the comparison uses the medians.
+
+Run from the LogiStock folder:
+    python -m benchmarks.suite --sizes 10000 100000 --output results.json
+    python -m benchmarks.suite --sizes 10000 100000 --compare results.json --threshold 0.5
+The comparison exits with status 1 if an operation got slower (or used more memory) than the
+baseline by more than the threshold, ignoring differences below TIME_NOISE and MEMORY_NOISE. Two runs
+of the same code on a busy machine can differ by a third, hence the default of 50%; lower it with more
+--rounds on a quiet machine.
+"""
+import argparse
+import gc
+import json
+import os
+import platform
+import random
+import statistics
+import sys
+import tempfile
+import time
+import tracemalloc
+from datetime import date, datetime, timedelta
+from analytics import analyze
+from csv_loader import CSV_FIELDS, LoadResult
+from history import QuantityHistory
+from inventory import Inventory
+from product import Product
+from report import Report
+
+DEFAULT_SIZES = [10000, 100000]
+CATEGORIES = ["Comida", "Bebidas", "Aseo", "Papelería", "Ferretería", "Hogar", "Ropa", "Juguetes"]
+WORDS = ["Café", "Arroz", "Aceite", "Leche", "Jabón", "Tornillo", "Martillo", "Cuaderno", "Lápiz", "Camiseta",
+         "Pelota", "Galletas", "Chocolate", "Harina", "Pasta", "Atún", "Shampoo", "Crema", "Cepillo", "Bombillo"]
+SIZES = ["250g", "500g", "1kg", "250ml", "1l", "x6", "x12"]
+LOOKUPS = 100000  # search_product calls per round
+MEMORY_NOISE = 64 * 1024  # Peak memory differences below this are not compared
+TIME_NOISE = 0.002  # Median time differences below this (seconds) are not compared
+DEFAULT_ROUNDS = 5
+DEFAULT_THRESHOLD = 0.5
+
+
+def generate_products(size: int, seed: int = 42, history: int = 8):
+    """
+    Synthetic products with realistic names, prices and categories, each one with a quantity history of
+    history movements spread over the last 90 days. The same seed always gives the same inventory.
+    """
+    rng = random.Random(seed)
+    now = datetime(2025, 1, 1)
+    products = []
+    for id in range(1, size + 1):
+        base_price = round(rng.uniform(500, 50000), 1)
+        quantity = rng.randint(0, 500)
+        product = Product(id, f"{rng.choice(WORDS)} {rng.choice(WORDS)} {rng.choice(SIZES)}",
+                          round(base_price * rng.choice((1, 1, 1, 0.9, 0.8)), 1), quantity,
+                          rng.choice(CATEGORIES), date(2024, rng.randint(1, 12), rng.randint(1, 28)),
+                          None, base_price)
+        when = now - timedelta(days=90)
+        entries = [(when, quantity)]
+        for _ in range(history):
+            when += timedelta(minutes=rng.randint(1, 90 * 24 * 60 // max(history, 1)))
+            quantity = max(0, quantity + rng.randint(-20, 30))
+            entries.append((when, quantity))
+        product.quantity_history = QuantityHistory(entries)
+        product._quantity = quantity
+        products.append(product)
+    return products
+
+
+def generate_inventory(size: int, seed: int = 42, history: int = 8):
+    """ Inventory holding generate_products(size, seed, history), indexed like a csv load """
+    inventory = Inventory()
+    inventory._bulk_add(generate_products(size, seed, history), LoadResult("generated"))
+    inventory._name_index.sort()
+    return inventory
+
+
+def write_csv(filename: str, products):
+    with open(filename, mode="w", encoding="utf-8", newline="") as file:
+        file.write(",".join(CSV_FIELDS) + "\r\n")
+        for product in products:
+            file.write(f"{product.id},{product.name},{product.price},{product.base_price},{product.quantity},"
+                       f"{product.category},{product.entry_date},\r\n")
+
+
+def operations(size: int, folder: str, seed: int):
+    """
+    Yields (name, setup) pairs. setup() prepares the state and returns the callable that is measured,
+    so building the inventory is never part of the timing. An operation that changes the state it
+    measures returns (run, reset) instead: reset() puts the state back before every round, untimed.
+    """
+    csv_path = os.path.join(folder, f"inventory_{size}.csv")
+    write_csv(csv_path, generate_products(size, seed, history=0))
+    rng = random.Random(seed)
+    ids = [rng.randint(1, size + size // 10) for _ in range(LOOKUPS)]  # About 9% misses
+
+    def fresh():
+        return generate_inventory(size, seed)
+
+    def loaded():
+        inventory = Inventory()
+        inventory.load_csv_stream(csv_path)
+        return inventory
+
+    def search_product():
+        search = fresh().search_product
+        return lambda: [search(id) for id in ids]
+
+    def load_from_csv():
+        inventory = Inventory()
+        return lambda: inventory.load_from_csv(csv_path)
+
+    def save_to_csv():
+        inventory = fresh()
+        return lambda: inventory.save_to_csv(os.path.join(folder, "saved.csv"))
+
+    def save_journal():
+        # Every round appends the same 1% of changed products to an empty journal, never a compaction
+        inventory = loaded()
+        copy_path = csv_path + ".copy.csv"
+        changed = inventory.page(0, max(1, size // 100))
+
+        def reset():
+            inventory.save_csv(copy_path)  # A full save, it removes the journal
+            for product in changed:
+                product.quantity += 1
+        return lambda: inventory.save_to_csv(copy_path, journal=True), reset
+
+    def list_inventory():
+        return fresh().list_inventory
+
+    def report():
+        generator = Report(fresh())
+        return lambda: generator._generate_report_logic(os.path.join(folder, "report.txt"))
+
+    def apply_movements():
+        inventory = fresh()
+        batch = [(rng.randint(1, size), rng.randint(1, 20)) for _ in range(min(size, 50000))]
+        return lambda: inventory.apply_movements(batch)
+
+    def bulk_discount():
+        # From the base prices every round, a second discount of 10% over them would change nothing
+        inventory = fresh()
+        return lambda: inventory.apply_bulk_discount(10), inventory.reset_prices
+
+    def stock_summary():
+        inventory = fresh()
+        return lambda: [inventory.stock_summary() for _ in range(1000)]
+
+    def stock_analytics():
+        products = fresh().products
+        end = datetime(2025, 1, 1)  # The generated histories cover the 90 days before it
+        return lambda: analyze(products, end=end, days=90, period="day")
+
+    def query_pages():
+        inventory = fresh()
+        inventory.query("price")  # Builds the price index outside of the timing
+
+        def run():
+            page = inventory.query("price", limit=50)
+            for _ in range(99):
+                page = inventory.query("price", limit=50, after=page.next_cursor)
+            inventory.query("quantity", descending=True, limit=50, category=CATEGORIES[0], price=(5.0, 50.0))
+        return run
+
+    def search_text():
+        inventory = fresh()
+        inventory.search_text("warm up")  # Builds the index outside of the timing
+        queries = ["cafe", "jabon 1kg", "marillo", "choc gall", "aceite ferreteria"]
+        return lambda: [inventory.search_text(query) for query in queries]
+
+    yield "search_product", search_product
+    yield "load_from_csv", load_from_csv
+    yield "save_to_csv", save_to_csv
+    yield "save_to_csv journal", save_journal
+    yield "list_inventory", list_inventory
+    yield "report", report
+    yield "apply_movements", apply_movements
+    yield "apply_bulk_discount", bulk_discount
+    yield "stock_summary x1000", stock_summary
+    yield "search_text x5", search_text
+    yield "query pages x100", query_pages
+    yield "stock_analytics", stock_analytics
+
+
+def measure(setup, rounds: int):
+    """ Returns best and median seconds over rounds, and the peak of memory allocated by one more run """
+    run = setup()
+    run, reset = run if isinstance(run, tuple) else (run, None)
+    times = []
+    for _ in range(rounds):
+        if reset is not None:
+            reset()
+        gc.collect()
+        start = time.perf_counter()
+        run()
+        times.append(time.perf_counter() - start)
+    if reset is not None:
+        reset()
+    gc.collect()
+    tracemalloc.start()
+    run()
+    _, peak = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+    del run
+    return {"best": min(times), "median": statistics.median(times), "peak_bytes": peak}
+
+
+def run_suite(sizes, rounds: int = DEFAULT_ROUNDS, seed: int = 42, only=None):
+    results = {
+        "meta": {"python": sys.version.split()[0], "platform": platform.platform(), "cpus": os.cpu_count(),
+                 "date": datetime.now().isoformat(timespec="seconds"), "rounds": rounds, "seed": seed},
+        "results": {},
+    }
+    with tempfile.TemporaryDirectory() as folder:
+        for size in sizes:
+            print(f"=== {size} products ===")
+            sized = results["results"][str(size)] = {}
+            for name, setup in operations(size, folder, seed):
+                if only and not any(part in name for part in only):
+                    continue
+                sized[name] = measure(setup, rounds)
+                print(f"{name:24} best {sized[name]['best']:9.4f} s  median {sized[name]['median']:9.4f} s  "
+                      f"peak {sized[name]['peak_bytes'] / 2**20:8.1f} MB")
+    return results
+
+
+def compare(results, baseline, threshold: float):
+    """ Prints the change of every operation against baseline and returns the list of regressions """
+    regressions = []
+    for size, operations_ in results["results"].items():
+        for name, current in operations_.items():
+            before = baseline.get("results", {}).get(size, {}).get(name)
+            if before is None:
+                continue
+            time_change = 0.0
+            if abs(current["median"] - before["median"]) > TIME_NOISE:
+                time_change = current["median"] / before["median"] - 1
+            memory_change = 0.0
+            if abs(current["peak_bytes"] - before["peak_bytes"]) > MEMORY_NOISE:
+                memory_change = current["peak_bytes"] / max(before["peak_bytes"], 1) - 1
+            flag = ""
+            if time_change > threshold or memory_change > threshold:
+                flag = "  REGRESSION"
+                regressions.append((size, name, time_change, memory_change))
+            print(f"{size:>8} {name:24} time {time_change:+7.1%}  memory {memory_change:+7.1%}{flag}")
+    return regressions
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Benchmark the inventory core on synthetic data.")
+    parser.add_argument("--sizes", type=int, nargs="+", default=DEFAULT_SIZES, help="inventory sizes, e.g. 10000 100000 1000000")
+    parser.add_argument("--rounds", type=int, default=DEFAULT_ROUNDS)
+    parser.add_argument("--seed", type=int, default=42)
+    parser.add_argument("--only", nargs="+", help="only the operations whose name contains one of these")
+    parser.add_argument("--output", help="JSON file for the results")
+    parser.add_argument("--compare", help="baseline JSON file written by an earlier run")
+    parser.add_argument("--threshold", type=float, default=DEFAULT_THRESHOLD, help="allowed slowdown before flagging (0.5 = 50%%)")
+    args = parser.parse_args()
+
+    results = run_suite(args.sizes, args.rounds, args.seed, args.only)
+    if args.output:
+        with open(args.output, "w", encoding="utf-8") as file:
+            json.dump(results, file, indent=2)
+    if args.compare:
+        with open(args.compare, encoding="utf-8") as file:
+            baseline = json.load(file)
+        print(f"\n=== Against {args.compare} (threshold {args.threshold:.0%}) ===")
+        regressions = compare(results, baseline, args.threshold)
+        if regressions:
+            print(f"{len(regressions)} regressions.")
+            sys.exit(1)
+        print("No regressions.")
+
+
+if __name__ == "__main__":
+    main()
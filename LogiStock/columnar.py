@@ -0,0 +1,201 @@
+from array import array
+from datetime import date
+from csv_loader import DEFAULT_CHUNK_SIZE, LoadResult, iter_product_chunks
+
+NO_DATE = 0  # date ordinals start at 1, so 0 stands for "no date"
+
+
+def _to_ordinal(value: date):
+    return value.toordinal() if value else NO_DATE
+
+
+def _from_ordinal(ordinal: int):
+    return date.fromordinal(ordinal) if ordinal != NO_DATE else None
+
+
+class ProductView:
+    """
+    Lightweight view over one row of a ColumnarInventory. It reads and writes the columns
+    directly, so creating one costs two references instead of a full Product.
+    Views of removed products must not be used, the row may belong to another product.
+    """
+
+    __slots__ = ("_inventory", "_row")
+
+    def __init__(self, inventory, row: int):
+        self._inventory = inventory
+        self._row = row
+
+    @property
+    def id(self):
+        return self._inventory._ids[self._row]
+
+    @property
+    def name(self):
+        return self._inventory._names[self._row]
+
+    @property
+    def category(self):
+        inventory = self._inventory
+        return inventory._category_names[inventory._categories[self._row]]
+
+    @property
+    def price(self):
+        return self._inventory._prices[self._row]
+
+    @price.setter
+    def price(self, value: float):
+        if value <= 0:
+            raise ValueError("Price must be greater than 0.")
+        self._inventory._prices[self._row] = value
+
+    @property
+    def base_price(self):
+        return self._inventory._base_prices[self._row]
+
+    @base_price.setter
+    def base_price(self, value: float):
+        if value <= 0:
+            raise ValueError("Base price must be greater than 0.")
+        self._inventory._base_prices[self._row] = value
+        self._inventory._prices[self._row] = value  # Same rule as Product, the price follows the base price
+
+    @property
+    def quantity(self):
+        return self._inventory._quantities[self._row]
+
+    @quantity.setter
+    def quantity(self, value: int):
+        if value < 0:
+            raise ValueError("Quantity cannot be negative.")
+        self._inventory._quantities[self._row] = value
+
+    @property
+    def entry_date(self):
+        return _from_ordinal(self._inventory._entry_dates[self._row])
+
+    @property
+    def exit_date(self):
+        return _from_ordinal(self._inventory._exit_dates[self._row])
+
+    def register_entry(self, quantity: int):
+        if quantity <= 0:
+            raise ValueError("Quantity must be greater than 0.")
+        self._inventory._quantities[self._row] += quantity
+
+    def register_exit(self, quantity: int):
+        if quantity <= 0:
+            raise ValueError("Quantity must be greater than 0.")
+        if quantity > self.quantity:
+            raise ValueError("Not enough units in stock.")
+        self._inventory._quantities[self._row] -= quantity
+
+    def __str__(self):
+        exit_date_str = self.exit_date if self.exit_date else "N/A"
+        return (
+                f"ID: {self.id}, Name: {self.name}, Price: ${self.price:.2f}, "
+                f"Quantity: {self.quantity}, Category: {self.category}, "
+                f"Entry Date: {self.entry_date}, Exit Date: {exit_date_str}"
+                )
+
+
+class ColumnarInventory:
+    """
+    Memory compact inventory for large catalogs. Every field is stored in its own column:
+    ids, prices, base prices, quantities and dates in typed arrays, names in a list and
+    categories as small integer codes into a shared table. Products are handed out as ProductView.
+    It does not keep a quantity history and does not show dialogs.
+
+    Methods:
+        add(id, name, price, quantity, category, entry_date, exit_date=None, base_price=None):
+            Appends a product, raising ValueError if the ID is already used.
+        add_product(self, product: Product):
+            Copies the fields of a Product into the columns.
+        remove_product(self, id: int) -> bool:
+            Removes a product by swapping the last row into its place (the order is not kept).
+        search_product(self, id: int) -> ProductView | None:
+            Returns a view of the product with that ID if found.
+        products:
+            Iterates views over every row.
+        load_csv_stream(self, filename: str, chunk_size: int, progress) -> LoadResult:
+            Replaces the content with the products of a CSV file, like Inventory.load_csv_stream.
+    """
+
+    def __init__(self):
+        self._ids = array("q")
+        self._prices = array("d")
+        self._base_prices = array("d")
+        self._quantities = array("q")
+        self._entry_dates = array("i")
+        self._exit_dates = array("i")
+        self._categories = array("I")
+        self._names = []
+        self._category_names = []   # code -> category
+        self._category_codes = {}   # category -> code
+        self._rows = {}             # id -> row
+
+    def __len__(self):
+        return len(self._ids)
+
+    @property
+    def products(self):
+        return (ProductView(self, row) for row in range(len(self._ids)))
+
+    def _category_code(self, category: str):
+        code = self._category_codes.get(category)
+        if code is None:
+            code = len(self._category_names)
+            self._category_codes[category] = code
+            self._category_names.append(category)
+        return code
+
+    def add(self, id: int, name: str, price: float, quantity: int, category: str, entry_date: date,
+            exit_date: date = None, base_price: float = None):
+        if id in self._rows:
+            raise ValueError("The product already exists in the inventory.")
+        self._rows[id] = len(self._ids)
+        self._ids.append(id)
+        self._names.append(name)
+        self._prices.append(price)
+        self._base_prices.append(base_price if base_price is not None else price)
+        self._quantities.append(quantity)
+        self._categories.append(self._category_code(category))
+        self._entry_dates.append(_to_ordinal(entry_date))
+        self._exit_dates.append(_to_ordinal(exit_date))
+
+    def add_product(self, product):
+        self.add(product.id, product.name, product.price, product.quantity, product.category,
+                 product.entry_date, product.exit_date, product.base_price)
+
+    def remove_product(self, id: int):
+        row = self._rows.pop(id, None)
+        if row is None:
+            return False
+        last = len(self._ids) - 1
+        if row != last:
+            for column in (self._ids, self._names, self._prices, self._base_prices, self._quantities,
+                           self._categories, self._entry_dates, self._exit_dates):
+                column[row] = column[last]
+            self._rows[self._ids[row]] = row
+        for column in (self._ids, self._names, self._prices, self._base_prices, self._quantities,
+                       self._categories, self._entry_dates, self._exit_dates):
+            column.pop()
+        return True
+
+    def search_product(self, id: int):
+        row = self._rows.get(id)
+        return ProductView(self, row) if row is not None else None
+
+    def load_csv_stream(self, filename: str = "inventory.csv", chunk_size: int = DEFAULT_CHUNK_SIZE, progress=None):
+        self.__init__()
+        result = LoadResult(filename)
+        for chunk in iter_product_chunks(filename, result, chunk_size, progress):
+            for product in chunk:
+                try:
+                    self.add_product(product)
+                except ValueError as e:
+                    result.loaded -= 1
+                    result.rejected += 1
+                    if len(result.rejects) < 1000:
+                        result.rejects.append((None, [str(product.id), product.name], str(e)))
+        return result
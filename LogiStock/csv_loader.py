@@ -0,0 +1,162 @@
+import csv
+import os
+from itertools import starmap
+from product import Product
+from schema import PRODUCT_SCHEMA
+
+CSV_FIELDS = ["id", "name", "price", "base_price", "quantity", "category", "entry_date", "exit_date"]
+DEFAULT_CHUNK_SIZE = 10000
+VALIDATION_BATCH = 1000  # Rows validated together; larger batches keep more raw rows alive for the gc to scan
+JOURNAL_BASE = "base="    # Last field of a journal header: the csv the journal applies to
+
+
+class LoadResult:
+    """
+    Summary of a streaming CSV load.
+
+    Attributes:
+        filename (str): The file that was read.
+        loaded (int): Number of rows turned into products.
+        rejects (list): (line_number, row, error message) for the rows that could not be loaded.
+            Only the first max_rejects are kept, rejected counts all of them.
+        rejected (int): Total number of rejected rows.
+    """
+
+    def __init__(self, filename: str):
+        self.filename = filename
+        self.loaded = 0
+        self.rejects = []
+        self.rejected = 0
+
+    @property
+    def ok(self):
+        return self.rejected == 0
+
+    def __str__(self):
+        return f"{self.loaded} products loaded from {self.filename}, {self.rejected} rows rejected."
+
+
+def _parse_row(row: list, columns: dict):
+    """ Builds a Product from a raw csv row, raising ValueError if a field is invalid """
+    record, errors = PRODUCT_SCHEMA.validate_row(row, columns)
+    if errors:
+        raise ValueError("; ".join(message for _, message in errors))
+    return Product(*record)
+
+
+def _parse_batch(rows: list, lines: list, short: list, columns: dict, result: LoadResult, max_rejects: int):
+    """
+    Validates a batch of raw csv rows in one pass, recording the invalid ones in result together with
+    short, the (line, row, message) of the rows of the batch that had too few fields, in line order
+    """
+    report = PRODUCT_SCHEMA.validate_batch(rows, columns) if rows else None
+    rejects = list(short)
+    if report is not None and not report.ok:
+        rejects += [(lines[position], rows[position], message) for position, message in report.row_errors().items()]
+        rejects.sort(key=lambda reject: reject[0])
+    result.rejected += len(rejects)
+    result.rejects += rejects[:max(0, max_rejects - len(result.rejects))]
+    return list(starmap(Product, report.records)) if report is not None else []
+
+
+def iter_product_chunks(filename: str, result: LoadResult, chunk_size: int = DEFAULT_CHUNK_SIZE,
+                        progress=None, max_rejects: int = 1000):
+    """
+    Reads the csv file lazily and yields lists of at most chunk_size products.
+    Bad rows are recorded in result instead of stopping the load.
+    progress, if given, is called after each chunk as progress(rows_read, bytes_read, total_bytes).
+    """
+    total_bytes = os.path.getsize(filename)
+    bytes_read = 0
+
+    with open(filename, mode="r", encoding="utf-8", newline="") as file:
+        def lines():
+            nonlocal bytes_read
+            for line in file:
+                bytes_read += len(line)
+                yield line
+
+        reader = csv.reader(lines())
+        header = next(reader, None)
+        if header is None:
+            return
+        missing = [field for field in CSV_FIELDS if field not in header]
+        if missing:
+            raise ValueError(f"Missing columns in {filename}: {', '.join(missing)}")
+        columns = {field: header.index(field) for field in CSV_FIELDS}
+        width = len(header)
+
+        rows, line_numbers = [], []  # Raw rows of the next validation batch and their line numbers
+        short = []  # Rows of the batch with too few fields, rejected with it to keep the rejects in line order
+        chunk = []
+        rows_read = 0
+        for row in reader:
+            rows_read += 1
+            if not row:
+                continue
+            if len(row) < width:
+                short.append((reader.line_num, row, f"Expected {width} fields, got {len(row)}."))
+                continue
+            rows.append(row)
+            line_numbers.append(reader.line_num)
+            if len(rows) < min(VALIDATION_BATCH, chunk_size - len(chunk)):
+                continue
+
+            chunk += _parse_batch(rows, line_numbers, short, columns, result, max_rejects)
+            rows, line_numbers, short = [], [], []
+            if len(chunk) >= chunk_size:
+                result.loaded += len(chunk)
+                yield chunk
+                chunk = []
+                if progress:
+                    progress(rows_read, bytes_read, total_bytes)
+
+        if rows or short:
+            chunk += _parse_batch(rows, line_numbers, short, columns, result, max_rejects)
+        if chunk:
+            result.loaded += len(chunk)
+            yield chunk
+        if progress:
+            progress(rows_read, total_bytes, total_bytes)
+
+
+def journal_base(csv_path: str):
+    """
+    Identifies the csv file a journal was started on by its size and modification time: a full save
+    replaces the file, so a journal left behind by a crash before its removal no longer matches.
+    """
+    stat = os.stat(csv_path)
+    return f"{JOURNAL_BASE}{stat.st_size}:{stat.st_mtime_ns}"
+
+
+def journal_is_stale(header: list, csv_path: str):
+    """ True if the journal with that header row was started on another version of csv_path """
+    base = header[-1] if header and header[-1].startswith(JOURNAL_BASE) else None
+    return base is not None and (not os.path.exists(csv_path) or base != journal_base(csv_path))
+
+
+def iter_journal(path: str, result: LoadResult, csv_path: str = None):
+    """
+    Yields (op, product_id, product) for each row of a save journal written by csv_writer.append_journal.
+    product is None for deletes. Bad rows are recorded in result and skipped. With csv_path, a journal
+    started on another version of that csv (see journal_base) yields nothing.
+    """
+    with open(path, mode="r", encoding="utf-8", newline="") as file:
+        reader = csv.reader(file)
+        header = next(reader, None)
+        if header is None or (csv_path is not None and journal_is_stale(header, csv_path)):
+            return
+        columns = {field: header.index(field) for field in ["op"] + CSV_FIELDS}
+        for row in reader:
+            if not row:
+                continue
+            try:
+                op = row[columns["op"]]
+                if op == "D":
+                    yield op, int(row[columns["id"]]), None
+                else:
+                    product = _parse_row(row, columns)
+                    yield op, product.id, product
+            except (ValueError, TypeError, IndexError) as e:
+                result.rejected += 1
+                result.rejects.append((reader.line_num, row, f"Journal: {e}"))
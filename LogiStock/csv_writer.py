@@ -0,0 +1,87 @@
+import csv
+import os
+import tempfile
+from csv_loader import CSV_FIELDS, journal_base, journal_is_stale
+
+JOURNAL_SUFFIX = ".journal"
+JOURNAL_FIELDS = ["op"] + CSV_FIELDS
+UPSERT = "U"
+DELETE = "D"
+
+
+def journal_path(filename: str):
+    return filename + JOURNAL_SUFFIX
+
+
+def product_to_row(product):
+    """ Returns the product fields in the order of CSV_FIELDS """
+    return [
+        product.id,
+        product.name,
+        product.price,
+        product.base_price,  # Save the base price on the csv
+        product.quantity,
+        product.category,
+        product.entry_date.isoformat() if product.entry_date else "",
+        product.exit_date.isoformat() if product.exit_date else ""
+    ]
+
+
+def write_csv_atomic(filename: str, products):
+    """
+    Writes all the products to a temporary file in the same folder and renames it over filename,
+    so a crash in the middle of a save never leaves a half written inventory. Returns the row count.
+    """
+    folder = os.path.dirname(os.path.abspath(filename))
+    fd, tmp_path = tempfile.mkstemp(prefix=".inventory-", suffix=".tmp", dir=folder)
+    rows = 0
+    try:
+        with os.fdopen(fd, mode="w", newline="", encoding="utf-8") as file:
+            writer = csv.writer(file)
+            writer.writerow(CSV_FIELDS)
+            for product in products:
+                writer.writerow(product_to_row(product))
+                rows += 1
+            file.flush()
+            os.fsync(file.fileno())
+        os.replace(tmp_path, filename)
+    except BaseException:
+        if os.path.exists(tmp_path):
+            os.remove(tmp_path)
+        raise
+    return rows
+
+
+def append_journal(filename: str, changed_products, removed_ids):
+    """
+    Appends the changed products (upserts) and the removed IDs (deletes) to the journal of filename.
+    A new journal records in its header which version of filename it applies to (see journal_base);
+    a journal left by a full save that crashed before removing it is started over. Returns the number
+    of rows appended.
+    """
+    path = journal_path(filename)
+    new_file = not os.path.exists(path)
+    if not new_file:
+        with open(path, mode="r", newline="", encoding="utf-8") as file:
+            header = next(csv.reader(file), None)
+        new_file = header is None or journal_is_stale(header, filename)
+    rows = 0
+    with open(path, mode="w" if new_file else "a", newline="", encoding="utf-8") as file:
+        writer = csv.writer(file)
+        if new_file:
+            writer.writerow(JOURNAL_FIELDS + [journal_base(filename)])
+        for id in removed_ids:
+            writer.writerow([DELETE, id] + [""] * (len(CSV_FIELDS) - 1))
+            rows += 1
+        for product in changed_products:
+            writer.writerow([UPSERT] + product_to_row(product))
+            rows += 1
+        file.flush()
+        os.fsync(file.fileno())
+    return rows
+
+
+def remove_journal(filename: str):
+    path = journal_path(filename)
+    if os.path.exists(path):
+        os.remove(path)
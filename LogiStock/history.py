@@ -0,0 +1,164 @@
+from array import array
+from bisect import bisect_left, bisect_right
+from datetime import datetime, timedelta
+
+DEFAULT_MAX_ENTRIES = 512
+_EPOCH = datetime(1970, 1, 1)
+_MICROSECOND = timedelta(microseconds=1)
+
+
+def _to_micros(when: datetime):
+    return (when - _EPOCH) // _MICROSECOND
+
+
+def _from_micros(micros: int):
+    return _EPOCH + timedelta(microseconds=micros)
+
+
+class QuantityHistory:
+    """
+    Movement history of one product: (datetime, quantity) pairs in chronological order.
+
+    Timestamps are stored as microsecond offsets from the first entry and quantities as integers,
+    both in array columns, instead of a list of (datetime, int) tuples. Offsets keep growing,
+    so lookups by time are binary searches. Neither column is delta encoded: a binary search needs
+    absolute offsets and analytics.py sums slices of both columns in C, which a varint stream would
+    turn into a Python decoding loop. Most products never move after they are added, so a history with
+    a single entry keeps its quantity inline and the columns are only created on the second record.
+    benchmarks/bench_memory.py measures the bytes per product.
+
+    Retention:
+        max_entries (int): When the history grows past it, the older half is downsampled by keeping
+            every second entry (the later one of each pair, so quantity_at stays exact on the kept points).
+        max_age (timedelta | None): Entries older than this are dropped on the next record, except the
+            newest of them, which is kept as the baseline for quantity_at.
+
+    Methods:
+        record(self, quantity: int, when: datetime = None):
+            Adds an entry, by default at the current time.
+        quantity_at(self, when: datetime) -> int | None:
+            Quantity in stock at that moment, None if it is before the first entry.
+        between(self, start: datetime, end: datetime) -> list:
+            (datetime, quantity) entries with start <= datetime <= end.
+        columns(self) -> tuple:
+            (offsets, quantities) arrays, offsets in microseconds from the first entry.
+        copy(self) -> QuantityHistory:
+            Independent copy, with the same retention.
+    """
+
+    __slots__ = ("_base", "_first", "_offsets", "_quantities", "max_entries", "max_age")
+
+    def __init__(self, entries=(), max_entries: int = DEFAULT_MAX_ENTRIES, max_age: timedelta = None):
+        self._base = None
+        self._first = None  # Quantity of the only entry, until the columns are created
+        self._offsets = None
+        self._quantities = None
+        self.max_entries = max_entries
+        self.max_age = max_age
+        for when, quantity in entries:
+            self.record(quantity, when)
+
+    def record(self, quantity: int, when: datetime = None):
+        self._add(_to_micros(when if when is not None else datetime.now()), quantity)
+        self._apply_retention()
+
+    def _add(self, micros: int, quantity: int):
+        if self._base is None:
+            self._base, self._first = micros, quantity
+            return
+        if self._offsets is None:
+            self._offsets, self._quantities, self._first = array("q", (0,)), array("q", (self._first,)), None
+        offset = micros - self._base
+        if offset < self._offsets[-1]:
+            offset = self._offsets[-1]  # Keep the history sorted if the clock goes back
+        self._offsets.append(offset)
+        self._quantities.append(quantity)
+
+    def columns(self):
+        """ (offsets, quantities): the entries as array columns; a history with one entry gets new arrays """
+        if self._offsets is not None:
+            return self._offsets, self._quantities
+        if self._base is None:
+            return array("q"), array("q")
+        return array("q", (0,)), array("q", (self._first,))
+
+    def append(self, entry):
+        """ Same as record, for code that still appends (datetime, quantity) tuples like to the old list """
+        when, quantity = entry
+        self.record(quantity, when)
+
+    def raw_entries(self):
+        """ Yields (microseconds since 1970, quantity) pairs, the format used by the storage backends """
+        base = self._base
+        for offset, quantity in zip(*self.columns()):
+            yield base + offset, quantity
+
+    def copy(self):
+        history = QuantityHistory(max_entries=self.max_entries, max_age=self.max_age)
+        history._base, history._first = self._base, self._first
+        if self._offsets is not None:
+            history._offsets, history._quantities = self._offsets[:], self._quantities[:]
+        return history
+
+    @classmethod
+    def from_raw(cls, entries, max_entries: int = DEFAULT_MAX_ENTRIES, max_age: timedelta = None):
+        """ Builds a history from (microseconds since 1970, quantity) pairs sorted by time """
+        history = cls(max_entries=max_entries, max_age=max_age)
+        for micros, quantity in entries:
+            history._add(micros, quantity)
+        history._apply_retention()
+        return history
+
+    def _apply_retention(self):
+        if self._offsets is None:  # A single entry is always kept
+            return
+        if self.max_age is not None:
+            cutoff = _to_micros(datetime.now() - self.max_age) - self._base
+            old = bisect_left(self._offsets, cutoff) - 1  # Keep the newest old entry as the baseline
+            if old > 0:
+                del self._offsets[:old]
+                del self._quantities[:old]
+        while self.max_entries and len(self._offsets) > self.max_entries:
+            half = len(self._offsets) // 2
+            half -= half % 2
+            if half < 2:  # Too small to downsample, drop the oldest entry
+                del self._offsets[0]
+                del self._quantities[0]
+                continue
+            self._offsets[:half] = self._offsets[1:half:2]
+            self._quantities[:half] = self._quantities[1:half:2]
+
+    def __len__(self):
+        if self._offsets is None:
+            return 0 if self._base is None else 1
+        return len(self._offsets)
+
+    def __bool__(self):
+        return self._base is not None
+
+    def __getitem__(self, index: int):
+        offsets, quantities = self.columns()
+        return _from_micros(self._base + offsets[index]), quantities[index]
+
+    def __iter__(self):
+        base = self._base
+        for offset, quantity in zip(*self.columns()):
+            yield _from_micros(base + offset), quantity
+
+    def quantity_at(self, when: datetime):
+        if self._base is None:
+            return None
+        offsets, quantities = self.columns()
+        index = bisect_right(offsets, _to_micros(when) - self._base) - 1
+        return quantities[index] if index >= 0 else None
+
+    def between(self, start: datetime, end: datetime):
+        if self._base is None:
+            return []
+        offsets = self.columns()[0]
+        first = bisect_left(offsets, _to_micros(start) - self._base)
+        last = bisect_right(offsets, _to_micros(end) - self._base)
+        return [self[i] for i in range(first, last)]
+
+    def __repr__(self):
+        return f"QuantityHistory({len(self)} entries)"
@@ -0,0 +1,193 @@
+import functools
+import inspect
+import json
+import threading
+import time
+
+BUCKETS = 40  # Bucket i holds the calls that took [2 ** (i - 1), 2 ** i) microseconds, bucket 0 under 1 µs
+
+
+class LatencyHistogram:
+    """
+    Latencies of one operation in power of two buckets of microseconds: constant memory and a
+    constant cost per call, with percentiles accurate to a factor of two.
+
+    Attributes:
+        count (int): Calls measured.
+        errors (int): Calls that raised an exception.
+        total (float): Seconds spent in all the calls.
+        max (float): Slowest call, in seconds.
+    """
+
+    __slots__ = ("buckets", "count", "errors", "total", "max")
+
+    def __init__(self):
+        self.buckets = [0] * BUCKETS
+        self.count = 0
+        self.errors = 0
+        self.total = 0.0
+        self.max = 0.0
+
+    def add(self, seconds: float):
+        self.buckets[min(int(seconds * 1e6).bit_length(), BUCKETS - 1)] += 1
+        self.count += 1
+        self.total += seconds
+        if seconds > self.max:
+            self.max = seconds
+
+    def percentile(self, pct: float):
+        ''' Upper bound in seconds of the bucket that holds the pct percentile, 0 if nothing was measured '''
+        if not self.count:
+            return 0.0
+        target = self.count * pct / 100
+        seen = 0
+        for i, calls in enumerate(self.buckets):
+            seen += calls
+            if calls and seen >= target:
+                return min((1 << i) / 1e6, self.max)
+        return self.max
+
+    def to_dict(self):
+        return {"count": self.count, "errors": self.errors, "total_s": self.total,
+                "mean_s": self.total / self.count if self.count else 0.0, "max_s": self.max,
+                "p50_s": self.percentile(50), "p90_s": self.percentile(90), "p99_s": self.percentile(99),
+                "buckets_us": {f"<{1 << i}": calls for i, calls in enumerate(self.buckets) if calls}}
+
+
+class Instrumentation:
+    """
+    Opt-in timers and counters for the inventory core.
+
+    enable() replaces the public methods of Inventory, Product and Report (and the report writer)
+    with wrappers that time every call into a LatencyHistogram, and subscribes to the failures of
+    validation.validate_inputs. disable() puts the original methods back, so when it is off there
+    is no wrapper left and the cost is zero. Property accessors (Product.quantity, price) are not
+    wrapped: they are too small to measure and too hot to slow down.
+
+    Methods:
+        enable(self) / disable(self):
+            Installs or removes the wrappers.
+        count(self, name: str, amount: int = 1):
+            Increments a counter.
+        snapshot(self) -> dict:
+            Histograms and counters, ready for json.
+        export_json(self, path: str):
+            Writes snapshot() to a file.
+        report(self) -> str:
+            Text table of the operations, slowest total first.
+        reset(self):
+            Forgets everything measured.
+    """
+
+    def __init__(self):
+        self.enabled = False
+        self.histograms = {}
+        self.counters = {}
+        self._patched = []  # (owner class, attribute name, original attribute)
+        self._lock = threading.Lock()
+
+    def _targets(self):
+        from inventory import Inventory
+        from product import Product
+        from report import Report
+        import report
+        targets = []  # (owner, attribute name, attribute, label)
+        for cls in (Inventory, Product, Report):
+            for name, attribute in vars(cls).items():
+                if not name.startswith("_") or name == "_generate_report_logic":
+                    targets.append((cls, name, attribute, f"{cls.__name__}.{name}"))
+        targets.append((report, "write_report", report.write_report, "write_report"))
+        return targets
+
+    def _wrap(self, name: str, func):
+        histogram = self.histograms.get(name)
+        if histogram is None:
+            histogram = self.histograms[name] = LatencyHistogram()
+        lock = self._lock
+        clock = time.perf_counter
+
+        @functools.wraps(func)
+        def timed(*args, **kwargs):
+            start = clock()
+            try:
+                return func(*args, **kwargs)
+            except BaseException:
+                with lock:
+                    histogram.errors += 1
+                raise
+            finally:
+                elapsed = clock() - start
+                with lock:
+                    histogram.add(elapsed)
+        return timed
+
+    def enable(self):
+        if self.enabled:
+            return
+        import validation
+        for owner, name, attribute, label in self._targets():
+            if isinstance(attribute, (staticmethod, classmethod)):
+                wrapped = type(attribute)(self._wrap(label, attribute.__func__))
+            elif inspect.isfunction(attribute):
+                wrapped = self._wrap(label, attribute)
+            else:
+                continue  # Properties and constants
+            setattr(owner, name, wrapped)
+            self._patched.append((owner, name, attribute))
+        validation.failure_listeners.append(self._validation_failed)
+        self.enabled = True
+
+    def disable(self):
+        if not self.enabled:
+            return
+        import validation
+        for owner, name, attribute in reversed(self._patched):
+            setattr(owner, name, attribute)
+        self._patched = []
+        if self._validation_failed in validation.failure_listeners:
+            validation.failure_listeners.remove(self._validation_failed)
+        self.enabled = False
+
+    def _validation_failed(self, function: str, field: str, message: str):
+        self.count("validate_inputs.failures")
+        self.count(f"validate_inputs.failures.{function}.{field}")
+
+    def count(self, name: str, amount: int = 1):
+        with self._lock:
+            self.counters[name] = self.counters.get(name, 0) + amount
+
+    def reset(self):
+        with self._lock:
+            for histogram in self.histograms.values():
+                histogram.__init__()
+            self.counters.clear()
+
+    def snapshot(self):
+        with self._lock:
+            return {
+                "enabled": self.enabled,
+                "operations": {name: histogram.to_dict() for name, histogram in sorted(self.histograms.items())
+                               if histogram.count},
+                "counters": dict(sorted(self.counters.items())),
+            }
+
+    def export_json(self, path: str):
+        with open(path, "w", encoding="utf-8") as file:
+            json.dump(self.snapshot(), file, indent=2)
+
+    def report(self):
+        data = self.snapshot()
+        lines = [f"{'operation':42}{'calls':>9}{'total':>11}{'p50':>10}{'p99':>10}{'max':>10}"]
+        operations = sorted(data["operations"].items(), key=lambda item: -item[1]["total_s"])
+        for name, stats in operations:
+            lines.append(f"{name:42}{stats['count']:9}{stats['total_s']:10.3f}s"
+                         f"{stats['p50_s'] * 1000:8.3f}ms{stats['p99_s'] * 1000:8.3f}ms{stats['max_s'] * 1000:8.1f}ms")
+        if not operations:
+            lines.append("Nothing measured yet." if self.enabled else "Instrumentation is disabled.")
+        for name, value in data["counters"].items():
+            lines.append(f"{name}: {value}")
+        return "\n".join(lines)
+
+
+# Shared instance, like notifier.notifier
+instrumentation = Instrumentation()
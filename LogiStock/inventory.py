@@ -1,62 +1,460 @@
 import os
-import csv
+import threading
+from array import array
+from contextlib import nullcontext
+from datetime import datetime
+from bisect import bisect_left, insort
 from product import Product
-from tkinter import messagebox
-from datetime import date, datetime
+from aggregates import InventoryAggregates
+from search import SearchIndex
+from query import Page, QueryIndexes, matcher, product_row
+from locks import all_product_locks, product_lock
+from csv_loader import DEFAULT_CHUNK_SIZE, LoadResult, iter_journal, iter_product_chunks
+from movements import plan_movements
+from pricing import apply_prices, discount_factor, scale_prices
+from csv_writer import append_journal, journal_path, remove_journal, write_csv_atomic
+from notifier import notifier
+from wal import WriteAheadLog, apply_record
 
 class Inventory:
     """
+    Core inventory store. It never shows dialogs: methods return their result (True/False, counts or
+    result objects) and the messages for the user are sent through notifier.notifier.
+
+    Thread safety: adding, removing, loading and saving take the inventory lock; quantity and price
+    changes take the striped lock of the product (locks.product_lock), and batch operations take
+    every stripe. Readers iterate products, an immutable snapshot, so a report in another thread
+    never sees the product list change under it.
+
     Attributes:
-        products (list): A list that stores all products in the inventory.
+        products (tuple): Snapshot of all products in the inventory, in insertion order. It is rebuilt
+            on first access after products are added or removed. The primary store is a dict keyed
+            by product ID, so lookups by ID are O(1).
+        version (int): Increases every time products are added, removed or reloaded.
+        aggregates (InventoryAggregates): Stock value, units per category and low stock products,
+            updated on every change (see aggregates.py).
+        wal (WriteAheadLog | None): Log of every change, attached by open_log (see wal.py).
 
     Methods:
         add_product(self, product: Product):
             Adds a new product to the inventory if its ID is not already in use.
+        add_products(self, products) -> list:
+            Adds many products as one logged transaction and returns the ones whose ID was already in use.
         remove_product(self, product_id: int):
             Removes a product from the inventory by its ID, if found.
         list_inventory(self):
             Displays all current products in the inventory.
+        page(self, offset: int, limit: int) -> list:
+            Returns a slice of the products, for views that only show a screenful.
+        query(self, order_by: str = None, descending: bool = False, offset: int = 0, limit: int = 50, after = None, **filters) -> Page:
+            One page of ProductRow tuples, filtered and sorted through presorted indexes (see query.py).
+        iter_rows(self, order_by: str = None, descending: bool = False, page_size: int = 1000, **filters):
+            Iterates over every row of a query, a page at a time.
+        subscribe(self, callback):
+            Registers callback(event, product) to follow additions, removals, changes and reloads.
         search_product(self, product_id: int) -> Product | None:
             Searches for a product by its ID and returns it if found, otherwise returns None.
+        search_by_category(self, category: str) -> list:
+            Returns the products of a category using the category index.
+        search_by_name_prefix(self, prefix: str) -> list:
+            Returns the products whose name starts with prefix (case insensitive).
+        search_text(self, query: str, limit: int = 50) -> list:
+            Ranked search by partial names and categories, tolerant to typos.
+        stock_summary(self) -> StockSummary, category_summary(self) -> dict:
+            Stock value and units, in total and per category, read from the running aggregates.
+        low_stock_products(self) -> list, lowest_stock(self, n: int) -> list:
+            Products under the low stock threshold, and the n products with the least stock.
+        apply_bulk_discount(self, discount_pct: float, category: str = None, predicate = None, incremental: bool = False):
+            Applies a discount to all the products of a category and/or matching a predicate, returns a PricingSummary.
+        reset_prices(self, category: str = None, predicate = None):
+            Resets the price of the selected products to their base price.
+        apply_movements(self, batch) -> MovementResult:
+            Validates and applies many (product_id, +/-quantity) entries and exits as one transaction.
         update_quantity(self, product_id: int, new_quantity: int):
             Updates the quantity of an existing product by its ID.
         load_from_csv(self, filename: str = "inventory.csv"):
             Loads products and information from a CSV file into the inventory.
-        save_to_csv(self, filename: str = "inventory.csv"):
+        load_csv_stream(self, filename: str = "inventory.csv", chunk_size: int, progress) -> LoadResult:
+            Streams a CSV file into the inventory in chunks, collecting invalid rows instead of failing.
+        open_storage(self, storage, lazy: bool = False):
+            Loads from a CsvStorage or SqliteStorage (or opens it lazily) and keeps it for save_storage().
+        save_storage(self) -> int:
+            Saves the pending changes to the opened storage.
+        save_to_csv(self, filename: str = "inventory.csv", journal: bool = False):
             Saves the current inventory data to a CSV file.
+        save_csv(self, filename: str = "inventory.csv", journal: bool = False) -> int:
+            Atomic save without dialogs. In journal mode only the changed products are appended.
+        open_log(self, path: str, **options) -> int:
+            Recovers the inventory from a write-ahead log and its checkpoint, then logs every change to it.
+        checkpoint_log(self) -> int, close_log(self):
+            Compact the log into its checkpoint file; flush and detach it.
     """
 
     def __init__(self):
-        self.products = []
+        self._products = {}       # id -> Product, keeps insertion order
+        self._by_category = {}    # category -> {id: None}, an ordered set of ids
+        self._name_index = []     # sorted list of (lowercase name, id) for prefix searches
+        self._dirty_ids = {}      # ids added or changed since the last save, an ordered set
+        self._removed_ids = {}    # ids removed since the last save
+        self._saved_filename = None  # csv file that matches the inventory once the dirty changes are applied
+        self._journal_rows = 0
+        self.journal_compact_ratio = 0.1  # rewrite the whole csv once the journal exceeds this share of products
+        self._subscribers = []    # callback(event, product) for "added", "removed", "changed" and "reset"
+        self.storage = None       # CsvStorage / SqliteStorage opened with open_storage
+        self._lazy = False        # True if products are read from storage on demand
+        self._lock = threading.RLock()
+        self._snapshot = None     # tuple of products, None when it must be rebuilt
+        self.version = 0
+        self.aggregates = InventoryAggregates(self._products, source_lock=self._lock)  # Running totals, kept current on every change
+        self.search_index = SearchIndex(self._products)  # Words of names and categories, built on the first search
+        self.query_indexes = QueryIndexes(self._products, self._by_category, self._name_index)  # Built per sort field on demand
+        self.wal = None           # WriteAheadLog opened with open_log
+
+    def _require_loaded(self, operation: str):
+        ''' Operations over the whole catalog would only see the products read so far from a lazy storage '''
+        if self._lazy:
+            raise ValueError(f"The inventory was opened lazily from {self.storage.path}, "
+                             f"load it completely before {operation}.")
+
+    def _invalidate_snapshot(self):
+        self._snapshot = None
+        self.version += 1
+
+    @property
+    def products(self):
+        if self._lazy:
+            self._require_loaded("reading every product")
+        snapshot = self._snapshot
+        if snapshot is None:
+            with self._lock:
+                snapshot = self._snapshot
+                if snapshot is None:
+                    snapshot = self._snapshot = tuple(self._products.values())
+        return snapshot
+
+    def subscribe(self, callback):
+        '''
+        Registers callback(event, product) to follow the changes of the inventory: "added", "removed",
+        "changed" (a quantity, price or date of product changed) and "reset" (product is None, the whole
+        inventory was replaced, e.g. by a load). Callbacks run in the thread that made the change.
+        '''
+        self._subscribers.append(callback)
+        return callback
+
+    def unsubscribe(self, callback):
+        if callback in self._subscribers:
+            self._subscribers.remove(callback)
+
+    def _notify(self, event: str, product: Product = None):
+        for callback in self._subscribers:
+            callback(event, product)
+
+    def _emit(self, event: str, product: Product = None):
+        self._notify(event, product)  # Before any I/O, so a failed checkpoint does not hide the reset
+        if event == "reset" and self.wal is not None:
+            if self._lazy:
+                # The log replays over a checkpoint of every product, which a lazy inventory never holds:
+                # its storage keeps it instead
+                self.close_log()
+                notifier.warning("Warning", "The write-ahead log was closed: a lazily opened inventory is only kept by its storage.")
+            else:
+                self.checkpoint_log()  # The log cannot replay a load, the loaded state becomes its checkpoint
+
+    def _product_changed(self, product: Product, field: str, old):
+        if self.wal is not None:
+            self.wal.log_change(product, field, old)
+        self._dirty_ids[product.id] = None
+        self.aggregates.changed(product, field, old)
+        self.query_indexes.changed(product, field, old)
+        if self._subscribers:
+            self._emit("changed", product)
+
+    def _index_product(self, product: Product):
+        self._invalidate_snapshot()
+        self._products[product.id] = product
+        product._listener = self._product_changed
+        self._by_category.setdefault(product.category, {})[product.id] = None
+        insort(self._name_index, (product.name.lower(), product.id))
+        self.aggregates.add(product)
+        self.search_index.add(product)
+        self.query_indexes.add(product)
+
+    def _unindex_product(self, product: Product):
+        self._invalidate_snapshot()
+        del self._products[product.id]
+        product._listener = None
+        self.aggregates.remove(product)
+        self.search_index.remove(product)
+        self.query_indexes.remove(product)
+        ids = self._by_category.get(product.category)
+        if ids is not None:
+            ids.pop(product.id, None)
+            if not ids:
+                del self._by_category[product.category]
+        key = (product.name.lower(), product.id)
+        i = bisect_left(self._name_index, key)
+        if i < len(self._name_index) and self._name_index[i] == key:
+            del self._name_index[i]
+
+    def _bulk_add(self, products, result: LoadResult):
+        '''
+        Indexes loaded products without notifications nor dirty marks. The name index is only appended
+        to, the caller sorts it once at the end of the load. Duplicated IDs are rejected in result.
+        '''
+        self._invalidate_snapshot()
+        names = self._name_index
+        added = []
+        for product in products:
+            if product.id in self._products:
+                result.loaded -= 1
+                result.rejected += 1
+                if len(result.rejects) < 1000:
+                    result.rejects.append((None, [str(product.id), product.name], "Duplicate product ID."))
+                continue
+            self._products[product.id] = product
+            product._listener = self._product_changed
+            self._by_category.setdefault(product.category, {})[product.id] = None
+            names.append((product.name.lower(), product.id))
+            added.append(product)
+        self.aggregates.add_many(added)
+        self.search_index.add_many(added)
+        self.query_indexes.clear()  # Sorting again once is cheaper than an insertion per loaded product
+
+    def _clear(self):
+        self._invalidate_snapshot()
+        self._products.clear()
+        self._by_category.clear()
+        self._name_index.clear()
+        self.aggregates.clear()
+        self.search_index.clear()
+        self.query_indexes.clear()
+        self._dirty_ids.clear()
+        self._removed_ids.clear()
+        self._saved_filename = None
+        self._journal_rows = 0
+        self._lazy = False
+
+    def _insert(self, product: Product):
+        ''' Adds product unless its ID is in use; returns False then. The caller holds self._lock '''
+        if product.id in self._products or (self._lazy and self.search_product(product.id) is not None):
+            return False
+        if self.wal is not None:
+            self.wal.log_add(product)
+        self._index_product(product)
+        self._dirty_ids[product.id] = None
+        self._removed_ids.pop(product.id, None)
+        self._emit("added", product)
+        return True
 
     def add_product(self, product: Product):
-        if any(p.id == product.id for p in self.products):
-            messagebox.showwarning("Warning", "The product already exists in the inventory.")
+        with self._lock:
+            exists = not self._insert(product)
+        if exists:
+            notifier.warning("Warning", "The product already exists in the inventory.")
+            return False
         else:
-            self.products.append(product)
-            messagebox.showinfo("Product Added", f"Product {product.name} successfully added to inventory.")
+            notifier.info("Product Added", f"Product {product.name} successfully added to inventory.")
+            return True
+
+    def add_products(self, products):
+        '''
+        Adds the products of a batch import (see schema.IMPORT_SCHEMA) with a single notification instead
+        of one per product. Products whose ID is already in use are skipped and returned.
+        '''
+        duplicates = []
+        with self._lock, self._logged_batch():
+            for product in products:
+                if not self._insert(product):
+                    duplicates.append(product)
+        added = len(products) - len(duplicates)
+        if added:
+            notifier.info("Products Added", f"{added} products added to inventory.")
+        if duplicates:
+            notifier.warning("Warning", f"{len(duplicates)} products already exist in the inventory.")
+        return duplicates
 
     def remove_product(self, id: int):
-        product = self.search_product(id)
+        with self._lock:
+            product = self.search_product(id)
+            if product:
+                if self.wal is not None:
+                    self.wal.log_remove(product.id)
+                self._unindex_product(product)
+                self._dirty_ids.pop(product.id, None)
+                self._removed_ids[product.id] = None
+                self._emit("removed", product)
         if product:
-            self.products.remove(product)
-            messagebox.showinfo("Product Removed", f"Product {product.name} removed successfully from inventory.")
+            notifier.info("Product Removed", f"Product {product.name} removed successfully from inventory.")
+            return True
         else:
-            messagebox.showerror("Error", f"Product with ID {id} not found.")
+            notifier.error("Error", f"Product with ID {id} not found.")
+            return False
 
     def list_inventory(self):
-        inventory_list = "\n=== Current Inventory ===\n"
-        if not self.products:
-            inventory_list += "The inventory is empty."
-        for product in self.products:
-            inventory_list += f"{product}\n"
-        return inventory_list
+        products = self.products
+        if not products:
+            return "\n=== Current Inventory ===\nThe inventory is empty."
+        return "\n=== Current Inventory ===\n" + "".join(f"{product}\n" for product in products)
+
+    def page(self, offset: int, limit: int):
+        ''' Returns at most limit products starting at position offset, in insertion order '''
+        offset = max(offset, 0)
+        return list(self.products[offset:offset + limit])
+
+    def query(self, order_by: str = None, descending: bool = False, offset: int = 0, limit: int = 50, after=None,
+              category: str = None, quantity=None, price=None, entry_date=None):
+        '''
+        Returns a Page of at most limit ProductRow tuples.
+
+        Filters: category, and (low, high) ranges for quantity, price and entry_date (inclusive, None for an
+        open end). Rows are in insertion order, or sorted by order_by (any field of ProductRow) through a
+        presorted index, ties by id. Pages are chosen by offset, or by after=page.next_cursor of the previous
+        page (keyset pagination), which does not have to skip the rows of the earlier pages. Without filters,
+        or with a range on the sort field only, a page costs O(limit) plus a binary search.
+        '''
+        self._require_loaded("querying it")
+        with self._lock:
+            if order_by is None and category is None and quantity is None and price is None and entry_date is None:
+                if after is not None:
+                    raise ValueError("Keyset pagination (after) needs order_by.")
+                return Page([product_row(product) for product in self.page(offset, limit)], None)
+            return self.query_indexes.query(order_by, descending, offset, limit, after, category, quantity, price, entry_date)
+
+    def iter_rows(self, order_by: str = None, descending: bool = False, page_size: int = 1000, **filters):
+        '''
+        Yields every ProductRow of a query (same arguments as query). Sorted queries are read a page at a
+        time with keyset pagination, so the lock is never held for long; insertion order walks the
+        products snapshot, which later changes do not disturb.
+        '''
+        if order_by is None:
+            matches = matcher(**filters)
+            for product in self.products:
+                if matches is None or matches(product):
+                    yield product_row(product)
+            return
+        after = None
+        while True:
+            page = self.query(order_by, descending, limit=page_size, after=after, **filters)
+            yield from page
+            if page.next_cursor is None:
+                return
+            after = page.next_cursor
 
     def search_product(self, id: int):
-        for product in self.products:
-            if product.id == id:
-                return product
-        return None
+        product = self._products.get(id)
+        if product is None and self._lazy and id not in self._removed_ids:
+            with self._lock:
+                product = self._products.get(id)
+                if product is None:
+                    product = self.storage.get(id)  # Primary key lookup, then kept in memory
+                    if product is not None:
+                        self._index_product(product)
+        return product
+
+    def search_by_category(self, category: str):
+        if self._lazy:
+            # Through the category index of the storage, the products not read yet are read now
+            for id in self.storage.ids_by_category(category):
+                self.search_product(id)
+        with self._lock:
+            return [self._products[id] for id in self._by_category.get(category, ())]
+
+    def search_by_name_prefix(self, prefix: str):
+        self._require_loaded("searching it")
+        prefix = prefix.lower()
+        results = []
+        with self._lock:
+            i = bisect_left(self._name_index, (prefix,))
+            while i < len(self._name_index) and self._name_index[i][0].startswith(prefix):
+                results.append(self._products[self._name_index[i][1]])
+                i += 1
+        return results
+
+    def stock_summary(self):
+        ''' StockSummary from the running totals, without a loop over the products '''
+        self._require_loaded("summing its stock")
+        return self.aggregates.summary()
+
+    def category_summary(self):
+        ''' {category: (products, units, value at price)}, from the running totals '''
+        self._require_loaded("summing its stock")
+        return self.aggregates.by_category()
+
+    def low_stock_products(self):
+        ''' Products under aggregates.low_stock_threshold units, lowest stock first '''
+        self._require_loaded("looking for low stock")
+        products = [self._products[id] for id in self.aggregates.low_stock_ids() if id in self._products]
+        products.sort(key=lambda product: (product.quantity, product.id))
+        return products
+
+    def lowest_stock(self, n: int = 10):
+        ''' The n products with the least units, lowest first '''
+        self._require_loaded("looking for low stock")
+        return [self._products[id] for _, id in self.aggregates.lowest(n) if id in self._products]
+
+    def search_text(self, query: str, limit: int = 50):
+        '''
+        Products whose name or category contain every word of query, as whole words, prefixes,
+        substrings or with a typo, best matches first (see search.SearchIndex).
+        '''
+        self._require_loaded("searching it")
+        with self._lock:
+            return self.search_index.search(query, limit)
+
+    def select_products(self, category: str = None, predicate=None):
+        ''' Products of a category (all of them if None) that also satisfy predicate(product), if given '''
+        products = self.search_by_category(category) if category is not None else self.products
+        if predicate is not None:
+            return [product for product in products if predicate(product)]
+        return list(products)
+
+    def apply_bulk_discount(self, discount_pct: float, category: str = None, predicate=None, incremental: bool = False):
+        '''
+        Applies a discount to every selected product (see select_products) in one batch.
+        Like Product.apply_discount the discount is computed over the base price, or over the
+        current price if incremental is True. Raises ValueError for an invalid percentage before
+        touching any price. Returns a PricingSummary instead of printing each product.
+        '''
+        factor = discount_factor(discount_pct)
+        products = self.select_products(category, predicate)
+        operation = "incremental discount" if incremental else "discount"
+        with all_product_locks(), self._logged_batch():
+            if incremental:
+                prices = array("d", [product._price for product in products])
+            else:
+                prices = array("d", [product._base_price for product in products])
+            return apply_prices(products, scale_prices(prices, factor), operation, discount_pct)
+
+    def reset_prices(self, category: str = None, predicate=None):
+        ''' Sets the price of every selected product back to its base price, returns a PricingSummary '''
+        products = self.select_products(category, predicate)
+        with all_product_locks(), self._logged_batch():
+            prices = array("d", [product._base_price for product in products])
+            return apply_prices(products, prices, "reset", 0.0)
+
+    def apply_movements(self, batch):
+        '''
+        Applies a batch of (product_id, quantity) stock movements all or nothing: positive quantities
+        are entries, negative ones exits. The whole batch is validated first; if any movement is
+        invalid nothing changes. Each product gets a single quantity update and history entry.
+        Returns a MovementResult and shows no dialogs.
+        '''
+        # Products cannot be removed nor change stock while the batch is checked and applied
+        with self._lock, all_product_locks(), self._logged_batch():
+            result, new_quantities = plan_movements(batch, self.search_product)
+            if not result.errors:
+                now = datetime.now()  # One timestamp for the whole batch
+                for product, quantity in new_quantities.items():
+                    old = product._quantity
+                    product._quantity = quantity
+                    product.quantity_history.record(quantity, now)
+                    product._changed("quantity", old)
+                result.applied = True
+        return result
+
+    def _logged_batch(self):
+        ''' The changes made inside are logged as one record, replayed all or nothing '''
+        return self.wal.batch() if self.wal is not None else nullcontext()
 
     def update_quantity(self, id: int, new_quantity: int):
         try:
@@ -70,81 +468,207 @@ class Inventory:
             if new_quantity < 0:
                 raise ValueError("Quantity cannot be negative.")  # Exception if new_quantity is negative
 
-            product.quantity = new_quantity
-            self.quantity_history.append((datetime.now(), new_quantity))
-            messagebox.showinfo("Quantity Updated", f"Successfully updated quantity of {product.name} to {product.quantity}.\n")
+            with product_lock(product.id):
+                product.quantity = new_quantity
+            notifier.info("Quantity Updated", f"Successfully updated quantity of {product.name} to {product.quantity}.\n")
+            return True
 
         except (ValueError, TypeError) as e:
-            messagebox.showerror("Error", f"Error in update_quantity: {e}\n")
+            notifier.error("Error", f"Error in update_quantity: {e}\n")
+            return False
 
-    def save_to_csv(self, filename: str = "inventory.csv"):
+    def save_to_csv(self, filename: str = "inventory.csv", journal: bool = False):
         # Saves the current inventory to a CSV file.
-        with open(filename, mode="w", newline="", encoding="utf-8") as file:
-            writer = csv.writer(file)
-            # Encabezado
-            writer.writerow(["id", "name", "price", "base_price", "quantity", "category", "entry_date", "exit_date"])
-            # Datos de cada producto
-            for product in self.products:
-                entry_date_str = product.entry_date.isoformat()
-                exit_date_str = product.exit_date.isoformat() if product.exit_date else ""
-                writer.writerow([
-                    product.id,
-                    product.name,
-                    product.price,
-                    product.base_price,  # Save the base price on the csv
-                    product.quantity,
-                    product.category,
-                    entry_date_str,
-                    exit_date_str
-                ])
-        messagebox.showinfo("Success", f"Inventory saved to {filename} successfully.")
-
-    def load_from_csv(self, filename: str = "inventory.csv"):
-        ''' Loads products and information from a CSV file into the current inventory.'''
-        # Clear the list for "reconstructing" the inventory
-        self.products.clear()
+        try:
+            rows = self.save_csv(filename, journal)
+        except OSError as e:
+            notifier.error("Error", f"Failed to save inventory: {e}")
+            return None
+        notifier.info("Success", f"Inventory saved to {filename} successfully ({rows} rows written).")
+        return rows
+
+    def save_csv(self, filename: str = "inventory.csv", journal: bool = False):
+        '''
+        Saves the inventory without showing dialogs and returns the number of rows written.
+        The full save writes a temporary file and renames it over filename, so it is atomic.
+        With journal=True and filename already holding the last saved state, only the products changed
+        since then are appended to filename + ".journal"; the csv is compacted (fully rewritten) once the
+        journal grows past journal_compact_ratio of the inventory.
+        '''
+        self._require_loaded("saving it to a csv file")
+
+        def write(dirty, removed):
+            compact_limit = max(100, int(len(self._products) * self.journal_compact_ratio))
+            if (journal and filename == self._saved_filename and os.path.exists(filename)
+                    and self._journal_rows + len(dirty) + len(removed) <= compact_limit):
+                changed = [self._products[id] for id in dirty]
+                rows = append_journal(filename, changed, removed)
+                self._journal_rows += rows
+                return rows, changed
+            rows = write_csv_atomic(filename, self._products.values())
+            remove_journal(filename)
+            self._journal_rows = 0
+            return rows, self._products.values()
+
+        return self._save_pending(filename, write)
+
+    def _save_pending(self, target: str, write):
+        '''
+        Runs a save: write(dirty_ids, removed_ids) must store the changes and return (rows written,
+        saved products). The pending ids are swapped out first, so quantity changes made by other
+        threads while writing are kept for the next save; if write fails they are put back.
+        '''
+        with self._lock:
+            with all_product_locks():
+                dirty, removed = self._dirty_ids, self._removed_ids
+                self._dirty_ids, self._removed_ids = {}, {}
+            try:
+                rows, saved_products = write(dirty, removed)
+            except BaseException:
+                with all_product_locks():
+                    dirty.update(self._dirty_ids)
+                    self._dirty_ids = dirty
+                    removed.update(self._removed_ids)
+                    self._removed_ids = removed
+                raise
+            for product in saved_products:
+                product.mark_clean()
+            self._saved_filename = target
+            return rows
 
+    def open_storage(self, storage, lazy: bool = False, chunk_size: int = DEFAULT_CHUNK_SIZE, progress=None):
+        '''
+        Uses storage (see storage.py) as the persistence of the inventory. By default every product is
+        loaded and the LoadResult is returned. With lazy=True and a storage that supports it (SqliteStorage)
+        nothing is loaded: search_product reads products from the storage index when first needed.
+        '''
+        with self._lock:
+            if self.storage is not None and self.storage is not storage:
+                self.storage.close()
+            self.storage = storage
+            if lazy and hasattr(storage, "get"):
+                self._clear()
+                self._lazy = True
+                self._saved_filename = storage.path
+                self._emit("reset")
+                return None
+            return storage.load(self, chunk_size, progress)
+
+    def save_storage(self):
+        ''' Saves the pending changes to the opened storage and returns the rows written '''
+        if self.storage is None:
+            raise ValueError("No storage was opened.")
+        return self.storage.save(self)
+
+    def load_from_csv(self, filename: str = "inventory.csv", chunk_size: int = DEFAULT_CHUNK_SIZE, progress=None):
+        ''' Loads products and information from a CSV file into the current inventory.'''
         # Verificamos si el archivo existe
         if not os.path.exists(filename):
-            messagebox.showwarning("Warning", f"File '{filename}' does not exist. Starting with an empty inventory.")
-            return
+            with self._lock:
+                self._clear()
+                self._emit("reset")
+            notifier.warning("Warning", f"File '{filename}' does not exist. Starting with an empty inventory.")
+            return None
 
         try:
-            with open(filename, mode="r", encoding="utf-8") as file:
-                reader = csv.DictReader(file)
-                for row in reader:
-                    product_id = int(row["id"])
-                    name = row["name"]
-                    price = float(row["price"])
-                    base_price = float(row["base_price"])  # Load base price
-                    quantity = int(row["quantity"])
-                    category = row["category"]
-
-                    # Convertir string a date usando isoformat
-                    try:
-                        entry_date = datetime.fromisoformat(row["entry_date"]).date() if row["entry_date"] else None
-                    except ValueError:
-                        entry_date = date.today
-
-                    try:
-                        exit_date = datetime.fromisoformat(row["exit_date"]).date() if row["exit_date"] else None
-                    except ValueError:
-                        exit_date = None 
-
-                    new_product = Product(
-                        id=product_id,
-                        name=name,
-                        price=price,
-                        quantity=quantity,
-                        category=category,
-                        entry_date=entry_date,
-                        exit_date=exit_date
-                    )
-                    new_product.price = price  # Setter for price
-                    new_product.base_price = base_price # Restore base price
-                    self.products.append(new_product)
-
-            messagebox.showinfo("Success", f"Inventory loaded from {filename} successfully.")
+            result = self.load_csv_stream(filename, chunk_size, progress)
         except Exception as e:
-            messagebox.showerror("Error", f"Failed to load inventory: {e}")
+            notifier.error("Error", f"Failed to load inventory: {e}")
+            return None
+
+        if result.ok:
+            notifier.info("Success", f"Inventory loaded from {filename} successfully.")
+        else:
+            first_errors = "\n".join(f"Line {line}: {error}" for line, _, error in result.rejects[:5])
+            notifier.warning("Loaded with errors", f"{result}\n{first_errors}")
+        return result
+
+    def load_csv_stream(self, filename: str = "inventory.csv", chunk_size: int = DEFAULT_CHUNK_SIZE, progress=None):
+        '''
+        Replaces the inventory with the products of a CSV file, reading it in chunks of chunk_size rows.
+        Does not show any dialog, so it can be used headless. Invalid or duplicated rows are collected
+        in the returned LoadResult instead of aborting the load. If the load is stopped halfway (an error,
+        or TaskCancelled raised from progress) the inventory is left as it was before.
+        '''
+        with self._lock:
+            previous = self._state()
+            # Clear the store and indexes for "reconstructing" the inventory
+            self._clear()
+            result = LoadResult(filename)
+            try:
+                for chunk in iter_product_chunks(filename, result, chunk_size, progress):
+                    self._bulk_add(chunk, result)
+            except BaseException:
+                # Stopped halfway (e.g. cancelled from progress): the inventory goes back to what it held,
+                # which the log still describes, so only the views are told and nothing is checkpointed
+                self._restore(*previous)
+                raise
+            self._name_index.sort()  # Sorting once is much cheaper than an insort per row
+
+            # Apply the changes saved in journal mode after the last full save
+            journal_rows = 0
+            if os.path.exists(journal_path(filename)):
+                for op, id, product in iter_journal(journal_path(filename), result, filename):
+                    journal_rows += 1
+                    if id in self._products:
+                        self._unindex_product(self._products[id])
+                    if product is not None:
+                        self._index_product(product)
+                result.loaded = len(self._products)
+
+            self._saved_filename = filename
+            self._journal_rows = journal_rows
+            self._emit("reset")
+            return result
+
+    def _state(self):
+        ''' What a load stopped halfway restores, see _restore '''
+        return (list(self._products.values()), dict(self._dirty_ids), dict(self._removed_ids),
+                self._saved_filename, self._journal_rows, self._lazy)
+
+    def _restore(self, products: list, dirty_ids: dict, removed_ids: dict, saved_filename: str, journal_rows: int, lazy: bool):
+        self._clear()
+        self._bulk_add(products, LoadResult(None))
+        self._name_index.sort()
+        self._dirty_ids.update(dirty_ids)
+        self._removed_ids.update(removed_ids)
+        self._saved_filename = saved_filename
+        self._journal_rows = journal_rows
+        self._lazy = lazy
+        self._notify("reset")
+
+    def open_log(self, path: str, **options):
+        '''
+        Replaces the inventory with the state kept by the write-ahead log at path: its last checkpoint
+        plus the changes logged after it, and from then on logs every change (see wal.WriteAheadLog,
+        whose options are passed through). Starts empty if the log does not exist yet. Returns the
+        number of records replayed.
+        '''
+        self.close_log()
+        wal = WriteAheadLog(path, **options)
+        with self._lock:
+            self._clear()
+            result = LoadResult(wal.checkpoint_path)
+            for chunk in wal.iter_checkpoint(result):
+                self._bulk_add(chunk, result)
+            self._name_index.sort()
+            records = wal.recover()
+            for record in records:
+                apply_record(self, record)
+            self._emit("reset")
+            self.wal = wal
+        return len(records)
+
+    def checkpoint_log(self):
+        ''' Writes the whole inventory to the checkpoint of the log and compacts the log, returns the products written '''
+        if self.wal is None:
+            raise ValueError("No write-ahead log was opened.")
+        if self._lazy:
+            raise ValueError("A lazily opened inventory cannot be checkpointed, load it completely first.")
+        with self._lock:  # Products cannot come or go while they are written, their values can change
+            return self.wal.checkpoint(self._products.values())
 
+    def close_log(self):
+        if self.wal is not None:
+            wal, self.wal = self.wal, None
+            wal.close()
@@ -1,11 +1,27 @@
+import csv
+import io
+import math
+import queue
+import threading
+from analytics import analyze, copy_histories
+from instrumentation import instrumentation
 from inventory import Inventory
+from notifier import notifier, WARNING, ERROR
+from product_list_view import ProductListView
+from storage import BINARY_EXTENSIONS, open_storage
+from tasks import TaskCancelled, TaskRunner
 from product import Product
-from report import Report
+from report import REPORT_FILETYPES, Report
+from schema import IMPORT_SCHEMA, Field
 from tkinter import *
-from tkinter import ttk, messagebox, Button
+from tkinter import ttk, messagebox, filedialog, Button
 from datetime import date
 from validation import validate_inputs
 
+SEARCH_DELAY_MS = 250  # Pause in the typing before a search as you type runs
+WAL_FILENAME = "inventory.wal"  # Every change is logged here, the next start recovers from it
+CHECKPOINT_CHECK_MS = 5000  # How often the log is checked for a due checkpoint
+
 class InventoryGUI:
     """
     This class represents the graphical user interface (GUI) for managing an inventory.
@@ -15,17 +31,32 @@ class InventoryGUI:
         inventory (Inventory): An instance of the Inventory class that manages products.
         notebook (ttk.Notebook): A tabbed interface for different inventory operations.
 
+    The messages of Inventory and Product arrive through notifier.notifier and are shown by show_notification.
+    Loads, saves, reports, analytics and checkpoints run on the worker threads of a TaskRunner (see tasks.py),
+    shown in a status bar with a progress bar and a Cancel button; a second click on Save or Load while one
+    of them runs is refused instead of starting a duplicate.
+    On start the inventory is recovered from the write-ahead log WAL_FILENAME (see wal.py), so changes that
+    were not saved to a csv survive a crash; the log is compacted into its checkpoint in the background.
+
     Methods:
         create_***_tab(self):
             Each method creates the tab for adding a new product, for removing a product, for listing all products, 
             for searching a product by ID, for updating a product's quantity, for registering product entries and exits, 
             for applying discounts to products, and for saving and loading inventory data from a CSV file respectively.
+            The add product tab also imports pasted or scanned rows, validated as one batch (see schema.py).
+            The analytics tab shows turnover, days of cover and demand forecasts computed from the quantity history.
+            The diagnostics tab turns the instrumentation on and off and shows its timings (see instrumentation.py).
     """
     def __init__(self, root):
         self.root = root
         self.root.title("Inventory Management")
         self.inventory = Inventory()
 
+        # Show the messages of the inventory core as dialogs, always from the Tk thread
+        self._notifications = queue.Queue()
+        notifier.subscribe(self.show_notification)
+        self.root.after(100, self._poll_notifications)
+
         # Create the notebook
         self.notebook = ttk.Notebook(root)
         self.notebook.pack(expand=1, fill='both')
@@ -33,6 +64,18 @@ class InventoryGUI:
         # Add tabs and reports Button
         self.report_button = Button(root, text="Generar Reporte", command=self.generate_report)
         self.report_button.pack(pady=10)
+
+        # Status bar of the tasks running in the background
+        self.tasks = TaskRunner(root, on_change=self.show_tasks)
+        self._shown_task = None  # Task whose progress the status bar shows, the one Cancel stops
+        task_bar = Frame(root)
+        task_bar.pack(fill='x', padx=10, pady=5)
+        self.task_status = Label(task_bar, text="")
+        self.task_status.pack(side=LEFT)
+        self.task_cancel_button = Button(task_bar, text="Cancel", command=self.cancel_shown_task, state=DISABLED)
+        self.task_cancel_button.pack(side=RIGHT)
+        self.task_progress = ttk.Progressbar(task_bar, length=200, mode="determinate")
+        self.task_progress.pack(side=RIGHT, padx=10)
         self.create_add_product_tab()
         self.create_remove_product_tab()
         self.create_list_products_tab()
@@ -41,6 +84,76 @@ class InventoryGUI:
         self.create_register_entry_exit_tab()
         self.create_discount_tab()
         self.create_csv_tab()
+        self.create_analytics_tab()
+        self.create_diagnostics_tab()
+        self.open_log()
+
+    def open_log(self):
+        try:
+            replayed = self.inventory.open_log(WAL_FILENAME)
+        except (OSError, ValueError) as e:
+            messagebox.showerror("Error", f"Failed to open the write-ahead log {WAL_FILENAME}: {e}")
+            return
+        if replayed:
+            messagebox.showinfo("Recovered", f"{replayed} changes recovered from {WAL_FILENAME}.")
+        self.root.after(CHECKPOINT_CHECK_MS, self._checkpoint_log)
+
+    def _checkpoint_log(self):
+        wal = self.inventory.wal
+        if wal is None:
+            return
+        if wal.checkpoint_due:
+            # On a worker: it waits for the inventory lock, which a load or a save can hold for a while
+            self.tasks.submit("checkpoint", "Checkpoint", lambda task: self.inventory.checkpoint_log(),
+                              on_error=lambda e: notifier.error("Error", f"Failed to checkpoint the write-ahead log: {e}"))
+        self.root.after(CHECKPOINT_CHECK_MS, self._checkpoint_log)
+
+    def show_tasks(self):
+        tasks = list(self.tasks.tasks.values())
+        # These hold the inventory lock for long, the list waits for them instead of blocking the window
+        self.product_list.frozen = self.tasks.running("storage") or self.tasks.running("checkpoint")
+        self.task_status.config(text="  |  ".join(str(task) for task in tasks))
+        measured = [task for task in tasks if task.total]
+        shown = measured[0] if measured else tasks[0] if tasks else None  # The task of the progress bar
+        self._shown_task = shown
+        if measured:
+            self.task_progress.config(mode="determinate", maximum=shown.total, value=shown.done)
+        elif tasks:
+            self.task_progress.config(mode="indeterminate")
+            self.task_progress.step(10)
+        else:
+            self.task_progress.config(mode="determinate", value=0)
+        cancellable = shown is not None and shown.cancellable and not shown.cancelled
+        self.task_cancel_button.config(state=NORMAL if cancellable else DISABLED)
+
+    def cancel_shown_task(self):
+        # Only the task whose progress is shown, another one (e.g. a report) keeps running
+        if self._shown_task is not None:
+            self.tasks.cancel(self._shown_task.key)
+
+    def _start_storage_task(self, label, func, on_done=None, on_error=None, cancellable=False):
+        # Loads and saves share one key: a load while saving (or a second save) would race on the inventory
+        if self.tasks.submit("storage", label, func, on_done, on_error, cancellable) is None:
+            messagebox.showinfo("Busy", f"{self.tasks.tasks['storage'].label} is still running, please wait.")
+
+    def show_notification(self, level, title, message):
+        if threading.current_thread() is not threading.main_thread():
+            self._notifications.put((level, title, message))  # Tk can only be used from the main thread
+            return
+        if level == ERROR:
+            messagebox.showerror(title, message)
+        elif level == WARNING:
+            messagebox.showwarning(title, message)
+        else:
+            messagebox.showinfo(title, message)
+
+    def _poll_notifications(self):
+        try:
+            while True:
+                self.show_notification(*self._notifications.get_nowait())
+        except queue.Empty:
+            pass
+        self.root.after(100, self._poll_notifications)
 
     def create_add_product_tab(self):
         frame = ttk.Frame(self.notebook)
@@ -72,6 +185,15 @@ class InventoryGUI:
 
         Button(frame, text="Add Product", command=self.add_product).grid(row=6, column=0, columnspan=2, pady=10)
 
+        # Bulk import of pasted csv rows or scanned records, validated as one batch
+        Label(frame, text="Paste rows: id,name,price,quantity,category[,entry_date,exit_date,base_price]"
+                          " (or a header row first):").grid(row=7, column=0, columnspan=2, padx=10, pady=5)
+        self.import_text = Text(frame, wrap=NONE, width=80, height=8)
+        self.import_text.grid(row=8, column=0, columnspan=2, padx=10, pady=5)
+        Button(frame, text="Import Rows", command=self.import_products).grid(row=9, column=0, columnspan=2, pady=10)
+        self.import_report = Text(frame, wrap=NONE, width=80, height=6)
+        self.import_report.grid(row=10, column=0, columnspan=2, padx=10, pady=5)
+
     def create_remove_product_tab(self):
         frame = ttk.Frame(self.notebook)
         self.notebook.add(frame, text="Remove Product")
@@ -88,8 +210,20 @@ class InventoryGUI:
 
         Button(frame, text="List Products", command=self.list_products).pack(pady=10)
 
-        self.list_products_text = Text(frame, wrap=WORD, width=60, height=20)
-        self.list_products_text.pack(pady=10)
+        # Only the visible rows are rendered, and it follows the inventory changes by itself
+        self.product_list = ProductListView(frame, self.inventory, visible_rows=20)
+        self.product_list.pack(pady=10, fill='both', expand=1)
+
+        self.stock_status = Label(frame, text="")
+        self.stock_status.pack(pady=5)
+        self.root.after(500, self._update_stock_status)
+
+    def _update_stock_status(self):
+        # Running totals of the inventory, reading them does not loop over the products
+        summary = self.inventory.stock_summary()
+        low_stock = self.inventory.aggregates.low_stock_count()
+        self.stock_status.config(text=f"{summary} Low stock: {low_stock} products.")
+        self.root.after(500, self._update_stock_status)
 
     def create_search_product_tab(self):
         frame = ttk.Frame(self.notebook)
@@ -101,8 +235,30 @@ class InventoryGUI:
 
         Button(frame, text="Search Product", command=self.search_product).grid(row=1, column=0, columnspan=2, pady=10)
 
+        Label(frame, text="Name or Category:").grid(row=2, column=0, padx=10, pady=5)
+        self.search_query = Entry(frame)
+        self.search_query.grid(row=2, column=1, padx=10, pady=5)
+        self.search_query.bind("<KeyRelease>", self.schedule_text_search)
+        self._search_job = None
+
         self.search_product_text = Text(frame, wrap=WORD, width=60, height=20)
-        self.search_product_text.grid(row=2, column=0, columnspan=2, pady=10)
+        self.search_product_text.grid(row=3, column=0, columnspan=2, pady=10)
+
+    def schedule_text_search(self, event=None):
+        # Search as you type: every key restarts the wait, the search runs once the typing pauses
+        if self._search_job is not None:
+            self.root.after_cancel(self._search_job)
+        self._search_job = self.root.after(SEARCH_DELAY_MS, self.search_text)
+
+    def search_text(self):
+        self._search_job = None
+        query = self.search_query.get()
+        products = self.inventory.search_text(query)
+        self.search_product_text.delete(1.0, END)
+        if products:
+            self.search_product_text.insert(END, "".join(f"{product}\n" for product in products))
+        elif query.strip():
+            self.search_product_text.insert(END, "No products found.")
 
     def create_update_quantity_tab(self):
         frame = ttk.Frame(self.notebook)
@@ -151,13 +307,90 @@ class InventoryGUI:
         frame = ttk.Frame(self.notebook)
         self.notebook.add(frame, text="CSV Operations")
 
-        Label(frame, text="CSV Filename (default: 'inventory.csv'):").grid(row=0, column=0, padx=10, pady=5)
+        Label(frame, text="CSV, .db or .snap Filename (default: 'inventory.csv'):").grid(row=0, column=0, padx=10, pady=5)
         self.csv_filename = Entry(frame)
         self.csv_filename.grid(row=0, column=1, padx=10, pady=5)
         self.csv_filename.insert(0, "inventory.csv")
 
-        Button(frame, text="Save to CSV", command=self.save_to_csv).grid(row=1, column=0, columnspan=2, pady=10)
-        Button(frame, text="Load from CSV", command=self.load_from_csv).grid(row=2, column=0, columnspan=2, pady=10)
+        # Journal saves only append the changes since the last save; a plain save rewrites the whole csv
+        self.csv_journal = BooleanVar(value=False)
+        Checkbutton(frame, text="Only append changes (journal)", variable=self.csv_journal).grid(row=1, column=0, columnspan=2, pady=5)
+
+        Button(frame, text="Save to CSV", command=self.save_to_csv).grid(row=2, column=0, columnspan=2, pady=10)
+        Button(frame, text="Load from CSV", command=self.load_from_csv).grid(row=3, column=0, columnspan=2, pady=10)
+
+    def create_analytics_tab(self):
+        frame = ttk.Frame(self.notebook)
+        self.notebook.add(frame, text="Analytics")
+
+        Button(frame, text="Analyze Last Year", command=self.start_analytics).pack(pady=10)
+        self.analytics_text = Text(frame, wrap=NONE, width=100, height=25)
+        self.analytics_text.pack(pady=10)
+
+    def start_analytics(self):
+        # The histories keep changing while the worker runs, so it analyzes copies
+        products = copy_histories(self.inventory.products)
+        self.tasks.submit("analytics", "Analytics", lambda task: analyze(products), on_done=self.show_analytics)
+
+    def show_analytics(self, analysis):
+        lines = [str(analysis), "", "=== Categories ==="]
+        lines += [f"{category}: {totals}" for category, totals in analysis.categories.items()]
+        lines += ["", "=== Lowest days of cover (weekly forecast demand) ==="]
+        for cover, id in analysis.top("days_of_cover", 10):
+            if math.isinf(cover):
+                break
+            product = self.inventory.search_product(id)
+            if product is None:  # Removed while the analysis ran
+                continue
+            row = analysis.row(id)
+            lines.append(f"ID {id} {product.name}: {cover:.1f} days, {product.quantity} in stock, "
+                         f"forecast {row['forecast']:.1f} / week, turnover {row['turnover']:.2f}")
+        self.analytics_text.delete(1.0, END)
+        self.analytics_text.insert(END, "\n".join(lines))
+
+    def create_diagnostics_tab(self):
+        frame = ttk.Frame(self.notebook)
+        self.notebook.add(frame, text="Diagnostics")
+
+        self.instrumentation_button = Button(frame, text="Enable Instrumentation", command=self.toggle_instrumentation)
+        self.instrumentation_button.grid(row=0, column=0, padx=10, pady=5)
+        Button(frame, text="Refresh", command=self.refresh_diagnostics).grid(row=0, column=1, padx=10, pady=5)
+        Button(frame, text="Reset", command=self.reset_diagnostics).grid(row=0, column=2, padx=10, pady=5)
+
+        Label(frame, text="JSON Filename:").grid(row=1, column=0, padx=10, pady=5)
+        self.diagnostics_filename = Entry(frame)
+        self.diagnostics_filename.grid(row=1, column=1, padx=10, pady=5)
+        self.diagnostics_filename.insert(0, "diagnostics.json")
+        Button(frame, text="Export JSON", command=self.export_diagnostics).grid(row=1, column=2, padx=10, pady=5)
+
+        self.diagnostics_text = Text(frame, wrap=NONE, width=100, height=20)
+        self.diagnostics_text.grid(row=2, column=0, columnspan=3, pady=10)
+        self.refresh_diagnostics()
+
+    def toggle_instrumentation(self):
+        if instrumentation.enabled:
+            instrumentation.disable()
+            self.instrumentation_button.config(text="Enable Instrumentation")
+        else:
+            instrumentation.enable()
+            self.instrumentation_button.config(text="Disable Instrumentation")
+        self.refresh_diagnostics()
+
+    def refresh_diagnostics(self):
+        self.diagnostics_text.delete(1.0, END)
+        self.diagnostics_text.insert(END, instrumentation.report())
+
+    def reset_diagnostics(self):
+        instrumentation.reset()
+        self.refresh_diagnostics()
+
+    def export_diagnostics(self):
+        filename = self.diagnostics_filename.get().strip() or "diagnostics.json"
+        try:
+            instrumentation.export_json(filename)
+            messagebox.showinfo("Success", f"Diagnostics saved to {filename}.")
+        except OSError as e:
+            messagebox.showerror("Error", f"Failed to save diagnostics: {e}")
 
 
     @validate_inputs({
@@ -166,24 +399,42 @@ class InventoryGUI:
         'add_price': float,
         'add_quantity': int,
         'add_category': str,
-        'add_entry_date': str
+        'add_entry_date': Field(date, required=False, default=date.today)  # Empty: today; invalid: rejected
     })
     def add_product(self, add_id, add_name, add_price, add_quantity, add_category, add_entry_date):
-        entry_date = date.fromisoformat(add_entry_date) if add_entry_date else date.today()
-        product = Product(add_id, add_name, add_price, add_quantity, add_category, entry_date)
+        product = Product(add_id, add_name, add_price, add_quantity, add_category, add_entry_date)
         product.base_price = add_price # Establish _base_price
         self.inventory.add_product(product)
-        self.list_products()
+
+    def import_products(self):
+        rows = [[value.strip() for value in row] for row in csv.reader(io.StringIO(self.import_text.get(1.0, END)))]
+        rows = [row for row in rows if any(row)]
+        if not rows:
+            messagebox.showerror("Error", "Paste at least one row to import.")
+            return
+        names = list(IMPORT_SCHEMA.names)
+        header = [name.lower() for name in rows[0]]
+        if "id" in header:  # A header row gives the order of the columns
+            names = header
+            rows.pop(0)
+        columns = {name: names.index(name) for name in IMPORT_SCHEMA.names if name in names}
+
+        report = IMPORT_SCHEMA.validate_batch(rows, columns)
+        duplicates = self.inventory.add_products([Product(*record) for record in report.records])
+        lines = [f"{len(report.records) - len(duplicates)} rows imported, {report.rejected + len(duplicates)} rejected."]
+        lines += [f"Row {position + 1}: {message}" for position, message in report.row_errors().items()]
+        lines += [f"ID {product.id}: the product already exists." for product in duplicates]
+        self.import_report.delete(1.0, END)
+        self.import_report.insert(END, "\n".join(lines))
+        if report.ok and not duplicates:
+            self.import_text.delete(1.0, END)
 
     @validate_inputs({'remove_product_id': int})
     def remove_product(self, remove_product_id):
         self.inventory.remove_product(remove_product_id)
-        self.list_products()
 
     def list_products(self):
-        self.list_products_text.delete(1.0, END)
-        inventory_list = self.inventory.list_inventory()
-        self.list_products_text.insert(END, inventory_list)
+        self.product_list.refresh()
 
     @validate_inputs({'search_product_id': int})
     def search_product(self, search_product_id):
@@ -197,7 +448,6 @@ class InventoryGUI:
     @validate_inputs({'update_quantity_id': int, 'update_quantity_value': int})
     def update_quantity(self, update_quantity_id, update_quantity_value):
         self.inventory.update_quantity(update_quantity_id, update_quantity_value)
-        self.list_products()
 
     @validate_inputs({'entry_exit_product_id': int, 'entry_exit_quantity': int})
     def register_entry(self, entry_exit_product_id, entry_exit_quantity):
@@ -220,8 +470,7 @@ class InventoryGUI:
         product = self.inventory.search_product(discount_product_id)
         if product:
             try:
-                product.apply_discount(discount_percentage)
-                messagebox.showinfo("Success", f"Discount applied! New price: ${product.price:.2f}")
+                product.apply_discount(discount_percentage)  # Reports the new price through the notifier
             except ValueError as e:
                 messagebox.showerror("Error", str(e))
         else:
@@ -231,21 +480,83 @@ class InventoryGUI:
         filename = self.csv_filename.get()
         if not filename:
             filename = "inventory.csv"
-        self.inventory.save_to_csv(filename)
-        self.list_products()
-        
+        if filename.lower().endswith(BINARY_EXTENSIONS):
+            self.save_to_storage(filename)
+            return
+        journal = self.csv_journal.get()
+        # save_to_csv reports the outcome through the notifier; saves cannot be cancelled halfway
+        self._start_storage_task(f"Saving {filename}", lambda task: self.inventory.save_to_csv(filename, journal=journal))
 
     def load_from_csv(self):
         filename = self.csv_filename.get().strip()
         if not filename:
             filename = "inventory.csv"
-        self.inventory.load_from_csv(filename)
-        self.list_products()
+        if filename.lower().endswith(BINARY_EXTENSIONS):
+            self.load_from_storage(filename)
+            return
+
+        def load(task):
+            def progress(rows_read, bytes_read, total_bytes):
+                task.check_cancelled()  # Stops the load between two chunks
+                task.progress(bytes_read, total_bytes)
+            return self.inventory.load_from_csv(filename, progress=progress)
+        self._start_storage_task(f"Loading {filename}", load, on_error=self.load_cancelled, cancellable=True)
+
+    def load_cancelled(self, error):
+        if isinstance(error, TaskCancelled):
+            messagebox.showwarning("Load Cancelled", f"The load was cancelled, the inventory was left as it was "
+                                                     f"({len(self.inventory.products)} products) and nothing was "
+                                                     f"written to the recovery log.")
+        else:
+            messagebox.showerror("Error", f"Failed to load inventory: {error}")
+
+    def save_to_storage(self, filename):
+        def save(task):
+            storage = self.inventory.storage
+            if storage is None or storage.path != filename:
+                if storage is not None:
+                    storage.close()
+                self.inventory.storage = open_storage(filename)
+            return self.inventory.save_storage()
+        self._start_storage_task(
+            f"Saving {filename}", save,
+            on_done=lambda rows: messagebox.showinfo("Success", f"Inventory saved to {filename} successfully ({rows} rows written)."),
+            on_error=lambda e: messagebox.showerror("Error", f"Failed to save inventory: {e}"))
+
+    def load_from_storage(self, filename):
+        def load(task):
+            return self.inventory.open_storage(open_storage(filename), progress=lambda done, _, total: task.progress(done, total))
+        self._start_storage_task(
+            f"Loading {filename}", load,
+            on_done=lambda result: messagebox.showinfo("Success", f"{result}"),
+            on_error=lambda e: messagebox.showerror("Error", f"Failed to load inventory: {e}"))
 
     def generate_report(self):
-        try:
-            report = Report(self.inventory)  # Instancia de la clase Report
-            report.generate_current_report()  # Método para generar el reporte
-            messagebox.showinfo("Reporte generated succesfully.")
-        except Exception as e:
-            messagebox.showerror("Error", f"Error al generar el reporte: {e}")
\ No newline at end of file
+        if self.tasks.running("report"):  # A report is running, the button cancels it
+            self.tasks.cancel("report")
+            return
+        file_path = filedialog.asksaveasfilename(defaultextension=".txt", filetypes=REPORT_FILETYPES, title="Save Report As")
+        if not file_path:
+            return
+        report = Report(self.inventory)  # Instancia de la clase Report
+
+        def run(task):
+            report.cancel_event = task.cancel_event  # The Cancel buttons stop the writer between two rows
+            rows = report._generate_report_logic(file_path, task.progress)
+            if rows is not None:
+                report._open_report(file_path)  # Abre el archivo después de crearlo
+            return rows
+        self.tasks.submit("report", "Reporte", run, lambda rows: self.report_finished(file_path, rows),
+                          self.report_failed, cancellable=True)
+        self.report_button.config(text="Cancelar Reporte")
+
+    def report_finished(self, file_path, rows):
+        self.report_button.config(text="Generar Reporte")
+        if rows is None:
+            messagebox.showwarning("Report Cancelled", "The report was cancelled.")
+        else:
+            messagebox.showinfo("Report Generated", f"Report saved successfully:\n{file_path}")
+
+    def report_failed(self, error):
+        self.report_button.config(text="Generar Reporte")
+        messagebox.showerror("Error", f"Error al generar el reporte: {error}")
@@ -0,0 +1,30 @@
+import threading
+
+LOCK_STRIPES = 64
+
+# Striped locks: products share a fixed pool of locks by id instead of one lock per product,
+# which would cost memory on large catalogs. Reentrant, so a holder may call back into Product.
+_stripes = [threading.RLock() for _ in range(LOCK_STRIPES)]
+
+
+def product_lock(id):
+    """ Lock that guards the quantity and prices of the product with that ID """
+    return _stripes[hash(id) % LOCK_STRIPES]
+
+
+class all_product_locks:
+    """
+    Context manager holding every stripe, for batch operations that must be atomic against
+    concurrent register_entry / register_exit calls. The stripes are always taken in the same
+    order, so two batches cannot deadlock.
+    """
+
+    def __enter__(self):
+        for lock in _stripes:
+            lock.acquire()
+        return self
+
+    def __exit__(self, *exc_info):
+        for lock in reversed(_stripes):
+            lock.release()
+        return False
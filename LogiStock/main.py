@@ -5,4 +5,6 @@ if __name__ == "__main__":
     root = Tk()
     app = InventoryGUI(root)
     root.mainloop()
+    app.tasks.shutdown()  # Cancels loads and reports, lets a running save finish
+    app.inventory.close_log()  # Flushes the last changes of the write-ahead log
     
\ No newline at end of file
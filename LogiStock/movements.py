@@ -0,0 +1,84 @@
+MAX_REPORTED_ERRORS = 1000
+
+
+class MovementResult:
+    """
+    Result of Inventory.apply_movements.
+
+    Attributes:
+        applied (bool): True if the whole batch was applied, False if it was rejected (nothing changed).
+        movements (int): Number of movements in the batch.
+        products (int): Number of different products touched.
+        units_in (int): Total units received (entries).
+        units_out (int): Total units shipped (exits).
+        errors (list): (position in the batch, product_id, quantity, message) for the invalid movements.
+    """
+
+    def __init__(self):
+        self.applied = False
+        self.movements = 0
+        self.products = 0
+        self.units_in = 0
+        self.units_out = 0
+        self.errors = []
+
+    @property
+    def ok(self):
+        return self.applied
+
+    def __str__(self):
+        if not self.applied:
+            return f"Batch of {self.movements} movements rejected: {len(self.errors)} invalid movements."
+        return (f"{self.movements} movements applied to {self.products} products "
+                f"(+{self.units_in} / -{self.units_out} units).")
+
+
+def plan_movements(batch, find_product):
+    """
+    Validates a batch of (product_id, quantity) movements, positive quantities being entries and
+    negative ones exits, against the current stock and in batch order, so an exit can use units
+    received earlier in the same batch. Returns (result, {product: new quantity}); the caller only
+    applies the new quantities if result.errors is empty.
+    """
+    result = MovementResult()
+    stock = {}  # product_id -> (product, running quantity)
+    errors = result.errors
+    units_in = units_out = 0
+    position = -1
+
+    for position, (product_id, quantity) in enumerate(batch):
+        entry = stock.get(product_id)
+        if entry is None:
+            product = find_product(product_id)
+            if product is None:
+                if len(errors) < MAX_REPORTED_ERRORS:
+                    errors.append((position, product_id, quantity, f"Product with ID {product_id} not found."))
+                continue
+            entry = (product, product.quantity)
+
+        if type(quantity) is not int:
+            if len(errors) < MAX_REPORTED_ERRORS:
+                errors.append((position, product_id, quantity, "Quantity must be an integer."))
+            continue
+        if quantity == 0:
+            if len(errors) < MAX_REPORTED_ERRORS:
+                errors.append((position, product_id, quantity, "Quantity must be different from 0."))
+            continue
+
+        running = entry[1] + quantity
+        if running < 0:
+            if len(errors) < MAX_REPORTED_ERRORS:
+                errors.append((position, product_id, quantity, "Not enough units in stock."))
+            continue
+
+        stock[product_id] = (entry[0], running)
+        if quantity > 0:
+            units_in += quantity
+        else:
+            units_out -= quantity
+
+    result.movements = position + 1
+    result.products = len(stock)
+    result.units_in = units_in
+    result.units_out = units_out
+    return result, {product: quantity for product, quantity in stock.values()}
@@ -0,0 +1,47 @@
+INFO = "info"
+WARNING = "warning"
+ERROR = "error"
+
+
+class Notifier:
+    """
+    Publishes the messages of the inventory core (successes, warnings and errors) to whoever
+    subscribed, so Inventory and Product never depend on a user interface. Without subscribers
+    the messages are simply dropped, which is what headless workers and benchmarks want.
+
+    Methods:
+        subscribe(self, callback):
+            Registers callback(level, title, message) and returns it.
+        unsubscribe(self, callback):
+            Stops sending messages to callback.
+        info / warning / error(self, title: str, message: str):
+            Sends a message with that level to every subscriber.
+    """
+
+    def __init__(self):
+        self._subscribers = []
+
+    def subscribe(self, callback):
+        self._subscribers.append(callback)
+        return callback
+
+    def unsubscribe(self, callback):
+        if callback in self._subscribers:
+            self._subscribers.remove(callback)
+
+    def emit(self, level: str, title: str, message: str):
+        for callback in list(self._subscribers):
+            callback(level, title, message)
+
+    def info(self, title: str, message: str):
+        self.emit(INFO, title, message)
+
+    def warning(self, title: str, message: str):
+        self.emit(WARNING, title, message)
+
+    def error(self, title: str, message: str):
+        self.emit(ERROR, title, message)
+
+
+# Shared by Inventory and Product; InventoryGUI subscribes to it to show the dialogs
+notifier = Notifier()
@@ -0,0 +1,64 @@
+from array import array
+
+
+class PricingSummary:
+    """
+    Result of a bulk price change.
+
+    Attributes:
+        operation (str): "discount", "incremental discount" or "reset".
+        discount_pct (float): Percentage applied (0 for a reset).
+        updated (int): Number of products whose price was recomputed.
+        old_total (float): Sum of the prices before the change.
+        new_total (float): Sum of the prices after the change.
+    """
+
+    def __init__(self, operation: str, discount_pct: float, updated: int, old_total: float, new_total: float):
+        self.operation = operation
+        self.discount_pct = discount_pct
+        self.updated = updated
+        self.old_total = old_total
+        self.new_total = new_total
+
+    def __str__(self):
+        if self.operation == "reset":
+            return (f"Prices reset to base price for {self.updated} products. "
+                    f"Sum of prices: ${self.old_total:.2f} -> ${self.new_total:.2f}")
+        return (f"{self.operation.capitalize()} of {self.discount_pct:.1f}% applied to {self.updated} products. "
+                f"Sum of prices: ${self.old_total:.2f} -> ${self.new_total:.2f}")
+
+
+def discount_factor(discount_pct: float):
+    """ Validates the percentage with the same rules as Product.apply_discount and returns the price factor """
+    if not (0 <= discount_pct <= 100):
+        raise ValueError("Discount percentage must be between 0 and 100.")
+    factor = (100 - discount_pct) / 100.0
+    if factor <= 0:
+        raise ValueError("Price must be greater than 0.")  # What the price setter would say for every product
+    return factor
+
+
+def scale_prices(prices: array, factor: float):
+    """
+    Multiplies a whole column of prices by factor in one pass and returns the new column.
+    The standard library has no vectorized multiply for arrays, so this is still one float multiplication
+    per price; the list comprehension measured faster than map(factor.__mul__, prices) or
+    map(mul, prices, repeat(factor)), because array() copies a list in one go but grows on an iterator.
+    """
+    return array("d", [price * factor for price in prices])
+
+
+def apply_prices(products: list, new_prices: array, operation: str, discount_pct: float):
+    """
+    Writes the computed prices back to the products and returns a PricingSummary.
+    The prices were validated as a batch, so the setter checks are not repeated per product,
+    but each product still records the change (dirty flag and inventory listener).
+    """
+    old_total = 0.0
+    for product, price in zip(products, new_prices):
+        old = product._price
+        old_total += old
+        if old != price:
+            product._price = price
+            product._changed("price", old)
+    return PricingSummary(operation, discount_pct, len(products), old_total, sum(new_prices))
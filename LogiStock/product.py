@@ -1,5 +1,7 @@
-from tkinter import messagebox
-from datetime import date, datetime
+from notifier import notifier
+from datetime import date
+from history import QuantityHistory
+from locks import product_lock
 
 class Product:
     """
@@ -10,7 +12,8 @@ class Product:
         id (int): Product ID, name (str): Product name, price (float): Product price,
         base_price (float): Original base price of the product, quantity (int): Product quantity,
         category (str): Product category, entry_date (date): Date the product entered inventory,
-        exit_date (date): Date the product left inventory.
+        exit_date (date): Date the product left inventory,
+        quantity_history (QuantityHistory): Quantity after every change, with bounded retention.
 
     Methods:
         __str__() -> str:
@@ -27,39 +30,112 @@ class Product:
             Getter that returns the base price of the product.
         @base_price.setter(self, value: float):
             Setter for the base price of the product.
+        quantity, entry_date, exit_date:
+            Properties whose setters mark the product as dirty, like the price setters.
+        @property dirty(self) -> bool:
+            True if the product changed since the last save, mark_clean() resets it.
     """
 
+    # No per-instance __dict__: large catalogs keep hundreds of thousands of products in memory
+    __slots__ = ("id", "name", "_price", "_base_price", "_quantity", "quantity_history", "category",
+                 "_entry_date", "_exit_date", "_dirty", "_listener")
+
     def __init__(self, id: int, name: str, price: float, quantity: int, category: str, entry_date: date, exit_date: date = None, base_price = None):
         self.id = id
         self.name = name
         self._price = price
         self._base_price = base_price if base_price is not None else price  # Original price that doesn't changes, _base_price preserves the initial value that the product had when was created.
-        self.quantity = quantity
-        self.quantity_history = [(datetime.now(), quantity)]
+        self._quantity = quantity
+        self.quantity_history = QuantityHistory()
+        self.quantity_history.record(quantity)
         self.category = category
-        self.entry_date = entry_date
-        self.exit_date = exit_date
+        self._entry_date = entry_date
+        self._exit_date = exit_date
+        self._dirty = False     # True when quantity, prices or dates changed since the last save
+        self._listener = None   # Set by the Inventory that owns the product, called on every change
+
+    def _changed(self, field: str, old):
+        """Marks the product as dirty and tells the owner inventory which field changed and its old value."""
+        self._dirty = True
+        if self._listener is not None:
+            self._listener(self, field, old)
+
+    @property
+    def dirty(self):
+        """True if the product changed since it was last saved or loaded."""
+        return self._dirty
+
+    def mark_clean(self):
+        self._dirty = False
+
+    def __getstate__(self):
+        """Pickles the product without its listener, the owner inventory stays in its process (see sharding.py)."""
+        return {slot: getattr(self, slot) for slot in self.__slots__ if slot != "_listener"}
+
+    def __setstate__(self, state):
+        for slot, value in state.items():
+            setattr(self, slot, value)
+        self._listener = None
+
+    @property
+    def quantity(self):
+        return self._quantity
+
+    @quantity.setter
+    def quantity(self, value: int):
+        old = self._quantity
+        self._quantity = value
+        self.quantity_history.record(value)
+        self._changed("quantity", old)
+
+    @property
+    def entry_date(self):
+        return self._entry_date
+
+    @entry_date.setter
+    def entry_date(self, value: date):
+        old = self._entry_date
+        self._entry_date = value
+        self._changed("entry_date", old)
+
+    @property
+    def exit_date(self):
+        return self._exit_date
+
+    @exit_date.setter
+    def exit_date(self, value: date):
+        old = self._exit_date
+        self._exit_date = value
+        self._changed("exit_date", old)
 
 
     def register_entry(self, quantity: int):
         try:
             if quantity <= 0:
                 raise ValueError("Quantity must be greater than 0.")
-            self.quantity += quantity
-            messagebox.showinfo("Entry Registered", f"{quantity} units of {self.name} have been added. Total in inventory: {self.quantity}.")
+            with product_lock(self.id):
+                self.quantity += quantity
+                total = self._quantity
+            notifier.info("Entry Registered", f"{quantity} units of {self.name} have been added. Total in inventory: {total}.")
+            return True
         except (ValueError, TypeError) as e:
-            messagebox.showerror("Error", f"Error: {e}")
+            notifier.error("Error", f"Error: {e}")
+            return False
 
     def register_exit(self, quantity: int):
         try:
             if quantity <= 0:
                 raise ValueError("Quantity must be greater than 0.")
-            if quantity > self.quantity:
-                raise ValueError("Not enough units in stock.")
-            self.quantity -= quantity
-            messagebox.showinfo("Exit Registered", f"{quantity} units of {self.name} have been removed. Total in inventory: {self.quantity}.")
+            with product_lock(self.id):  # The stock check and the update must not be interleaved
+                if quantity > self._quantity:
+                    raise ValueError("Not enough units in stock.")
+                self.quantity -= quantity
+                total = self._quantity
+            notifier.info("Exit Registered", f"{quantity} units of {self.name} have been removed. Total in inventory: {total}.")
+            return True
         except (ValueError, TypeError) as e:
-            messagebox.showerror("Error", f"Error: {e}")
+            notifier.error("Error", f"Error: {e}")
+            return False
 
     # Getters and setters for price and base_price
     @property
@@ -72,7 +148,9 @@ class Product:
         """Sets a new current price (_price) while ensuring it remains valid."""
         if value <= 0:
             raise ValueError("Price must be greater than 0.")
+        old = self._price
         self._price = value
+        self._changed("price", old)
 
     @property
     def base_price(self):
@@ -84,8 +162,11 @@ class Product:
         """Allows modifying the base price (_base_price) while ensuring it remains valid."""
         if value <= 0:
             raise ValueError("Base price must be greater than 0.")
+        old_base, old_price = self._base_price, self._price
         self._base_price = value
         self._price = value  # Also updates the actual price if the base price changes
+        self._changed("base_price", old_base)
+        self._changed("price", old_price)
 
     def apply_discount(self, discount_pct: float):
         """
@@ -99,15 +180,15 @@ class Product:
         discount_factor = (100 - discount_pct) / 100.0
         self.price = self.base_price * discount_factor
 
-        print(f"\nApplied a {discount_pct:.1f}% discount to {self.name}. "
-              f"New price: ${self._price:.2f} (Base Price: ${self._base_price:.2f})")
+        notifier.info("Discount Applied", f"Applied a {discount_pct:.1f}% discount to {self.name}. "
+                                          f"New price: ${self._price:.2f} (Base Price: ${self._base_price:.2f})")
 
     def reset_price(self):
         """
         Resets the product's current price (_price) to the original base price (_base_price).
         """
         self.price = self.base_price
-        print(f"{self.name}'s price has been reset to base price: ${self.price:.2f}")
+        notifier.info("Price Reset", f"{self.name}'s price has been reset to base price: ${self.price:.2f}")
 
     def apply_incremental_discount(self, discount_pct: float):
         """
@@ -118,10 +199,11 @@ class Product:
             raise ValueError("Discount percentage must be between 0 and 100.")
 
         discount_factor = (100 - discount_pct) / 100.0
-        self.price = self.price * discount_factor
+        with product_lock(self.id):
+            self.price = self.price * discount_factor
 
-        print(f"\nApplied an incremental {discount_pct:.1f}% discount to {self.name}. "
-            f"New price: ${self.price:.2f}")
+        notifier.info("Discount Applied", f"Applied an incremental {discount_pct:.1f}% discount to {self.name}. "
+                                          f"New price: ${self.price:.2f}")
         
     def __str__(self):
         exit_date_str = self.exit_date if self.exit_date else "N/A"
@@ -0,0 +1,149 @@
+import threading
+from tkinter import ttk, VERTICAL
+
+COLUMNS = ("id", "name", "price", "quantity", "category", "entry_date", "exit_date")
+HEADINGS = ("ID", "Name", "Price", "Quantity", "Category", "Entry Date", "Exit Date")
+WIDTHS = (60, 180, 80, 70, 110, 90, 90)
+
+
+def product_values(product):
+    return (product.id, product.name, f"${product.price:.2f}", product.quantity, product.category,
+            product.entry_date, product.exit_date if product.exit_date else "N/A")
+
+
+class ProductListView(ttk.Frame):
+    """
+    Virtualized product list: a ttk.Treeview that only holds the rows on screen. The scrollbar and
+    the mouse wheel move an offset into the inventory and the visible page is fetched with
+    Inventory.query, so the cost of a redraw does not depend on the size of the inventory. Clicking a
+    heading sorts by that column (again to reverse the order) through the presorted query indexes.
+
+    The view follows the inventory through Inventory.subscribe: a changed product only updates its
+    own row if it is visible (in a sorted list it may move, so the page is refreshed), additions,
+    removals and loads refresh the current page. Events from other threads are collected and
+    applied from the Tk loop. While frozen is True (a load or a save holds the inventory lock on a
+    worker thread) the view keeps its rows and applies the collected events afterwards, instead of
+    blocking the Tk loop on the lock.
+
+    Methods:
+        refresh(self):
+            Reloads the visible page.
+        update_product(self, product):
+            Redraws the row of product if it is on screen.
+        scroll_to(self, offset: int):
+            Shows the page that starts at offset.
+        sort_by(self, column: str):
+            Sorts by column, or reverses the order if the list is already sorted by it.
+    """
+
+    def __init__(self, master, inventory, visible_rows: int = 20, **kwargs):
+        super().__init__(master, **kwargs)
+        self.inventory = inventory
+        self.visible_rows = visible_rows
+        self.offset = 0
+        self.order_by = None  # Insertion order until a heading is clicked
+        self.descending = False
+        self.frozen = False
+        self._rows = {}  # product id -> Treeview item of the visible rows
+
+        self.tree = ttk.Treeview(self, columns=COLUMNS, show="headings", height=visible_rows, selectmode="browse")
+        for column, heading, width in zip(COLUMNS, HEADINGS, WIDTHS):
+            self.tree.heading(column, text=heading, command=lambda column=column: self.sort_by(column))
+            self.tree.column(column, width=width, anchor="w")
+        self.scrollbar = ttk.Scrollbar(self, orient=VERTICAL, command=self._on_scrollbar)
+        self.tree.pack(side="left", fill="both", expand=True)
+        self.scrollbar.pack(side="right", fill="y")
+
+        for widget in (self.tree, self.scrollbar):
+            widget.bind("<MouseWheel>", self._on_mousewheel)  # Windows and macOS
+            widget.bind("<Button-4>", lambda event: self.scroll_to(self.offset - 3))  # Linux
+            widget.bind("<Button-5>", lambda event: self.scroll_to(self.offset + 3))
+
+        # Inventory events can come from worker threads, they are applied by _flush_pending
+        self._lock = threading.Lock()
+        self._pending_ids = set()
+        self._pending_refresh = False
+        inventory.subscribe(self._on_inventory_event)
+        self.after(100, self._flush_pending)
+
+    def _on_inventory_event(self, event, product):
+        with self._lock:
+            if event == "changed" and self.order_by is None:
+                self._pending_ids.add(product.id)
+            else:
+                self._pending_refresh = True
+
+    def _flush_pending(self):
+        if self.frozen:
+            self.after(100, self._flush_pending)
+            return
+        with self._lock:
+            ids, self._pending_ids = self._pending_ids, set()
+            refresh, self._pending_refresh = self._pending_refresh, False
+        if refresh:
+            self.refresh()
+        else:
+            for id in ids:
+                if id in self._rows:
+                    product = self.inventory.search_product(id)
+                    if product is not None:
+                        self.update_product(product)
+        self.after(100, self._flush_pending)
+
+    def _on_scrollbar(self, action, *args):
+        if self.frozen:
+            return
+        if action == "moveto":
+            self.scroll_to(int(float(args[0]) * len(self.inventory.products)))
+        elif action == "scroll":
+            amount = int(args[0])
+            if args[1] == "pages":
+                amount *= self.visible_rows
+            self.scroll_to(self.offset + amount)
+
+    def _on_mousewheel(self, event):
+        self.scroll_to(self.offset - 3 * (1 if event.delta > 0 else -1))
+
+    def scroll_to(self, offset: int):
+        if self.frozen:
+            return
+        total = len(self.inventory.products)
+        offset = max(0, min(offset, total - self.visible_rows))
+        if offset != self.offset:
+            self.offset = offset
+            self.refresh()
+
+    def refresh(self):
+        if self.frozen:
+            with self._lock:
+                self._pending_refresh = True  # Done once the view is unfrozen
+            return
+        total = len(self.inventory.products)
+        self.offset = max(0, min(self.offset, total - self.visible_rows))
+        page = self.inventory.query(self.order_by, self.descending, self.offset, self.visible_rows).rows
+
+        self.tree.delete(*self.tree.get_children())
+        self._rows = {}
+        for product in page:
+            self._rows[product.id] = self.tree.insert("", "end", values=product_values(product))
+
+        if total:
+            self.scrollbar.set(self.offset / total, min(1.0, (self.offset + len(page)) / total))
+        else:
+            self.scrollbar.set(0.0, 1.0)
+
+    def sort_by(self, column: str):
+        if column == self.order_by:
+            self.descending = not self.descending
+        else:
+            self.order_by, self.descending = column, False
+        for name, heading in zip(COLUMNS, HEADINGS):
+            arrow = (" \u25bc" if self.descending else " \u25b2") if name == self.order_by else ""
+            self.tree.heading(name, text=heading + arrow)
+        self.offset = 0
+        self.refresh()
+
+    def update_product(self, product):
+        item = self._rows.get(product.id)
+        if item is not None:
+            self.tree.item(item, values=product_values(product))
@@ -0,0 +1,207 @@
+import threading
+from bisect import bisect_left, bisect_right, insort
+from collections import namedtuple
+
+# Plain tuple with the product fields, much lighter than formatting the product as text
+ProductRow = namedtuple("ProductRow", ["id", "name", "price", "base_price", "quantity", "category", "entry_date", "exit_date"])
+
+
+def _date_key(value):
+    return value.toordinal() if value is not None else 0  # Products without a date sort first
+
+
+# Sort key of each field, read from a product (or from the old value of a changed field)
+SORT_KEYS = {
+    "id": lambda product: product.id,
+    "name": lambda product: product.name.lower(),
+    "category": lambda product: product.category,
+    "price": lambda product: product._price,
+    "base_price": lambda product: product._base_price,
+    "quantity": lambda product: product._quantity,
+    "entry_date": lambda product: _date_key(product._entry_date),
+    "exit_date": lambda product: _date_key(product._exit_date),
+}
+_VALUE_KEYS = {"price": float, "base_price": float, "quantity": int, "entry_date": _date_key, "exit_date": _date_key}
+_LAST = float("inf")  # Sorts after every id, to bisect past all the entries of a key
+
+
+def product_row(product):
+    return ProductRow(product.id, product.name, product._price, product._base_price, product._quantity,
+                      product.category, product._entry_date, product._exit_date)
+
+
+def matcher(category: str = None, quantity=None, price=None, entry_date=None):
+    ''' Function telling if a product passes the filters of a query, None if there are no filters '''
+    checks = []  # (attribute, low, high) of the range filters
+    for attribute, bounds in (("_quantity", quantity), ("_price", price), ("_entry_date", entry_date)):
+        if bounds is not None and bounds != (None, None):
+            checks.append((attribute, bounds[0], bounds[1]))
+    if category is None and not checks:
+        return None
+
+    def matches(product):
+        if category is not None and product.category != category:
+            return False
+        for attribute, low, high in checks:
+            value = getattr(product, attribute)
+            if value is None or (low is not None and value < low) or (high is not None and value > high):
+                return False
+        return True
+    return matches
+
+
+class Page:
+    """
+    One page of a query.
+
+    Attributes:
+        rows (list): ProductRow tuples, in the order of the query.
+        next_cursor (tuple | None): Pass it as after= to get the next page (keyset pagination);
+            None when the query has no more rows.
+    """
+
+    def __init__(self, rows: list, next_cursor):
+        self.rows = rows
+        self.next_cursor = next_cursor
+
+    def __iter__(self):
+        return iter(self.rows)
+
+    def __len__(self):
+        return len(self.rows)
+
+
+class QueryIndexes:
+    """
+    Presorted indexes of (sort key, id) per field, for Inventory.query.
+
+    An index is built the first time a query sorts by its field, and from then on Inventory keeps it
+    current: additions, removals and changes move a single entry (a binary search and an insertion).
+    If a field changes for a large part of the products (a bulk discount) the index is dropped instead
+    and built again by the next query that needs it. The name index is the one Inventory keeps for
+    search_by_name_prefix.
+
+    Methods:
+        query(self, order_by, descending, offset, limit, after, **filters) -> Page:
+            See Inventory.query.
+    """
+
+    def __init__(self, products: dict, by_category: dict, name_index: list):
+        self._source = products  # id -> Product of the inventory
+        self._by_category = by_category
+        self._name_index = name_index
+        self._lock = threading.Lock()  # Products change under different stripe locks
+        self.clear()
+
+    def clear(self):
+        self._indexes = {}  # field -> sorted list of (key, id)
+        self._updates = {}  # field -> entries moved since the index was built
+
+    def _index(self, field: str):
+        if field == "name":
+            return self._name_index
+        entries = self._indexes.get(field)
+        if entries is None:
+            key = SORT_KEYS[field]
+            entries = self._indexes[field] = sorted((key(product), id) for id, product in self._source.items())
+            self._updates[field] = 0
+        return entries
+
+    def add(self, product):
+        with self._lock:
+            for field, entries in self._indexes.items():
+                entry = (SORT_KEYS[field](product), product.id)
+                self._delete(entries, entry)  # Already there if a query built the index after the product was stored
+                insort(entries, entry)
+
+    def remove(self, product):
+        with self._lock:
+            for field, entries in self._indexes.items():
+                self._delete(entries, (SORT_KEYS[field](product), product.id))
+
+    @staticmethod
+    def _delete(entries: list, entry: tuple):
+        i = bisect_left(entries, entry)
+        if i < len(entries) and entries[i] == entry:
+            del entries[i]
+
+    def changed(self, product, field: str, old):
+        if field not in self._indexes:
+            return
+        with self._lock:
+            entries = self._indexes.get(field)
+            if entries is None:
+                return
+            updates = self._updates[field] = self._updates[field] + 1
+            if updates > max(1000, len(entries) // 8):
+                del self._indexes[field]  # Cheaper to sort again than to move most entries one by one
+                return
+            # The field is set before this runs, so a query may have built the index with the new value
+            entry = (SORT_KEYS[field](product), product.id)
+            self._delete(entries, (_VALUE_KEYS[field](old), product.id))
+            self._delete(entries, entry)
+            insort(entries, entry)
+
+    def query(self, order_by: str = None, descending: bool = False, offset: int = 0, limit: int = 50, after=None,
+              category: str = None, quantity=None, price=None, entry_date=None):
+        if order_by is not None and order_by not in SORT_KEYS:
+            raise ValueError(f"Cannot sort by {order_by}, use one of {', '.join(SORT_KEYS)}.")
+        if after is not None and order_by is None:
+            raise ValueError("Keyset pagination (after) needs order_by.")
+        offset, limit = max(offset, 0), max(limit, 0)
+        ranges = {"quantity": quantity, "price": price, "entry_date": entry_date}
+        # A range on the sort field is a slice of its index, the other filters are checked row by row
+        bounds = ranges.pop(order_by, None) if order_by is not None else None
+        matches = matcher(category, **ranges)
+
+        products = self._source
+        if order_by is None:
+            # Insertion order, through the category's ordered set if there is one
+            if category is None:
+                candidates = products.values()
+            else:
+                candidates = (products[id] for id in self._by_category.get(category, ()))
+            found = []
+            for product in candidates:
+                if matches is None or matches(product):
+                    if offset:
+                        offset -= 1
+                        continue
+                    found.append(product)
+                    if len(found) == limit:
+                        break
+            return Page([product_row(product) for product in found], None)
+
+        with self._lock:
+            entries = self._index(order_by)
+            low, high = 0, len(entries)
+            if bounds is not None and bounds != (None, None):
+                key = _VALUE_KEYS[order_by]
+                if bounds[0] is not None:
+                    low = bisect_left(entries, (key(bounds[0]),))
+                elif order_by == "entry_date":
+                    low = bisect_right(entries, (_date_key(None), _LAST))  # A range leaves out products without a date
+                if bounds[1] is not None:
+                    high = bisect_right(entries, (key(bounds[1]), _LAST))
+            if after is not None:
+                if descending:
+                    high = min(high, bisect_left(entries, tuple(after)))
+                else:
+                    low = max(low, bisect_right(entries, tuple(after)))
+            positions = range(high - 1, low - 1, -1) if descending else range(low, high)
+
+            if matches is None:
+                positions = positions[offset:offset + limit]  # Nothing to filter: the page is a slice
+                picked = [entries[i] for i in positions]
+            else:
+                picked = []
+                for i in positions:
+                    if matches(products[entries[i][1]]):
+                        if offset:
+                            offset -= 1
+                            continue
+                        picked.append(entries[i])
+                        if len(picked) == limit:
+                            break
+            rows = [product_row(products[id]) for _, id in picked]
+        return Page(rows, picked[-1] if picked and len(picked) == limit else None)
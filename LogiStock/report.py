@@ -1,47 +1,143 @@
 from inventory import Inventory
+import csv
+import json
+import os
 import threading
-from tkinter import filedialog, messagebox
+
+PROGRESS_EVERY = 5000  # rows between progress updates
+
+
+class TextReportSink:
+    """ Writes the classic .txt report, one line per product """
+
+    def __init__(self, file):
+        self.file = file
+
+    def write_header(self):
+        self.file.write("📦 INVENTORY REPORT 📦\n\n")
+        self.file.write("Product Name | Entry Date | Exit Date | Current Quantity | Quantity Changes\n")
+        self.file.write("-" * 80 + "\n")
+
+    def write_row(self, product):
+        exit_date = product.exit_date if product.exit_date else "Still in stock"
+        write = self.file.write
+        write(f"{product.name} | {product.entry_date} | {exit_date} | {product.quantity} | ")
+        separator = ""
+        for date, change in product.quantity_history:
+            write(f"{separator}{change} on {date}")
+            separator = ", "
+        write("\n")
+
+
+class CsvReportSink:
+    """ Writes one csv row per product, the history as "quantity@timestamp" items separated by ";" """
+
+    def __init__(self, file):
+        self.writer = csv.writer(file)
+
+    def write_header(self):
+        self.writer.writerow(["id", "name", "category", "entry_date", "exit_date", "quantity", "quantity_changes"])
+
+    def write_row(self, product):
+        changes = ";".join(f"{change}@{date.isoformat()}" for date, change in product.quantity_history)
+        self.writer.writerow([product.id, product.name, product.category, product.entry_date,
+                              product.exit_date or "", product.quantity, changes])
+
+
+class JsonLinesReportSink:
+    """ Writes one JSON object per line and product """
+
+    def __init__(self, file):
+        self.file = file
+
+    def write_header(self):
+        pass
+
+    def write_row(self, product):
+        self.file.write(json.dumps({
+            "id": product.id,
+            "name": product.name,
+            "category": product.category,
+            "entry_date": product.entry_date.isoformat() if product.entry_date else None,
+            "exit_date": product.exit_date.isoformat() if product.exit_date else None,
+            "quantity": product.quantity,
+            "quantity_changes": [[date.isoformat(), change] for date, change in product.quantity_history],
+        }, ensure_ascii=False))
+        self.file.write("\n")
+
+
+SINKS = {".txt": TextReportSink, ".csv": CsvReportSink, ".jsonl": JsonLinesReportSink}
+REPORT_FILETYPES = [("Text files", "*.txt"), ("CSV files", "*.csv"), ("JSON Lines", "*.jsonl"), ("All files", "*.*")]
+
+
+def sink_for(file_path: str):
+    """ Picks the sink class from the file extension, the text report by default """
+    return SINKS.get(os.path.splitext(file_path)[1].lower(), TextReportSink)
+
+
+def write_report(products, file_path: str, total: int = None, progress=None, cancel_event: threading.Event = None):
+    """
+    Streams the products to file_path one row at a time, so memory does not grow with the inventory.
+    The report is written to a temporary file that replaces file_path only when it is complete.
+    progress(rows_written, total) is called every PROGRESS_EVERY rows and at the end. If cancel_event is
+    set, writing stops, the partial file is removed and None is returned; otherwise the row count.
+    """
+    tmp_path = file_path + ".part"
+    sink_class = sink_for(file_path)
+    rows = 0
+    try:
+        with open(tmp_path, "w", encoding="utf-8", newline="" if sink_class is CsvReportSink else None) as file:
+            sink = sink_class(file)
+            sink.write_header()
+            for product in products:
+                if cancel_event is not None and cancel_event.is_set():
+                    break
+                sink.write_row(product)
+                rows += 1
+                if progress and rows % PROGRESS_EVERY == 0:
+                    progress(rows, total)
+        if cancel_event is not None and cancel_event.is_set():
+            os.remove(tmp_path)
+            return None
+        os.replace(tmp_path, file_path)
+    except BaseException:
+        if os.path.exists(tmp_path):
+            os.remove(tmp_path)
+        raise
+    if progress:
+        progress(rows, total)
+    return rows
+
 
 class Report:
+    """
+    Generates inventory reports (.txt, .csv or .jsonl). The GUI runs them as TaskRunner tasks.
+
+    Attributes:
+        cancel_event (threading.Event | None): Stops the writer between two rows when set, e.g. the
+            cancel_event of the task running the report.
+
+    Methods:
+        _generate_report_logic(self, file_path, progress=None) -> int | None:
+            Writes the report (no user interface involved), returns the rows written or None if cancelled.
+        _open_report(self, file_path):
+            Opens the written report with the program of the system.
+    """
+
     def __init__(self, inventory : Inventory):
         self.inventory = inventory
+        self.cancel_event = None
 
-    def _generate_report_logic(self, file_path):
-        """ Genera un reporte de inventario y lo guarda en un archivo .txt """
-        try:
-            with open(file_path, "w", encoding="utf-8") as file:
-                file.write("📦 INVENTORY REPORT 📦\n\n")
-                file.write("Product Name | Entry Date | Exit Date | Current Quantity | Quantity Changes\n")
-                file.write("-" * 80 + "\n")
-
-                for product in self.inventory.products:
-                    entry_date = product.entry_date
-                    exit_date = product.exit_date if product.exit_date else "Still in stock"
-                    quantity_changes = ", ".join([f"{change} on {date}" for date, change in product.quantity_history])
-                    
-                    file.write(f"{product.name} | {entry_date} | {exit_date} | {product.quantity} | {quantity_changes}\n")
-            
-            messagebox.showinfo("Report Generated", f"Report saved successfully:\n{file_path}")
-            self._open_report(file_path)  # Abre el archivo después de crearlo
-
-        except Exception as e:
-            messagebox.showerror("Error", f"Failed to generate report: {str(e)}")
+    def _generate_report_logic(self, file_path, progress=None):
+        """ Genera un reporte de inventario y lo guarda en el archivo file_path """
+        return write_report(self.inventory.products, file_path, len(self.inventory.products),
+                            progress, self.cancel_event)
 
     def _open_report(self, file_path):
         """ Intenta abrir el archivo del reporte en el bloc de notas """
-        import os
         try:
             os.startfile(file_path)  # Windows
         except AttributeError:
             os.system(f"open {file_path}")  # macOS
         except Exception:
             os.system(f"xdg-open {file_path}")  # Linux
-
-    def generate_current_report(self):
-        """ Permite al usuario elegir dónde guardar el archivo y genera el reporte en un hilo separado """
-        file_path = filedialog.asksaveasfilename(defaultextension=".txt",
-                                                 filetypes=[("Text files", "*.txt"), ("All files", "*.*")],
-                                                 title="Save Report As")
-        if file_path:
-            thread = threading.Thread(target=self._generate_report_logic, args=(file_path,))
-            thread.start()
\ No newline at end of file
@@ -0,0 +1,262 @@
+from datetime import date, datetime
+
+REJECT = object()  # Field.invalid default: an invalid value rejects the row
+
+
+def _positive(value):
+    return value > 0
+
+
+def _not_negative(value):
+    return value >= 0
+
+
+class Field:
+    """
+    How one input is checked and converted.
+
+    Attributes:
+        kind: int, float, str, date, or any callable that converts a string and raises ValueError.
+        required (bool): If False an empty input becomes default instead of an error.
+        default: Value of an empty (or missing) input; a callable is called once per batch (e.g. date.today).
+        invalid: Value of an input that cannot be converted, instead of rejecting the row (REJECT).
+            A callable is called once per batch, like default.
+        check (callable): Extra condition on the converted value, message is the error when it fails.
+    """
+
+    def __init__(self, kind, required: bool = True, default=None, invalid=REJECT, check=None, message: str = None):
+        self.kind = kind
+        self.required = required
+        self.default = default
+        self.invalid = invalid
+        self.check = check
+        self.message = message
+
+
+class ValidationReport:
+    """
+    Result of Schema.validate_batch.
+
+    Attributes:
+        records (list): Tuples with the converted values of the valid rows, in the order of the schema fields.
+        positions (list): Position in the batch of each record, so records can be matched with their rows.
+        errors (list): (position, field, message) of every error, by position. A row can have several.
+        rejected (int): Number of rows with at least one error.
+    """
+
+    def __init__(self):
+        self.records = []
+        self.positions = []
+        self.errors = []
+        self.rejected = 0
+
+    @property
+    def ok(self):
+        return self.rejected == 0
+
+    def row_errors(self):
+        ''' {position: "message; message"} of the rejected rows '''
+        messages = {}
+        for position, _, message in self.errors:
+            messages[position] = f"{messages[position]}; {message}" if position in messages else message
+        return messages
+
+    def __str__(self):
+        return f"{len(self.records)} rows valid, {self.rejected} rows rejected."
+
+
+class Schema:
+    """
+    Validator compiled once from a {name: type or Field} mapping, the same mapping validate_inputs takes.
+
+    A batch is validated column by column instead of row by row: numbers are converted with one map()
+    over the column, which runs in C and only falls back to checking value by value when the column has
+    an error, and dates are parsed once per distinct text, since the same dates repeat a lot in a batch.
+
+    Methods:
+        validate_row(self, values, columns: dict = None) -> tuple:
+            (record, errors) of one row; record is None if errors is not empty.
+        validate_batch(self, rows, columns: dict = None) -> ValidationReport:
+            Validates many rows in one pass.
+    """
+
+    def __init__(self, fields: dict):
+        self.fields = {name: spec if isinstance(spec, Field) else Field(spec) for name, spec in fields.items()}
+        self.names = tuple(self.fields)
+        self._converters = {name: self._compile(field) for name, field in self.fields.items()}
+
+    @staticmethod
+    def _compile(field: Field):
+        if field.kind is str:
+            return None  # Nothing to convert
+        if field.kind is date:
+            return _parse_date
+        return field.kind
+
+    @staticmethod
+    def _value(value):
+        return value() if callable(value) else value
+
+    def validate_row(self, values, columns: dict = None):
+        '''
+        values is a sequence with the fields in the order of the schema (or at the positions given by
+        columns, {name: index}) or a dict {name: text}. Errors are (field, message) in field order.
+        '''
+        report = self.validate_batch([values], columns)
+        errors = [(name, message) for _, name, message in report.errors]
+        return (report.records[0] if report.records else None), errors
+
+    def validate_batch(self, rows, columns: dict = None):
+        '''
+        Validates rows (sequences of strings, or dicts keyed by field name) and returns a ValidationReport.
+        columns maps field names to positions in the rows, by default the fields are in schema order.
+        A field that is not in columns, not in a dict row or past the end of a short row counts as empty.
+        '''
+        rows = rows if isinstance(rows, list) else list(rows)
+        report = ValidationReport()
+        size = len(rows)
+        if not size:
+            return report
+        by_name = isinstance(rows[0], dict)
+        if by_name:
+            keys = {name: name for name in self.names}
+        else:
+            keys = columns if columns is not None else {name: i for i, name in enumerate(self.names)}
+            width = max(keys.values(), default=-1) + 1
+            if min(map(len, rows)) < width:  # Short rows (e.g. scanned records) leave out the last fields
+                rows = [row if len(row) >= width else list(row) + [""] * (width - len(row)) for row in rows]
+            table = list(zip(*rows))  # Transposed in C: table[i] is column i
+
+        bad = set()  # Positions of the rejected rows
+        errors = []
+        converted = []
+        for name in self.names:
+            field = self.fields[name]
+            key = keys.get(name)
+            if key is None:
+                if field.required:
+                    errors.extend((i, name, f"Input for {name} cannot be empty.") for i in range(size))
+                    bad.update(range(size))
+                converted.append([self._value(field.default)] * size)
+                continue
+            texts = [row.get(key, "") for row in rows] if by_name else table[key]
+            converted.append(self._convert_column(name, field, texts, errors, bad))
+
+        if errors:
+            report.errors = sorted(errors, key=lambda error: error[0])  # Stable: field order within a row
+            report.rejected = len(bad)
+            report.positions = [i for i in range(size) if i not in bad]
+            records = list(zip(*converted))
+            report.records = [records[i] for i in report.positions]
+        else:
+            report.positions = list(range(size))
+            report.records = list(zip(*converted))
+        return report
+
+    def _convert_column(self, name: str, field: Field, texts: list, errors: list, bad: set):
+        convert = self._converters[name]
+        values = None
+        if convert is _parse_date:
+            values = self._convert_dates(texts, field)
+        elif convert is None:
+            if all(texts):
+                values = texts
+        else:
+            try:
+                values = list(map(convert, texts))  # Fast path: the whole column is valid
+            except (ValueError, TypeError):
+                pass
+        slow = values is None
+        if slow:
+            values = self._convert_slowly(name, field, convert, texts, errors, bad)
+
+        check = field.check
+        # A clean column is checked with one all() in C; dates may hold None, they go value by value
+        if check is not None and (slow or convert is _parse_date or not all(map(check, values))):
+            message = field.message or f"Invalid input for {name}."
+            for i, value in enumerate(values):
+                if value is not None and value is not REJECT and not check(value):
+                    errors.append((i, name, message))
+                    bad.add(i)
+        if slow:
+            for i, value in enumerate(values):
+                if value is REJECT:
+                    values[i] = None
+        return values
+
+    def _convert_dates(self, texts: list, field: Field):
+        parsed = {}
+        for text in set(texts):  # Each distinct date is parsed once
+            if not text:
+                if field.required:
+                    return None
+                parsed[text] = self._value(field.default)
+                continue
+            try:
+                parsed[text] = _parse_date(text)
+            except ValueError:
+                if field.invalid is REJECT:
+                    return None
+                parsed[text] = self._value(field.invalid)
+        return list(map(parsed.__getitem__, texts))
+
+    def _convert_slowly(self, name: str, field: Field, convert, texts: list, errors: list, bad: set):
+        ''' Converts value by value, recording the errors; REJECT marks the values of rejected rows '''
+        default = self._value(field.default)
+        invalid = self._value(field.invalid) if field.invalid is not REJECT else REJECT
+        values = []
+        for i, text in enumerate(texts):
+            if not text:
+                if field.required:
+                    errors.append((i, name, f"Input for {name} cannot be empty."))
+                    bad.add(i)
+                    values.append(REJECT)
+                else:
+                    values.append(default)
+                continue
+            if convert is None:
+                values.append(text)
+                continue
+            try:
+                values.append(convert(text))
+            except (ValueError, TypeError) as e:
+                if invalid is REJECT:
+                    errors.append((i, name, f"Invalid input for {name}: {e}"))
+                    bad.add(i)
+                values.append(invalid)
+        return values
+
+
+def _parse_date(text: str):
+    try:
+        return date.fromisoformat(text)
+    except ValueError:
+        return datetime.fromisoformat(text).date()  # Also accepts "YYYY-MM-DD HH:MM:SS"
+
+
+# Fields of a product, in the order of the Product constructor, as they are stored in a csv file.
+# As the loader always did, an empty name or category is kept, a bad entry date becomes today and
+# a bad exit date is left empty.
+PRODUCT_FIELDS = {
+    "id": int,
+    "name": Field(str, required=False, default=""),
+    "price": Field(float, check=_positive, message="Price must be greater than 0."),
+    "quantity": int,
+    "category": Field(str, required=False, default=""),
+    "entry_date": Field(date, required=False, invalid=date.today),
+    "exit_date": Field(date, required=False, invalid=None),
+    "base_price": Field(float, check=_positive, message="Base price must be greater than 0."),
+}
+PRODUCT_SCHEMA = Schema(PRODUCT_FIELDS)
+
+# Pasted or scanned records and the server's add requests need a name and a category, like the form,
+# but may leave out the dates and the base price (the price is used); a new product cannot start with
+# a negative stock
+IMPORT_SCHEMA = Schema({
+    **PRODUCT_FIELDS,
+    "name": str,
+    "quantity": Field(int, check=_not_negative, message="Quantity cannot be negative."),
+    "category": str,
+    "entry_date": Field(date, required=False, default=date.today, invalid=REJECT),
+    "base_price": Field(float, required=False, check=_positive, message="Base price must be greater than 0."),
+})
@@ -0,0 +1,305 @@
+import re
+import unicodedata
+from array import array
+from bisect import bisect_left, insort
+
+# Kinds of match between a query term and a word, best first
+EXACT, PREFIX, SUBSTRING, FUZZY = 4, 3, 2, 1
+
+_WORD = re.compile(r"\w+")
+_TERM_CACHE_SIZE = 256
+_COUNT_CAP = 500  # Candidates that are all scored; above it they are read until there are enough results
+
+
+def _strip_accents(text: str):
+    return "".join(char for char in unicodedata.normalize("NFKD", text) if not unicodedata.combining(char))
+
+
+# Accented Latin letters mapped to their base letter with str.translate, much faster than unicodedata
+_ACCENTS = str.maketrans({chr(code): _strip_accents(chr(code)) for code in range(0xC0, 0x250)
+                          if len(_strip_accents(chr(code))) == 1 and _strip_accents(chr(code)) != chr(code)})
+
+
+def normalize(text: str):
+    """ Lowercase text without accents: "Café Molido" -> "cafe molido" """
+    text = text.lower()
+    if text.isascii():
+        return text
+    text = text.translate(_ACCENTS)
+    return text if text.isascii() else _strip_accents(text)
+
+
+def tokenize(text: str):
+    return _WORD.findall(normalize(text))
+
+
+def trigrams(word: str):
+    return {word[i:i + 3] for i in range(len(word) - 2)}
+
+
+def padded_trigrams(word: str):
+    """ Trigrams of " word ": the first and last letters get their own, so short words with a typo still share one """
+    return trigrams(f" {word} ")
+
+
+def max_typos(term: str):
+    """ Edits tolerated for a term: none under 4 letters, 1 up to 7, then 2 """
+    return 0 if len(term) < 4 else 1 if len(term) < 8 else 2
+
+
+def within_distance(a: str, b: str, limit: int):
+    """ True if a and b are at most limit edits apart (insertion, deletion, substitution or swap of two letters) """
+    if abs(len(a) - len(b)) > limit:
+        return False
+    before, previous = None, list(range(len(b) + 1))
+    for i, char_a in enumerate(a, 1):
+        current = [i]
+        for j, char_b in enumerate(b, 1):
+            cost = min(previous[j] + 1, current[j - 1] + 1, previous[j - 1] + (char_a != char_b))
+            if j > 1 and i > 1 and char_a == b[j - 2] and a[i - 2] == char_b:
+                cost = min(cost, before[j - 2] + 1)  # Swapped letters
+            current.append(cost)
+        if min(current) > limit:
+            return False
+        before, previous = previous, current
+    return previous[-1] <= limit
+
+
+class SearchIndex:
+    """
+    Inverted index over the words of the product names and categories, for the search box.
+
+    Every word points to the IDs of the products that contain it (a single int while there is only
+    one, then an array). The sorted vocabulary answers prefix matches with a binary search, and a
+    trigram index over the words that are not numbers finds substrings and typos (1 edit, or 2 for
+    words of 8 letters or more, a swap of two letters counting as one) without reading every word.
+
+    A query matches the products that contain every one of its terms. Products are scored per
+    term (exact word > prefix > substring > typo, names weigh double than categories). The ids of
+    the terms are intersected, most selective first, until few candidates are left, and those are
+    ranked exactly; a query that still matches a large part of the catalog is read from its best
+    words and stops after limit results. Removed products are dropped lazily: their postings are
+    checked against the current products and the index is rebuilt once half of them are stale.
+
+    The index is built on the first search and then follows Inventory through add/remove.
+
+    Methods:
+        search(self, query: str, limit: int = 50) -> list:
+            Best matching products, best first.
+        build(self):
+            Indexes every product of the inventory (done by the first search).
+    """
+
+    def __init__(self, products: dict):
+        self._source = products  # id -> Product of the inventory
+        self.clear()
+
+    def clear(self):
+        ''' Empties the index, the next search builds it again '''
+        self.built = False
+        self._postings = {}     # word -> product id, or array of ids
+        self._vocabulary = []   # sorted words
+        self._trigrams = {}     # trigram -> set of words (numbers are only matched by prefix)
+        self._entries = 0
+        self._stale = 0
+        self._term_cache = {}   # term -> {word: kind of match}, valid until the vocabulary changes
+
+    def build(self):
+        self.clear()
+        words = set()
+        for product in self._source.values():
+            for word in self._product_words(product):
+                self._post(word, product.id)
+                words.add(word)
+        self._vocabulary = sorted(words)
+        for word in self._vocabulary:
+            self._index_word(word)
+        self.built = True
+
+    @staticmethod
+    def _product_words(product):
+        return set(tokenize(product.name)) | set(tokenize(product.category))
+
+    def _post(self, word: str, id: int):
+        ids = self._postings.get(word)
+        if ids is None:
+            self._postings[word] = id
+        elif type(ids) is int:
+            self._postings[word] = array("q", (ids, id))
+        else:
+            ids.append(id)
+        self._entries += 1
+
+    def _index_word(self, word: str):
+        if not word.isdigit():
+            for trigram in padded_trigrams(word):
+                self._trigrams.setdefault(trigram, set()).add(word)
+
+    def add(self, product):
+        if not self.built:
+            return
+        for word in self._product_words(product):
+            if word not in self._postings:
+                insort(self._vocabulary, word)
+                self._index_word(word)
+                self._term_cache.clear()
+            self._post(word, product.id)
+
+    def add_many(self, products):
+        if self.built:
+            for product in products:
+                self.add(product)
+
+    def remove(self, product):
+        if not self.built:
+            return
+        self._stale += len(self._product_words(product))
+        if self._stale * 2 > self._entries:
+            self.built = False  # Compacted by rebuilding on the next search
+
+    def _word_count(self, word: str):
+        ids = self._postings.get(word)
+        return 0 if ids is None else 1 if type(ids) is int else len(ids)
+
+    def _term_words(self, term: str):
+        ''' Yields (word, kind of match) for the words that match term, best kind first '''
+        if term in self._postings:
+            yield term, EXACT
+        i = bisect_left(self._vocabulary, term)
+        while i < len(self._vocabulary) and self._vocabulary[i].startswith(term):
+            if self._vocabulary[i] != term:
+                yield self._vocabulary[i], PREFIX
+            i += 1
+        if len(term) < 3:
+            return
+        grams = trigrams(term)
+        postings = sorted((self._trigrams.get(gram, ()) for gram in grams), key=len)
+        if postings and postings[0]:
+            candidates = set(postings[0]).intersection(*postings[1:])
+            for word in sorted(word for word in candidates if term in word and not word.startswith(term)):
+                yield word, SUBSTRING
+        typos = max_typos(term)
+        if typos:
+            # A word within the distance shares at least len(grams) - 4 * typos trigrams with the term:
+            # an insertion, deletion or substitution changes up to 3 of them, a swap of two letters 4
+            grams = padded_trigrams(term)
+            counts = {}
+            for gram in grams:
+                for word in self._trigrams.get(gram, ()):
+                    counts[word] = counts.get(word, 0) + 1
+            needed = max(1, len(grams) - 4 * typos)
+            for word in sorted(word for word, count in counts.items() if count >= needed):
+                if term not in word and within_distance(term, word, typos):
+                    yield word, FUZZY
+
+    def _words_of(self, term: str):
+        ''' {word: kind of match} for term, cached: typing a query repeats its first terms many times '''
+        words = self._term_cache.get(term)
+        if words is None:
+            if len(self._term_cache) >= _TERM_CACHE_SIZE:
+                del self._term_cache[next(iter(self._term_cache))]
+            words = self._term_cache[term] = dict(self._term_words(term))
+        return words
+
+    def _ids(self, words):
+        for word in words:
+            ids = self._postings[word]
+            if type(ids) is int:
+                yield ids
+            else:
+                yield from ids
+
+    def _id_set(self, words):
+        ids = set()
+        for word in words:
+            posting = self._postings[word]
+            if type(posting) is int:
+                ids.add(posting)
+            else:
+                ids.update(posting)
+        return ids
+
+    def _intersect(self, candidates: set, words):
+        ''' The candidates that contain one of words, without building the set of ids of words '''
+        found = set()
+        for word in words:
+            posting = self._postings[word]
+            if type(posting) is int:
+                if posting in candidates:
+                    found.add(posting)
+            else:
+                found.update(candidates.intersection(posting))
+        return found
+
+    def _estimate(self, term: str, cap: int):
+        ''' Number of postings of the words of term, counting stops at cap '''
+        total = 0
+        for word, _ in self._term_words(term):
+            total += self._word_count(word)
+            if total >= cap:
+                break
+        return total
+
+    @staticmethod
+    def _score(product, kinds: dict):
+        ''' Sum of the best match of every term, names counting double; None if a term does not match '''
+        names, categories = tokenize(product.name), tokenize(product.category)
+        score = 0
+        for words in kinds.values():
+            best = max([2 * words.get(word, 0) for word in names] + [words.get(word, 0) for word in categories])
+            if not best:
+                return None
+            score += best
+        return score
+
+    def search(self, query: str, limit: int = 50):
+        terms = tokenize(query)
+        if not terms or limit <= 0:
+            return []
+        if not self.built:
+            self.build()
+        terms = list(dict.fromkeys(terms))
+
+        # The ids of the terms are intersected from the most selective one until few candidates are
+        # left; those are all scored, so the ranking is exact. A single frequent term is not
+        # materialized: its ids are read from the best matching words until limit products match.
+        kinds = {}  # term -> {word: kind of match}
+        candidates = None
+        if len(terms) > 1 or self._estimate(terms[0], _COUNT_CAP) < _COUNT_CAP:
+            kinds = {term: self._words_of(term) for term in terms}
+            sizes = {term: sum(map(self._word_count, kinds[term])) for term in terms}
+            terms.sort(key=lambda term: (sizes[term], -len(term)))
+            for term in terms:
+                if candidates is not None and (len(candidates) <= _COUNT_CAP or len(term) < 2):
+                    break
+                candidates = self._id_set(kinds[term]) if candidates is None else self._intersect(candidates, kinds[term])
+
+        scores = {}  # product id -> score, None if it does not match
+        if candidates is not None and len(candidates) <= _COUNT_CAP:
+            for id in candidates:
+                product = self._source.get(id)
+                scores[id] = self._score(product, kinds) if product is not None else None
+        else:
+            # Words are read best first, so the typo candidates of a single term are only looked
+            # for if the better matches did not fill the results
+            driver = terms[0]
+            lazy = driver not in kinds
+            words = kinds.setdefault(driver, {})
+            matches = 0
+            for word, kind in (self._term_words(driver) if lazy else list(words.items())):
+                words[word] = kind
+                for id in self._ids((word,)):
+                    if id in scores or (candidates is not None and id not in candidates):
+                        continue
+                    product = self._source.get(id)
+                    score = scores[id] = self._score(product, kinds) if product is not None else None
+                    if score is not None:
+                        matches += 1
+                        if matches >= limit:
+                            break
+                if matches >= limit:
+                    break
+
+        found = [(score, self._source[id]) for id, score in scores.items() if score is not None]
+        found.sort(key=lambda entry: (-entry[0], len(entry[1].name), entry[1].name.lower(), entry[1].id))
+        return [product for _, product in found[:limit]]
@@ -0,0 +1,285 @@
+"""
+Asyncio service that exposes an Inventory over a local socket (TCP or Unix), for scanners and
+other processes. The protocol is line-delimited JSON: each request is one line such as
+
+    {"id": 7, "op": "register_entry", "product_id": 3, "quantity": 10}
+
+and gets one response line with the same id:
+
+    {"id": 7, "ok": true, "result": {...}}   or   {"id": 7, "ok": false, "error": "..."}
+
+Operations: ping, search, add, remove, update_quantity, register_entry, register_exit, movements.
+Clients may pipeline requests (send many lines without waiting); responses come back in request order.
+
+Run from the LogiStock folder:
+    python server.py --csv inventory.csv --port 8765
+    python server.py --csv inventory.csv --unix /tmp/logistock.sock
+"""
+import argparse
+import asyncio
+import json
+from inventory import Inventory
+from product import Product
+from schema import IMPORT_SCHEMA
+
+DEFAULT_PORT = 8765
+MAX_LINE = 1 << 20       # longest request accepted, in bytes
+MAX_WRITE_BATCH = 4096   # movements applied together by the writer task
+
+
+def product_to_dict(product):
+    return {
+        "id": product.id,
+        "name": product.name,
+        "price": product.price,
+        "base_price": product.base_price,
+        "quantity": product.quantity,
+        "category": product.category,
+        "entry_date": product.entry_date.isoformat() if product.entry_date else None,
+        "exit_date": product.exit_date.isoformat() if product.exit_date else None,
+    }
+
+
+def _int(request, key):
+    value = request.get(key)
+    if type(value) is not int:
+        raise ValueError(f"'{key}' must be an integer.")
+    return value
+
+
+class InventoryServer:
+    """
+    Serves an Inventory to many concurrent clients.
+
+    Reads (search, ping) are answered as soon as they are parsed. Stock movements are queued and
+    applied by a single writer task that takes every pending movement at once and applies them as one
+    Inventory.apply_movements batch (one history entry per product); if that batch is rejected, each
+    movement is applied on its own so one bad request does not fail the others, and if applying it
+    raises (e.g. the log cannot be written) every request of the group gets an error. Responses are written
+    in request order by one sender task per connection, flushed once per group of pipelined requests.
+    A movement is applied when its response is sent, so a client that needs to read its own write
+    waits for that response before sending the read.
+
+    Methods:
+        start(self):
+            Opens the listening socket and starts the writer task.
+        serve_forever(self):
+            start() and wait until the server is closed.
+        close(self):
+            Stops accepting clients and the writer task.
+    """
+
+    def __init__(self, inventory: Inventory, host: str = "127.0.0.1", port: int = DEFAULT_PORT, unix_path: str = None):
+        self.inventory = inventory
+        self.host = host
+        self.port = port
+        self.unix_path = unix_path
+        self.server = None
+        self._movements = None
+        self._writer_task = None
+        self._connections = set()  # Tasks of the connected clients
+
+    async def start(self):
+        self._movements = asyncio.Queue()
+        self._writer_task = asyncio.create_task(self._apply_movements())
+        if self.unix_path:
+            self.server = await asyncio.start_unix_server(self._handle_client, self.unix_path, limit=MAX_LINE)
+        else:
+            self.server = await asyncio.start_server(self._handle_client, self.host, self.port, limit=MAX_LINE)
+            self.port = self.server.sockets[0].getsockname()[1]  # The real port when 0 was asked
+        return self
+
+    async def serve_forever(self):
+        await self.start()
+        async with self.server:
+            await self.server.serve_forever()
+
+    async def close(self):
+        if self.server is not None:
+            self.server.close()
+            await self.server.wait_closed()
+        for task in list(self._connections):
+            task.cancel()
+        await asyncio.gather(*self._connections, return_exceptions=True)
+        if self._writer_task is not None:
+            self._writer_task.cancel()
+
+    async def _handle_client(self, reader, writer):
+        # Requests are dispatched as soon as they are read; a sender task writes the responses in order,
+        # so a client can pipeline requests without waiting for each answer
+        task = asyncio.current_task()
+        self._connections.add(task)
+        responses = asyncio.Queue()
+        sender = asyncio.create_task(self._send_responses(responses, writer))
+        try:
+            while True:
+                line = await reader.readline()
+                if not line:
+                    break
+                responses.put_nowait(self._dispatch(line))
+            responses.put_nowait(None)
+            await sender
+        except (ConnectionError, ValueError):  # ValueError: request longer than MAX_LINE
+            pass
+        except asyncio.CancelledError:  # Server closing, the handler ends quietly
+            pass
+        finally:
+            sender.cancel()
+            writer.close()
+            self._connections.discard(task)
+
+    @staticmethod
+    async def _send_responses(responses, writer):
+        while True:
+            response = await responses.get()
+            if response is None:
+                break
+            if isinstance(response, asyncio.Future):
+                response = await response
+            writer.write(response)
+            if responses.empty():
+                await writer.drain()  # One flush for every group of pipelined responses
+        await writer.drain()
+
+    def _dispatch(self, line: bytes):
+        """ Returns the encoded response, or a future of it for queued movements """
+        request_id = None
+        try:
+            request = json.loads(line)
+            request_id = request.get("id")
+            op = request.get("op")
+            if op in ("register_entry", "register_exit"):
+                quantity = _int(request, "quantity")
+                if quantity <= 0:
+                    raise ValueError("Quantity must be greater than 0.")
+                movement = (_int(request, "product_id"), quantity if op == "register_entry" else -quantity)
+                return self._queue_movement(request_id, movement)
+            handler = getattr(self, "_op_" + str(op), None)
+            if handler is None:
+                raise ValueError(f"Unknown operation: {op}")
+            return self._encode(request_id, True, handler(request))
+        except (ValueError, TypeError, KeyError, AttributeError) as e:
+            return self._encode(request_id, False, str(e))
+
+    @staticmethod
+    def _encode(request_id, ok: bool, value):
+        key = "result" if ok else "error"
+        return (json.dumps({"id": request_id, "ok": ok, key: value}) + "\n").encode("utf-8")
+
+    def _queue_movement(self, request_id, movement):
+        future = asyncio.get_running_loop().create_future()
+        self._movements.put_nowait((request_id, movement, future))
+        return future
+
+    async def _apply_movements(self):
+        """ Writer task: group commit of the movements queued by every client """
+        while True:
+            group = [await self._movements.get()]
+            while not self._movements.empty() and len(group) < MAX_WRITE_BATCH:
+                group.append(self._movements.get_nowait())
+
+            try:
+                self._commit_group(group)
+            except Exception as e:  # e.g. the log cannot be written: the group fails, the writer keeps running
+                for request_id, _, future in group:
+                    if not future.done():
+                        future.set_result(self._encode(request_id, False, f"Movement failed: {e}"))
+
+    def _commit_group(self, group):
+        result = self.inventory.apply_movements([movement for _, movement, _ in group])
+        if result.applied:
+            # Each request gets the quantity right after its own movement, not after the whole group:
+            # walking back from the final quantities, the later movements of the product are undone
+            after = {}
+            responses = []
+            for request_id, (product_id, quantity), _ in reversed(group):
+                if product_id not in after:
+                    after[product_id] = self._quantity(product_id)
+                responses.append(self._encode(request_id, True, {"quantity": after[product_id]}))
+                after[product_id] -= quantity
+            for (_, _, future), response in zip(group, reversed(responses)):
+                future.set_result(response)
+            return
+        for request_id, movement, future in group:
+            single = self.inventory.apply_movements([movement])
+            if single.applied:
+                response = self._encode(request_id, True, {"quantity": self._quantity(movement[0])})
+            else:
+                response = self._encode(request_id, False, single.errors[0][3])
+            future.set_result(response)
+
+    def _quantity(self, product_id: int):
+        product = self.inventory.search_product(product_id)
+        if product is None:
+            raise ValueError(f"Product with ID {product_id} not found.")
+        return product.quantity
+
+    # Operations answered directly, each returns the "result" of the response
+
+    def _op_ping(self, request):
+        return "pong"
+
+    def _op_search(self, request):
+        product = self.inventory.search_product(_int(request, "product_id"))
+        if product is None:
+            raise ValueError(f"Product with ID {request['product_id']} not found.")
+        return product_to_dict(product)
+
+    def _op_add(self, request):
+        # JSON numbers are validated like the text of a pasted record
+        fields = {name: str(value) for name, value in request["product"].items() if value is not None}
+        record, errors = IMPORT_SCHEMA.validate_row(fields)
+        if errors:
+            raise ValueError("; ".join(message for _, message in errors))
+        product = Product(*record)
+        if not self.inventory.add_product(product):
+            raise ValueError("The product already exists in the inventory.")
+        return product_to_dict(product)
+
+    def _op_remove(self, request):
+        product_id = _int(request, "product_id")
+        if not self.inventory.remove_product(product_id):
+            raise ValueError(f"Product with ID {product_id} not found.")
+        return True
+
+    def _op_update_quantity(self, request):
+        product_id, quantity = _int(request, "product_id"), _int(request, "quantity")
+        if self.inventory.search_product(product_id) is None:
+            raise ValueError(f"Product with ID {product_id} not found.")
+        if quantity < 0:
+            raise ValueError("Quantity cannot be negative.")
+        self.inventory.update_quantity(product_id, quantity)
+        return {"quantity": quantity}
+
+    def _op_movements(self, request):
+        batch = [(int(product_id), quantity) for product_id, quantity in request["batch"]]
+        result = self.inventory.apply_movements(batch)
+        if not result.applied:
+            raise ValueError(str(result) + " " + "; ".join(
+                f"#{position} ({product_id}, {quantity}): {message}"
+                for position, product_id, quantity, message in result.errors[:20]))
+        return {"movements": result.movements, "products": result.products,
+                "units_in": result.units_in, "units_out": result.units_out}
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Serve an inventory over a local socket (line-delimited JSON).")
+    parser.add_argument("--csv", default="inventory.csv", help="inventory file to load (csv, .db or .snap)")
+    parser.add_argument("--host", default="127.0.0.1")
+    parser.add_argument("--port", type=int, default=DEFAULT_PORT)
+    parser.add_argument("--unix", help="listen on this Unix socket path instead of TCP")
+    args = parser.parse_args()
+
+    from storage import open_storage
+    inventory = Inventory()
+    print(inventory.open_storage(open_storage(args.csv)))
+    server = InventoryServer(inventory, args.host, args.port, args.unix)
+    print(f"Serving on {args.unix or f'{args.host}:{args.port}'}")
+    try:
+        asyncio.run(server.serve_forever())
+    except KeyboardInterrupt:
+        pass
+
+
+if __name__ == "__main__":
+    main()
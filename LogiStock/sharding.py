@@ -0,0 +1,371 @@
+"""
+Sharded inventory: the products are partitioned by id hash over several worker processes, each one
+owning a normal Inventory, so whole-catalog work (revaluations, stock checks, per-category totals)
+runs on every core at once instead of in one Python thread.
+
+    with ShardedInventory(shards=8) as inventory:
+        print(inventory.load_csv_stream("inventory.csv"))
+        print(inventory.apply_bulk_discount(10, category="Bebidas"))
+        print(inventory.stock_value())
+
+Functions sent to the shards (map_shards, predicates) must be defined at module level so they can
+be pickled, and products returned by the coordinator are copies: change them through its methods.
+"""
+import os
+import threading
+from contextlib import ExitStack
+from concurrent.futures import ProcessPoolExecutor
+from aggregates import StockSummary
+from csv_loader import DEFAULT_CHUNK_SIZE, LoadResult, iter_product_chunks
+from inventory import Inventory
+from movements import MovementResult, plan_movements
+from notifier import notifier
+from pricing import PricingSummary
+from product import Product
+
+# Inventory of the worker process, created by _init_shard
+_shard = None
+
+
+def _init_shard():
+    global _shard
+    _shard = Inventory()
+    notifier._subscribers.clear()  # A forked worker must not call the dialogs of the parent process
+
+
+# Functions run inside a shard process
+
+def _call(method: str, *args):
+    return getattr(_shard, method)(*args)
+
+
+def _map(func, *args):
+    return func(_shard, *args)
+
+
+def _bulk_add(products: list):
+    result = LoadResult(None)
+    result.loaded = len(products)
+    _shard._bulk_add(products, result)
+    return result.rejected, result.rejects
+
+
+def _finish_load():
+    _shard._name_index.sort()
+    _shard._saved_filename = None  # The shard holds part of filename, never save it over the whole file
+    _shard._emit("reset")
+    return len(_shard._products)
+
+
+def _clear():
+    with _shard._lock:
+        _shard._clear()
+
+
+def _register(id: int, quantity: int, entry: bool):
+    product = _shard.search_product(id)
+    if product is None:
+        return False
+    return product.register_entry(quantity) if entry else product.register_exit(quantity)
+
+
+def _check_movements(batch: list):
+    result, _ = plan_movements(batch, _shard.search_product)
+    return result
+
+
+def _load_shard(filename: str):
+    result = _shard.load_csv_stream(filename)
+    return result.loaded, result.rejected, result.rejects
+
+
+# Aggregations, also usable with a plain Inventory: func(inventory) -> partial result
+
+def product_count(inventory):
+    return len(inventory.products)
+
+
+def stock_totals(inventory):
+    """ (products, units, value at price, value at base price) of the inventory """
+    count = units = 0
+    value = base_value = 0.0
+    for product in inventory.products:
+        quantity = product._quantity
+        count += 1
+        units += quantity
+        value += product._price * quantity
+        base_value += product._base_price * quantity
+    return count, units, value, base_value
+
+
+def category_totals(inventory):
+    """ {category: [products, units, value at price]} """
+    totals = {}
+    for product in inventory.products:
+        entry = totals.get(product.category)
+        if entry is None:
+            entry = totals[product.category] = [0, 0, 0.0]
+        entry[0] += 1
+        entry[1] += product._quantity
+        entry[2] += product._price * product._quantity
+    return totals
+
+
+def low_stock_products(inventory, threshold: int):
+    """ Products with fewer than threshold units """
+    return [product for product in inventory.products if product._quantity < threshold]
+
+
+def stock_problems(inventory):
+    """ (product id, message) for every product whose stored data is not consistent """
+    problems = []
+    for product in inventory.products:
+        if type(product._quantity) is not int or product._quantity < 0:
+            problems.append((product.id, f"Invalid quantity: {product._quantity}"))
+        if product._price <= 0 or product._base_price <= 0:
+            problems.append((product.id, f"Invalid price: {product._price} (base {product._base_price})"))
+        if product.exit_date and product.entry_date and product.exit_date < product.entry_date:
+            problems.append((product.id, "Exit date before entry date."))
+    return problems
+
+
+class ShardedInventory:
+    """
+    Coordinator of an inventory split into shards, one worker process per shard.
+
+    A product lives in shard hash(id) % shards: lookups and changes of one product are sent to its
+    shard only, scans and aggregations are sent to every shard at once and their partial results
+    combined. Each shard runs its requests one at a time, in the order they were sent. Batches that
+    span several shards (apply_movements) are validated on every shard before any of them is applied,
+    holding the locks of those shards, which the single product changes also take: no exit can land
+    between the check and the apply of a batch.
+
+    Methods:
+        shard_of(self, id: int) -> int:
+            Shard that holds the product with that ID.
+        add_product / remove_product / update_quantity / register_entry / register_exit:
+            Same as Inventory and Product, routed to one shard; return True or False.
+        search_product(self, id: int) -> Product | None:
+            Copy of the product.
+        search_by_category / search_by_name_prefix(self, ...) -> list:
+            Copies of the matching products of every shard.
+        apply_movements(self, batch) -> MovementResult:
+            All or nothing batch of (product_id, +/-quantity) over every shard.
+        apply_bulk_discount / reset_prices(self, ...) -> PricingSummary:
+            Run on every shard in parallel.
+        stock_value(self) -> StockSummary, category_summary(self) -> dict,
+        low_stock(self, threshold) -> list, validate_stock(self) -> list:
+            Full-catalog aggregations computed by every shard in parallel.
+        map_shards(self, func, *args) -> list:
+            func(shard inventory, *args) on every shard, returns the partial results.
+        load_csv_stream(self, filename, chunk_size) -> LoadResult:
+            Reads a csv and distributes its products over the shards.
+        save_shards / load_shards(self, filename):
+            Every shard saves to or loads from its own csv file, in parallel.
+        close(self):
+            Stops the worker processes.
+    """
+
+    def __init__(self, shards: int = None):
+        self.shards = shards or os.cpu_count() or 1
+        self._executors = [ProcessPoolExecutor(max_workers=1, initializer=_init_shard) for _ in range(self.shards)]
+        # One per shard, taken by every change sent to it; several are always taken in shard order
+        self._locks = [threading.Lock() for _ in range(self.shards)]
+
+    def close(self):
+        for executor in self._executors:
+            executor.shutdown()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc_info):
+        self.close()
+        return False
+
+    def shard_of(self, id: int):
+        return hash(id) % self.shards
+
+    def _submit(self, shard: int, func, *args):
+        return self._executors[shard].submit(func, *args)
+
+    def _on_shard(self, id: int, func, *args):
+        return self._submit(self.shard_of(id), func, *args).result()
+
+    def _change_on_shard(self, id: int, func, *args):
+        shard = self.shard_of(id)
+        with self._locks[shard]:
+            return self._submit(shard, func, *args).result()
+
+    def _locked(self, shards=None):
+        ''' Holds the locks of shards (every shard by default), taken in order so two callers cannot deadlock '''
+        stack = ExitStack()
+        for shard in (range(self.shards) if shards is None else sorted(shards)):
+            stack.enter_context(self._locks[shard])
+        return stack
+
+    def _fan_out(self, func, *args):
+        ''' Runs func(*args) on every shard at once and returns the results in shard order '''
+        futures = [self._submit(shard, func, *args) for shard in range(self.shards)]
+        return [future.result() for future in futures]
+
+    def _split(self, items, key):
+        parts = [[] for _ in range(self.shards)]
+        for item in items:
+            parts[self.shard_of(key(item))].append(item)
+        return parts
+
+    def __len__(self):
+        return sum(self.map_shards(product_count))
+
+    def map_shards(self, func, *args):
+        ''' Returns [func(inventory of the shard, *args) for every shard], computed in parallel '''
+        return self._fan_out(_map, func, *args)
+
+    # Single product operations, routed to the shard of the product
+
+    def add_product(self, product: Product):
+        return self._change_on_shard(product.id, _call, "add_product", product)
+
+    def remove_product(self, id: int):
+        return self._change_on_shard(id, _call, "remove_product", id)
+
+    def search_product(self, id: int):
+        return self._on_shard(id, _call, "search_product", id)
+
+    def update_quantity(self, id: int, new_quantity: int):
+        return self._change_on_shard(id, _call, "update_quantity", id, new_quantity)
+
+    def register_entry(self, id: int, quantity: int):
+        return self._change_on_shard(id, _register, id, quantity, True)
+
+    def register_exit(self, id: int, quantity: int):
+        return self._change_on_shard(id, _register, id, quantity, False)
+
+    # Fan-out operations
+
+    def search_by_category(self, category: str):
+        return [product for part in self._fan_out(_call, "search_by_category", category) for product in part]
+
+    def search_by_name_prefix(self, prefix: str):
+        products = [product for part in self._fan_out(_call, "search_by_name_prefix", prefix) for product in part]
+        products.sort(key=lambda product: (product.name.lower(), product.id))
+        return products
+
+    def apply_movements(self, batch):
+        '''
+        Applies (product_id, quantity) movements all or nothing like Inventory.apply_movements. Every
+        shard checks its part of the batch first, and the parts are only applied if all of them are valid.
+        '''
+        batch = list(batch)
+        parts = self._split(range(len(batch)), lambda position: batch[position][0])
+        shards = [shard for shard in range(self.shards) if parts[shard]]
+        with self._locked(shards):
+            checks = [self._submit(shard, _check_movements, [batch[position] for position in parts[shard]])
+                      for shard in shards]
+            checks = [future.result() for future in checks]
+            result = MovementResult()
+            result.movements = len(batch)
+            for shard, check in zip(shards, checks):
+                result.products += check.products
+                result.units_in += check.units_in
+                result.units_out += check.units_out
+                # Positions in the shard part back to positions in the whole batch
+                result.errors += [(parts[shard][position], id, quantity, message)
+                                  for position, id, quantity, message in check.errors]
+            if result.errors:
+                result.errors.sort()
+                return result
+            applied = [self._submit(shard, _call, "apply_movements", [batch[position] for position in parts[shard]])
+                       for shard in shards]
+            result.applied = all(future.result().applied for future in applied)
+        return result
+
+    def _merge_pricing(self, summaries):
+        first = summaries[0]
+        return PricingSummary(first.operation, first.discount_pct, sum(summary.updated for summary in summaries),
+                              sum(summary.old_total for summary in summaries),
+                              sum(summary.new_total for summary in summaries))
+
+    def apply_bulk_discount(self, discount_pct: float, category: str = None, predicate=None, incremental: bool = False):
+        ''' Inventory.apply_bulk_discount on every shard; predicate must be a module level function '''
+        return self._merge_pricing(self._fan_out(_call, "apply_bulk_discount", discount_pct, category, predicate, incremental))
+
+    def reset_prices(self, category: str = None, predicate=None):
+        return self._merge_pricing(self._fan_out(_call, "reset_prices", category, predicate))
+
+    def stock_value(self):
+        totals = self.map_shards(stock_totals)
+        return StockSummary(*(sum(column) for column in zip(*totals)))
+
+    def category_summary(self):
+        ''' {category: (products, units, value at price)} over every shard '''
+        merged = {}
+        for totals in self.map_shards(category_totals):
+            for category, (count, units, value) in totals.items():
+                entry = merged.setdefault(category, [0, 0, 0.0])
+                entry[0] += count
+                entry[1] += units
+                entry[2] += value
+        return {category: tuple(entry) for category, entry in sorted(merged.items())}
+
+    def low_stock(self, threshold: int):
+        ''' Copies of the products with fewer than threshold units, lowest stock first '''
+        products = [product for part in self.map_shards(low_stock_products, threshold) for product in part]
+        products.sort(key=lambda product: (product.quantity, product.id))
+        return products
+
+    def validate_stock(self):
+        return sorted(problem for part in self.map_shards(stock_problems) for problem in part)
+
+    # Loading and saving
+
+    def load_csv_stream(self, filename: str = "inventory.csv", chunk_size: int = DEFAULT_CHUNK_SIZE, progress=None):
+        '''
+        Replaces the content of the shards with the products of a csv file. The file is parsed here and
+        every chunk is distributed while the shards are still indexing the previous one.
+        '''
+        result = LoadResult(filename)
+        with self._locked():
+            self._fan_out(_clear)
+            pending = []
+            for chunk in iter_product_chunks(filename, result, chunk_size, progress):
+                for future in pending:
+                    self._add_rejects(result, *future.result())
+                pending = [self._submit(shard, _bulk_add, part)
+                           for shard, part in enumerate(self._split(chunk, lambda product: product.id)) if part]
+            for future in pending:
+                self._add_rejects(result, *future.result())
+            self._fan_out(_finish_load)
+        return result
+
+    @staticmethod
+    def _add_rejects(result: LoadResult, rejected: int, rejects: list):
+        result.loaded -= rejected
+        result.rejected += rejected
+        result.rejects += rejects[:max(0, 1000 - len(result.rejects))]
+
+    def shard_filename(self, filename: str, shard: int):
+        ''' inventory.csv -> inventory.3-of-8.csv '''
+        root, extension = os.path.splitext(filename)
+        return f"{root}.{shard}-of-{self.shards}{extension}"
+
+    def save_shards(self, filename: str = "inventory.csv"):
+        ''' Every shard writes its products to its own csv (see shard_filename) in parallel, returns the rows written '''
+        with self._locked():
+            futures = [self._submit(shard, _call, "save_csv", self.shard_filename(filename, shard))
+                       for shard in range(self.shards)]
+            return sum(future.result() for future in futures)
+
+    def load_shards(self, filename: str = "inventory.csv"):
+        ''' Every shard loads the file written by save_shards with the same number of shards, in parallel '''
+        result = LoadResult(filename)
+        with self._locked():
+            futures = [self._submit(shard, _load_shard, self.shard_filename(filename, shard))
+                       for shard in range(self.shards)]
+            for future in futures:
+                loaded, rejected, rejects = future.result()
+                result.loaded += loaded
+                result.rejected += rejected
+                result.rejects += rejects[:max(0, 1000 - len(result.rejects))]
+        return result
@@ -0,0 +1,283 @@
+import mmap
+import os
+import struct
+import sys
+from array import array
+from bisect import bisect_left
+from datetime import date
+from csv_loader import DEFAULT_CHUNK_SIZE, LoadResult, iter_product_chunks
+from csv_writer import write_csv_atomic
+from history import QuantityHistory
+from product import Product
+
+MAGIC = b"LGSNAP1\0"
+VERSION = 2  # 2: quantity histories
+SNAPSHOT_EXTENSIONS = (".snap",)
+
+# Fixed-width columns, in file order: (name, array typecode, entries per product row, extra entries)
+_COLUMNS = [
+    ("ids", "q", 1, 0),
+    ("prices", "d", 1, 0),
+    ("base_prices", "d", 1, 0),
+    ("quantities", "q", 1, 0),
+    ("entry_dates", "i", 1, 0),      # date ordinals, 0 means no date
+    ("exit_dates", "i", 1, 0),
+    ("categories", "I", 1, 0),       # index into the category table
+    ("name_offsets", "Q", 1, 1),     # start of each name in the string table, plus the end of the last one
+    ("category_offsets", "Q", 0, 1), # same for the category table, one entry per category plus one
+    ("history_offsets", "Q", 1, 1),  # start of each product's history in the two columns below, plus the end
+    ("history_times", "q", 0, 0),    # microseconds since 1970 of every history entry, product after product
+    ("history_quantities", "q", 0, 0),
+]
+# magic, version, product count, category count, then (offset, byte size) of every column and of both string tables
+_HEADER = struct.Struct("<8sIqq" + "qq" * (len(_COLUMNS) + 2))
+# Version 1 files (still read, e.g. the last checkpoint of a log) stop before the history columns
+_V1_COLUMNS = _COLUMNS[:-3]
+_V1_HEADER = struct.Struct("<8sIqq" + "qq" * (len(_V1_COLUMNS) + 2))
+
+
+def _align(offset: int):
+    return (offset + 7) & ~7
+
+
+def write_snapshot(path: str, products):
+    """
+    Writes the products to a binary snapshot at path (through a temporary file and a rename).
+    Rows are sorted by id so a snapshot can be searched with a binary search. Returns the product count.
+    """
+    columns = {name: array(typecode) for name, typecode, _, _ in _COLUMNS}
+    names = bytearray()
+    category_codes = {}
+    category_table = bytearray()
+    category_offsets = columns["category_offsets"]
+    history_offsets, history_times, history_quantities = (
+        columns["history_offsets"], columns["history_times"], columns["history_quantities"])
+
+    rows = sorted(products, key=lambda product: product.id)
+    for product in rows:
+        columns["ids"].append(product.id)
+        columns["prices"].append(product.price)
+        columns["base_prices"].append(product.base_price)
+        columns["quantities"].append(product.quantity)
+        columns["entry_dates"].append(product.entry_date.toordinal() if product.entry_date else 0)
+        columns["exit_dates"].append(product.exit_date.toordinal() if product.exit_date else 0)
+        code = category_codes.get(product.category)
+        if code is None:
+            code = category_codes[product.category] = len(category_codes)
+            category_offsets.append(len(category_table))
+            category_table += product.category.encode("utf-8")
+        columns["categories"].append(code)
+        columns["name_offsets"].append(len(names))
+        names += product.name.encode("utf-8")
+        history_offsets.append(len(history_times))
+        for micros, quantity in product.quantity_history.raw_entries():
+            history_times.append(micros)
+            history_quantities.append(quantity)
+    columns["name_offsets"].append(len(names))
+    history_offsets.append(len(history_times))
+    category_offsets.append(len(category_table))
+
+    blobs = [columns[name].tobytes() for name, _, _, _ in _COLUMNS] + [bytes(names), bytes(category_table)]
+    layout = []
+    offset = _align(_HEADER.size)
+    for blob in blobs:
+        layout += [offset, len(blob)]
+        offset = _align(offset + len(blob))
+
+    tmp_path = path + ".tmp"
+    with open(tmp_path, "wb") as file:
+        file.write(_HEADER.pack(MAGIC, VERSION, len(rows), len(category_codes), *layout))
+        for blob, start in zip(blobs, layout[::2]):
+            file.write(b"\0" * (start - file.tell()))
+            file.write(blob)
+        file.flush()
+        os.fsync(file.fileno())
+    os.replace(tmp_path, path)
+    return len(rows)
+
+
+class Snapshot:
+    """
+    Read-only, memory-mapped view of a snapshot file. Opening it only parses the header: the columns
+    are memoryviews over the mapping and a Product is only built when a row is asked for.
+
+    Methods:
+        find(self, id: int) -> int | None:
+            Row of the product with that ID (binary search over the sorted ids column).
+        product(self, row: int) -> Product:
+            Builds the Product stored in row.
+        get(self, id: int) -> Product | None:
+            find() and product() together.
+        ids_by_category(self, category: str) -> list:
+            IDs of the products of a category, scanning the category column only.
+        iter_products(self, chunk_size: int):
+            Yields lists of at most chunk_size products, in id order.
+    """
+
+    def __init__(self, path: str):
+        self.path = path
+        self._file = open(path, "rb")
+        size = os.fstat(self._file.fileno()).st_size
+        if size < _V1_HEADER.size:
+            self._file.close()
+            raise ValueError(f"{path} is not an inventory snapshot.")
+        self._map = mmap.mmap(self._file.fileno(), 0, access=mmap.ACCESS_READ)
+        magic, version = struct.unpack_from("<8sI", self._map, 0)
+        header, columns = (_HEADER, _COLUMNS) if version == VERSION else (_V1_HEADER, _V1_COLUMNS)
+        if magic != MAGIC or version not in (1, VERSION) or size < header.size:
+            self.close()
+            raise ValueError(f"{path} is not an inventory snapshot (version {VERSION}).")
+        magic, version, self.count, category_count, *layout = header.unpack_from(self._map, 0)
+
+        view = memoryview(self._map)
+        self._views = [view]
+        self._history_offsets = None  # Version 1: the products get a new history
+        for (name, typecode, _, _), start, length in zip(columns, layout[::2], layout[1::2]):
+            column = view[start:start + length].cast(typecode)
+            self._views.append(column)
+            setattr(self, "_" + name, column)
+        names_start, names_length, categories_start, categories_length = layout[-4:]
+        self._names = view[names_start:names_start + names_length]
+        table = bytes(view[categories_start:categories_start + categories_length])
+        offsets = self._category_offsets
+        self.categories = [table[offsets[i]:offsets[i + 1]].decode("utf-8") for i in range(category_count)]
+        self._views.append(self._names)
+
+    def __len__(self):
+        return self.count
+
+    def close(self):
+        for view in reversed(getattr(self, "_views", [])):
+            view.release()
+        self._views = []
+        if not self._map.closed:
+            self._map.close()
+        self._file.close()
+
+    def find(self, id: int):
+        row = bisect_left(self._ids, id)
+        if row < self.count and self._ids[row] == id:
+            return row
+        return None
+
+    def product(self, row: int):
+        start, end = self._name_offsets[row], self._name_offsets[row + 1]
+        entry_date, exit_date = self._entry_dates[row], self._exit_dates[row]
+        product = Product(self._ids[row], bytes(self._names[start:end]).decode("utf-8"), self._prices[row],
+                          self._quantities[row], self.categories[self._categories[row]],
+                          date.fromordinal(entry_date) if entry_date else None,
+                          date.fromordinal(exit_date) if exit_date else None,
+                          self._base_prices[row])
+        if self._history_offsets is None:
+            return product
+        first, last = self._history_offsets[row], self._history_offsets[row + 1]
+        if last > first:
+            product.quantity_history = QuantityHistory.from_raw(
+                zip(self._history_times[first:last], self._history_quantities[first:last]))
+        return product
+
+    def get(self, id: int):
+        row = self.find(id)
+        return self.product(row) if row is not None else None
+
+    def ids_by_category(self, category: str):
+        if category not in self.categories:
+            return []
+        code = self.categories.index(category)
+        ids = self._ids
+        return [ids[row] for row, value in enumerate(self._categories) if value == code]
+
+    def iter_products(self, chunk_size: int = DEFAULT_CHUNK_SIZE):
+        for start in range(0, self.count, chunk_size):
+            yield [self.product(row) for row in range(start, min(start + chunk_size, self.count))]
+
+
+class SnapshotStorage:
+    """
+    Storage backend (same interface as CsvStorage and SqliteStorage) over a snapshot file.
+    With Inventory.open_storage(storage, lazy=True) opening takes the time of reading the header,
+    and products are read from the mapping when search_product first needs them.
+    """
+
+    def __init__(self, path: str = "inventory.snap"):
+        self.path = path
+        self.snapshot = Snapshot(path) if os.path.exists(path) else None
+
+    def close(self):
+        if self.snapshot is not None:
+            self.snapshot.close()
+            self.snapshot = None
+
+    def get(self, id: int):
+        return self.snapshot.get(id) if self.snapshot is not None else None
+
+    def ids_by_category(self, category: str):
+        return self.snapshot.ids_by_category(category) if self.snapshot is not None else []
+
+    def load(self, inventory, chunk_size: int = DEFAULT_CHUNK_SIZE, progress=None):
+        result = LoadResult(self.path)
+        with inventory._lock:
+            previous = inventory._state()
+            inventory._clear()
+            try:
+                if self.snapshot is not None:
+                    for chunk in self.snapshot.iter_products(chunk_size):
+                        result.loaded += len(chunk)
+                        inventory._bulk_add(chunk, result)
+                        if progress:
+                            progress(result.loaded, result.loaded, len(self.snapshot))
+            except BaseException:
+                inventory._restore(*previous)  # Stopped halfway, as in SqliteStorage.load
+                raise
+            inventory._name_index.sort()
+            inventory._saved_filename = self.path
+            inventory._emit("reset")
+        return result
+
+    def _merged_products(self, inventory, removed):
+        """ Products of the snapshot overridden by those in memory, without the removed ones """
+        resident = inventory._products
+        if inventory._lazy and self.snapshot is not None:
+            for chunk in self.snapshot.iter_products():
+                for product in chunk:
+                    if product.id not in resident and product.id not in removed:
+                        yield product
+        yield from resident.values()
+
+    def save(self, inventory):
+        """ Rewrites the snapshot (snapshots are not incremental) and returns the product count """
+        def write(dirty, removed):
+            tmp_path = self.path + ".new"
+            rows = write_snapshot(tmp_path, self._merged_products(inventory, removed))
+            self.close()
+            os.replace(tmp_path, self.path)
+            self.snapshot = Snapshot(self.path)
+            return rows, inventory._products.values()
+
+        return inventory._save_pending(self.path, write)
+
+
+def csv_to_snapshot(csv_path: str, snapshot_path: str):
+    """ Converts an inventory csv into a snapshot, returns the LoadResult of reading the csv """
+    result = LoadResult(csv_path)
+    products = (product for chunk in iter_product_chunks(csv_path, result) for product in chunk)
+    write_snapshot(snapshot_path, products)
+    return result
+
+
+def snapshot_to_csv(snapshot_path: str, csv_path: str):
+    """ Writes the content of a snapshot in the csv layout, returns the row count """
+    snapshot = Snapshot(snapshot_path)
+    try:
+        return write_csv_atomic(csv_path, (product for chunk in snapshot.iter_products() for product in chunk))
+    finally:
+        snapshot.close()
+
+
+if __name__ == "__main__":
+    # python snapshot.py inventory.csv inventory.snap   (or the other way around)
+    source, target = sys.argv[1], sys.argv[2]
+    if source.lower().endswith(SNAPSHOT_EXTENSIONS):
+        print(f"{snapshot_to_csv(source, target)} products written to {target}")
+    else:
+        print(csv_to_snapshot(source, target))
@@ -0,0 +1,200 @@
+import os
+import sqlite3
+from datetime import date
+from csv_loader import DEFAULT_CHUNK_SIZE, LoadResult
+from history import QuantityHistory
+from product import Product
+from snapshot import SNAPSHOT_EXTENSIONS, SnapshotStorage
+
+SQLITE_EXTENSIONS = (".db", ".sqlite", ".sqlite3")
+BINARY_EXTENSIONS = SQLITE_EXTENSIONS + SNAPSHOT_EXTENSIONS  # Storages that are not the csv path
+
+_SCHEMA = """
+CREATE TABLE IF NOT EXISTS products (
+    id INTEGER PRIMARY KEY,
+    name TEXT NOT NULL,
+    price REAL NOT NULL,
+    base_price REAL NOT NULL,
+    quantity INTEGER NOT NULL,
+    category TEXT NOT NULL,
+    entry_date TEXT,
+    exit_date TEXT
+);
+CREATE INDEX IF NOT EXISTS products_category ON products (category);
+CREATE TABLE IF NOT EXISTS quantity_history (
+    product_id INTEGER NOT NULL,
+    ts INTEGER NOT NULL,
+    quantity INTEGER NOT NULL
+);
+CREATE INDEX IF NOT EXISTS quantity_history_product ON quantity_history (product_id, ts);
+"""
+
+_SELECT_PRODUCT = "SELECT id, name, price, base_price, quantity, category, entry_date, exit_date FROM products"
+_UPSERT_PRODUCT = ("INSERT OR REPLACE INTO products (id, name, price, base_price, quantity, category, entry_date, exit_date) "
+                   "VALUES (?, ?, ?, ?, ?, ?, ?, ?)")
+
+
+class CsvStorage:
+    """ The csv file persistence of Inventory (load_csv_stream / save_csv) behind the storage interface """
+
+    def __init__(self, filename: str = "inventory.csv"):
+        self.path = filename
+
+    def load(self, inventory, chunk_size: int = DEFAULT_CHUNK_SIZE, progress=None):
+        return inventory.load_csv_stream(self.path, chunk_size, progress)
+
+    def save(self, inventory):
+        return inventory.save_csv(self.path, journal=True)
+
+    def close(self):
+        pass
+
+
+class SqliteStorage:
+    """
+    SQLite persistence for Inventory, with the same load/save interface as CsvStorage.
+
+    The database runs in WAL mode, products are keyed by id (the primary key index) with a secondary
+    index on category, and the quantity history lives in its own table. Saves only write the products
+    changed since the last save, in a single transaction with executemany. get() reads a single product
+    through the primary key, which lets Inventory open a huge database lazily (see Inventory.open_storage).
+
+    Methods:
+        load(self, inventory, chunk_size, progress) -> LoadResult:
+            Replaces the content of inventory with every product of the database.
+        save(self, inventory) -> int:
+            Writes the pending changes of inventory, returns the number of products written or deleted.
+        get(self, id: int) -> Product | None:
+            Reads one product and its history.
+        ids_by_category(self, category: str) -> list:
+            IDs of the products of a category, using the category index.
+        count(self) -> int:
+            Number of products stored.
+    """
+
+    def __init__(self, path: str = "inventory.db"):
+        self.path = path
+        self.connection = sqlite3.connect(path, check_same_thread=False)
+        self.connection.execute("PRAGMA journal_mode=WAL")
+        self.connection.execute("PRAGMA synchronous=NORMAL")  # Safe with WAL, fsyncs at checkpoints
+        self.connection.executescript(_SCHEMA)
+
+    def close(self):
+        self.connection.close()
+
+    @staticmethod
+    def _row_to_product(row):
+        id, name, price, base_price, quantity, category, entry_date, exit_date = row
+        return Product(id, name, price, quantity, category,
+                       date.fromisoformat(entry_date) if entry_date else None,
+                       date.fromisoformat(exit_date) if exit_date else None,
+                       base_price)
+
+    @staticmethod
+    def _product_to_row(product):
+        return (product.id, product.name, product.price, product.base_price, product.quantity, product.category,
+                product.entry_date.isoformat() if product.entry_date else None,
+                product.exit_date.isoformat() if product.exit_date else None)
+
+    def count(self):
+        return self.connection.execute("SELECT COUNT(*) FROM products").fetchone()[0]
+
+    def get(self, id: int):
+        row = self.connection.execute(_SELECT_PRODUCT + " WHERE id = ?", (id,)).fetchone()
+        if row is None:
+            return None
+        product = self._row_to_product(row)
+        history = self.connection.execute(
+            "SELECT ts, quantity FROM quantity_history WHERE product_id = ? ORDER BY ts", (id,)).fetchall()
+        if history:
+            product.quantity_history = QuantityHistory.from_raw(history)
+        return product
+
+    def ids_by_category(self, category: str):
+        return [row[0] for row in self.connection.execute("SELECT id FROM products WHERE category = ?", (category,))]
+
+    def iter_products(self, chunk_size: int = DEFAULT_CHUNK_SIZE):
+        """ Yields lists of at most chunk_size products (without their stored history) """
+        cursor = self.connection.execute(_SELECT_PRODUCT + " ORDER BY rowid")
+        while True:
+            rows = cursor.fetchmany(chunk_size)
+            if not rows:
+                return
+            yield [self._row_to_product(row) for row in rows]
+
+    def load(self, inventory, chunk_size: int = DEFAULT_CHUNK_SIZE, progress=None):
+        result = LoadResult(self.path)
+        total = self.count()
+        with inventory._lock:
+            previous = inventory._state()
+            inventory._clear()
+            try:
+                for chunk in self.iter_products(chunk_size):
+                    result.loaded += len(chunk)
+                    inventory._bulk_add(chunk, result)
+                    if progress:
+                        progress(result.loaded, result.loaded, total)
+                inventory._name_index.sort()
+
+                # Attach the stored histories, streaming them in product order
+                current_id, entries = None, []
+                for product_id, ts, quantity in self.connection.execute(
+                        "SELECT product_id, ts, quantity FROM quantity_history ORDER BY product_id, ts"):
+                    if product_id != current_id:
+                        self._attach_history(inventory, current_id, entries)
+                        current_id, entries = product_id, []
+                    entries.append((ts, quantity))
+                self._attach_history(inventory, current_id, entries)
+            except BaseException:
+                # Stopped halfway (a database error, or TaskCancelled raised from progress): as in
+                # Inventory.load_csv_stream the inventory goes back to what it held
+                inventory._restore(*previous)
+                raise
+
+            inventory._saved_filename = self.path
+            inventory._emit("reset")
+        return result
+
+    @staticmethod
+    def _attach_history(inventory, product_id, entries):
+        product = inventory._products.get(product_id)
+        if product is not None and entries:
+            product.quantity_history = QuantityHistory.from_raw(entries)
+
+    def save(self, inventory):
+        def write(dirty, removed):
+            full = inventory._saved_filename != self.path
+            if full:
+                products = list(inventory._products.values())
+                removed = []
+            else:
+                products = [inventory._products[id] for id in dirty]
+                removed = [(id,) for id in removed]
+
+            with self.connection:  # One transaction, committed at the end or rolled back on error
+                if full:
+                    self.connection.execute("DELETE FROM products")
+                    self.connection.execute("DELETE FROM quantity_history")
+                else:
+                    self.connection.executemany("DELETE FROM products WHERE id = ?", removed)
+                    self.connection.executemany("DELETE FROM quantity_history WHERE product_id = ?", removed)
+                    self.connection.executemany("DELETE FROM quantity_history WHERE product_id = ?",
+                                                [(product.id,) for product in products])
+                self.connection.executemany(_UPSERT_PRODUCT, (self._product_to_row(product) for product in products))
+                self.connection.executemany(
+                    "INSERT INTO quantity_history (product_id, ts, quantity) VALUES (?, ?, ?)",
+                    ((product.id, ts, quantity) for product in products
+                     for ts, quantity in product.quantity_history.raw_entries()))
+            return len(products) + len(removed), products
+
+        return inventory._save_pending(self.path, write)
+
+
+def open_storage(path: str):
+    """ Returns the storage for path: SQLite for .db/.sqlite files, a binary snapshot for .snap, csv otherwise """
+    extension = os.path.splitext(path)[1].lower()
+    if extension in SQLITE_EXTENSIONS:
+        return SqliteStorage(path)
+    if extension in SNAPSHOT_EXTENSIONS:
+        return SnapshotStorage(path)
+    return CsvStorage(path)
@@ -0,0 +1,169 @@
+import queue
+import threading
+from concurrent.futures import ThreadPoolExecutor
+from notifier import notifier
+
+DEFAULT_WORKERS = 2
+POLL_MS = 100  # How often the Tk loop collects progress and results while tasks run
+
+
+class TaskCancelled(BaseException):
+    """
+    Raised inside a task by Task.check_cancelled. Like asyncio.CancelledError it is not an Exception,
+    so the "except Exception" handlers of the code the task runs (e.g. Inventory.load_from_csv) do not
+    report a cancellation as a failure.
+    """
+
+
+class Task:
+    """
+    One operation submitted to a TaskRunner.
+
+    Attributes:
+        key (str): Single-flight key: only one task with the same key runs at a time.
+        label (str): Text shown in the status bar.
+        cancellable (bool): If False cancel() does nothing (e.g. saves, which must not stop halfway).
+        cancel_event (threading.Event): Set by cancel(); long loops can check it or call check_cancelled.
+
+    Methods:
+        progress(self, done: int, total: int):
+            Called from the worker as often as wanted, the Tk thread shows the latest values.
+        check_cancelled(self):
+            Raises TaskCancelled if the task was cancelled.
+        cancel(self):
+            Asks the task to stop.
+    """
+
+    def __init__(self, key: str, label: str, cancellable: bool = False, on_done=None, on_error=None):
+        self.key = key
+        self.label = label
+        self.cancellable = cancellable
+        self.cancel_event = threading.Event()
+        self.on_done = on_done
+        self.on_error = on_error
+        self._progress = (0, 0)  # (done, total), replaced as a whole so the Tk thread never reads half of it
+
+    @property
+    def done(self):
+        return self._progress[0]
+
+    @property
+    def total(self):
+        return self._progress[1]
+
+    @property
+    def cancelled(self):
+        return self.cancel_event.is_set()
+
+    def progress(self, done: int, total: int):
+        self._progress = (done, total)
+
+    def check_cancelled(self):
+        if self.cancel_event.is_set():
+            raise TaskCancelled()
+
+    def cancel(self):
+        if self.cancellable:
+            self.cancel_event.set()
+
+    def __str__(self):
+        done, total = self._progress
+        if self.cancelled:
+            return f"{self.label}: cancelling..."
+        if total:
+            return f"{self.label}: {100 * done // total}%"
+        return f"{self.label}..."
+
+
+class TaskRunner:
+    """
+    Runs the long operations of the GUI on a small pool of worker threads, so the window keeps
+    answering while a large inventory is loaded or saved.
+
+    func(task) runs on a worker. Its result (or exception) is handed back to the Tk thread through a
+    queue that root.after polls, and on_done(result) or on_error(exception) run there, so they can use
+    the widgets. Without on_error a failure is reported through notifier.notifier. submit refuses a task
+    while another one with the same key is running (single flight), so repeated clicks do not start
+    duplicate saves or loads.
+
+    Methods:
+        submit(self, key, label, func, on_done=None, on_error=None, cancellable=False) -> Task | None:
+            Starts func(task) on a worker, or returns None if a task with the same key is running.
+        running(self, key: str) -> bool:
+            True while a task with key runs.
+        cancel(self, key: str = None) -> bool:
+            Cancels the task with key (every cancellable task if key is None); False if nothing was cancelled.
+        shutdown(self, wait: bool = True):
+            Cancels what can be cancelled and waits for the rest, e.g. a save, before the program exits.
+    """
+
+    def __init__(self, root, max_workers: int = DEFAULT_WORKERS, on_change=None):
+        self.root = root
+        self.on_change = on_change  # Called from the Tk thread on every poll, e.g. to redraw a progress bar
+        self.tasks = {}  # key -> running Task, only used from the Tk thread
+        self._finished = queue.Queue()  # (task, result, error) put by the workers
+        self._executor = ThreadPoolExecutor(max_workers, thread_name_prefix="gui-task")
+        self._polling = False
+
+    def submit(self, key: str, label: str, func, on_done=None, on_error=None, cancellable: bool = False):
+        if key in self.tasks:
+            return None
+        task = self.tasks[key] = Task(key, label, cancellable, on_done, on_error)
+        self._executor.submit(self._run, task, func)
+        if not self._polling:
+            self._polling = True
+            self.root.after(POLL_MS, self._poll)
+        if self.on_change:
+            self.on_change()
+        return task
+
+    def _run(self, task: Task, func):
+        try:
+            result = func(task)
+        except BaseException as e:  # Also TaskCancelled, it must reach the Tk thread like any other outcome
+            self._finished.put((task, None, e))
+        else:
+            self._finished.put((task, result, None))
+
+    def _poll(self):
+        try:
+            while True:
+                task, result, error = self._finished.get_nowait()
+                del self.tasks[task.key]
+                self._finish(task, result, error)
+        except queue.Empty:
+            pass
+        if self.on_change:
+            self.on_change()
+        if self.tasks:
+            self.root.after(POLL_MS, self._poll)
+        else:
+            self._polling = False
+
+    @staticmethod
+    def _finish(task: Task, result, error):
+        if error is None:
+            if task.on_done:
+                task.on_done(result)
+        elif task.on_error:
+            task.on_error(error)
+        elif isinstance(error, TaskCancelled):
+            notifier.warning("Cancelled", f"{task.label} was cancelled.")
+        else:
+            notifier.error("Error", f"{task.label} failed: {error}")
+
+    def running(self, key: str):
+        return key in self.tasks
+
+    def cancel(self, key: str = None):
+        tasks = list(self.tasks.values()) if key is None else [self.tasks[key]] if key in self.tasks else []
+        cancelled = False
+        for task in tasks:
+            if task.cancellable and not task.cancelled:
+                task.cancel()
+                cancelled = True
+        return cancelled
+
+    def shutdown(self, wait: bool = True):
+        self.cancel()
+        self._executor.shutdown(wait=wait)
@@ -0,0 +1,5 @@
+import os
+import sys
+
+# The modules of LogiStock import each other by their plain names, as when running main.py
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
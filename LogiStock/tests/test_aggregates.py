@@ -0,0 +1,44 @@
+import unittest
+from datetime import date
+from benchmarks.stress_threads import aggregate_problems
+from inventory import Inventory
+from product import Product
+
+
+class AggregatesTest(unittest.TestCase):
+
+    def setUp(self):
+        self.inventory = Inventory()
+        self.inventory.aggregates.set_low_stock_threshold(5)
+        self.inventory.add_products([Product(id, f"p{id}", 2.0, id, "Bebidas" if id % 2 else "Snacks", date(2024, 1, 1))
+                                     for id in range(1, 11)])
+
+    def test_totals_follow_every_change(self):
+        inventory = self.inventory
+        inventory.search_product(1).register_entry(20)
+        inventory.search_product(10).register_exit(8)
+        inventory.update_quantity(4, 30)
+        inventory.apply_movements([(2, 5), (3, -3)])
+        inventory.apply_bulk_discount(50, category="Snacks")
+        inventory.search_product(5).price = 4.0
+        inventory.remove_product(7)
+        inventory.add_product(Product(11, "p11", 1.0, 0, "Otros", date(2024, 1, 1)))
+        self.assertEqual(aggregate_problems(inventory), [])
+        summary = inventory.aggregates.summary()
+        self.assertEqual((summary.products, summary.units), (10, 88))
+        self.assertEqual(inventory.aggregates.category("Bebidas"), (4, 35, 80.0))
+        self.assertEqual(inventory.aggregates.category("Snacks"), (5, 53, 53.0))
+        self.assertEqual(inventory.aggregates.lowest(3), [(0, 3), (0, 11), (2, 10)])
+        self.assertEqual(sorted(inventory.aggregates.low_stock_ids()), [3, 10, 11])
+
+    def test_threshold_and_rebuild(self):
+        self.inventory.aggregates.set_low_stock_threshold(3)
+        self.assertEqual(sorted(self.inventory.aggregates.low_stock_ids()), [1, 2])
+        before = self.inventory.aggregates.by_category()
+        self.inventory.aggregates.rebuild()
+        self.assertEqual(self.inventory.aggregates.by_category(), before)
+        self.assertEqual(aggregate_problems(self.inventory), [])
+
+
+if __name__ == "__main__":
+    unittest.main()
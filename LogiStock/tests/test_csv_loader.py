@@ -0,0 +1,124 @@
+import os
+import tempfile
+import unittest
+from datetime import date
+from csv_loader import CSV_FIELDS, LoadResult, iter_journal, iter_product_chunks
+from csv_writer import write_csv_atomic
+from inventory import Inventory
+from product import Product
+
+HEADER = ",".join(CSV_FIELDS) + "\n"
+
+
+class CsvLoaderTest(unittest.TestCase):
+
+    def setUp(self):
+        self.folder = tempfile.TemporaryDirectory()
+        self.path = os.path.join(self.folder.name, "inventory.csv")
+
+    def tearDown(self):
+        self.folder.cleanup()
+
+    def write(self, text: str, path: str = None):
+        with open(path or self.path, "w", encoding="utf-8", newline="") as file:
+            file.write(text)
+
+    def load(self, chunk_size: int = 10000):
+        result = LoadResult(self.path)
+        products = [product for chunk in iter_product_chunks(self.path, result, chunk_size) for product in chunk]
+        return products, result
+
+    def test_empty_name_and_category_are_kept(self):
+        # Rows the loader always accepted, e.g. saved after a server "add" without a category
+        self.write(HEADER + "1,a,1.0,1.0,3,,2024-01-01,\n"
+                            "2,,1.0,1.0,3,Bebidas,2024-01-01,\n")
+        products, result = self.load()
+        self.assertTrue(result.ok, result.rejects)
+        self.assertEqual([(p.id, p.name, p.category) for p in products], [(1, "a", ""), (2, "", "Bebidas")])
+
+    def test_empty_fields_survive_a_save_and_reload(self):
+        self.write(HEADER + "1,a,1.0,1.0,3,,2024-01-01,\n")
+        inventory = Inventory()
+        inventory.load_csv_stream(self.path)
+        inventory.save_csv(self.path)
+        reloaded = Inventory()
+        self.assertTrue(reloaded.load_csv_stream(self.path).ok)
+        self.assertEqual(reloaded.search_product(1).category, "")
+
+    def test_old_date_rules(self):
+        self.write(HEADER + "1,a,1.0,1.0,3,c,not a date,also not\n"
+                            "2,b,1.0,1.0,3,c,,2024-02-02 10:00:00\n")
+        products, result = self.load()
+        self.assertTrue(result.ok, result.rejects)
+        self.assertEqual((products[0].entry_date, products[0].exit_date), (date.today(), None))
+        self.assertEqual((products[1].entry_date, products[1].exit_date), (None, date(2024, 2, 2)))
+
+    def test_rejects_are_in_line_order(self):
+        self.write(HEADER + "1,a,1.0,1.0,3,c,,\n"
+                            "x,b,1.0,1.0,3,c,,\n"       # line 3: bad id
+                            "3,short\n"                 # line 4: too few fields
+                            "4,d,-1,1.0,3,c,,\n"        # line 5: bad price
+                            "5,e,1.0,1.0,3,c,,\n"
+                            "6,short\n")                # line 7
+        products, result = self.load(chunk_size=2)
+        self.assertEqual([p.id for p in products], [1, 5])
+        self.assertEqual(result.rejected, 4)
+        self.assertEqual([line for line, _, _ in result.rejects], [3, 4, 5, 7])
+        self.assertIn("Price must be greater than 0.", result.rejects[2][2])
+
+    def test_journal_keeps_empty_category(self):
+        journal = self.path + ".journal"
+        self.write("op," + HEADER + "U,1,a,1.0,1.0,3,,2024-01-01,\nD,2,,,,,,,\n", journal)
+        result = LoadResult(journal)
+        self.assertEqual([(op, id) for op, id, _ in iter_journal(journal, result)], [("U", 1), ("D", 2)])
+        self.assertTrue(result.ok, result.rejects)
+
+    def saved_inventory(self, count: int):
+        inventory = Inventory()
+        inventory.add_products([Product(id, f"p{id}", 1.0, 10, "c", date(2024, 1, 1)) for id in range(1, count + 1)])
+        inventory.save_csv(self.path)
+        return inventory
+
+    def reload(self):
+        reloaded = Inventory()
+        self.assertTrue(reloaded.load_csv_stream(self.path).ok)
+        return reloaded
+
+    def test_journal_save_reload_and_compaction(self):
+        inventory = self.saved_inventory(200)
+        journal = self.path + ".journal"
+        inventory.update_quantity(1, 5)
+        inventory.remove_product(2)
+        self.assertEqual(inventory.save_csv(self.path, journal=True), 2)
+        self.assertTrue(os.path.exists(journal))
+        reloaded = self.reload()
+        self.assertEqual(reloaded.search_product(1).quantity, 5)
+        self.assertIsNone(reloaded.search_product(2))
+        # Past the compaction limit (100 rows here) the csv is rewritten and the journal removed
+        for id in range(3, 103):
+            inventory.update_quantity(id, 7)
+        self.assertEqual(inventory.save_csv(self.path, journal=True), 199)
+        self.assertFalse(os.path.exists(journal))
+        reloaded = self.reload()
+        self.assertEqual([reloaded.search_product(id).quantity for id in (1, 3, 102, 103)], [5, 7, 7, 10])
+        self.assertEqual(len(reloaded.products), 199)
+
+    def test_journal_left_by_an_interrupted_full_save_is_ignored(self):
+        inventory = self.saved_inventory(3)
+        inventory.update_quantity(1, 5)
+        inventory.save_csv(self.path, journal=True)
+        # A full save that crashed after replacing the csv but before removing the journal
+        inventory.update_quantity(1, 8)
+        write_csv_atomic(self.path, inventory.products)
+        self.assertTrue(os.path.exists(self.path + ".journal"))
+        self.assertEqual(self.reload().search_product(1).quantity, 8)
+        # The next journal save starts a new journal instead of appending to the stale one
+        reloaded = self.reload()
+        reloaded.update_quantity(2, 4)
+        reloaded.save_csv(self.path, journal=True)
+        again = self.reload()
+        self.assertEqual((again.search_product(1).quantity, again.search_product(2).quantity), (8, 4))
+
+
+if __name__ == "__main__":
+    unittest.main()
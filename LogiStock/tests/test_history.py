@@ -0,0 +1,43 @@
+import unittest
+from datetime import datetime, timedelta
+from history import QuantityHistory
+
+START = datetime(2024, 1, 1, 12, 0)
+
+
+class QuantityHistoryTest(unittest.TestCase):
+
+    def test_single_entry_is_kept_inline(self):
+        history = QuantityHistory([(START, 5)])
+        self.assertIsNone(history._offsets)
+        self.assertEqual((len(history), list(history), history[-1]), (1, [(START, 5)], (START, 5)))
+        self.assertEqual((history.quantity_at(START - timedelta(seconds=1)), history.quantity_at(START)), (None, 5))
+        self.assertEqual(list(QuantityHistory.from_raw(history.raw_entries())), [(START, 5)])
+
+    def test_second_record_creates_the_columns(self):
+        history = QuantityHistory([(START, 5)])
+        later = START + timedelta(hours=1)
+        history.record(3, later)
+        self.assertEqual(list(history), [(START, 5), (later, 3)])
+        self.assertEqual(list(history.columns()[1]), [5, 3])
+        self.assertEqual(history.between(START + timedelta(minutes=1), later), [(later, 3)])
+        history.record(7, START)  # The clock went back: kept after the last entry
+        self.assertEqual(history[-1], (later, 7))
+
+    def test_copy_is_independent(self):
+        history = QuantityHistory([(START, 5), (START + timedelta(hours=1), 3)], max_entries=8)
+        copy = history.copy()
+        history.record(1, START + timedelta(hours=2))
+        self.assertEqual((len(history), len(copy), copy.max_entries), (3, 2, 8))
+        single = QuantityHistory([(START, 5)]).copy()
+        self.assertEqual(list(single), [(START, 5)])
+
+    def test_empty_history(self):
+        history = QuantityHistory()
+        self.assertFalse(history)
+        self.assertEqual((len(history), list(history), history.quantity_at(START)), (0, [], None))
+        self.assertEqual(len(QuantityHistory.from_raw([])), 0)
+
+
+if __name__ == "__main__":
+    unittest.main()
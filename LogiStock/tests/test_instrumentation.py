@@ -0,0 +1,51 @@
+import unittest
+from datetime import date
+import report
+import validation
+from instrumentation import Instrumentation
+from inventory import Inventory
+from product import Product
+from report import Report
+
+
+def attributes():
+    return [dict(vars(cls)) for cls in (Inventory, Product, Report)] + [report.write_report]
+
+
+class InstrumentationTest(unittest.TestCase):
+
+    def setUp(self):
+        self.instrumentation = Instrumentation()
+        self.addCleanup(self.instrumentation.disable)
+
+    def test_disable_restores_the_original_methods(self):
+        before = attributes()
+        self.instrumentation.enable()
+        self.instrumentation.enable()  # Enabling twice does not wrap the wrappers
+        self.assertIsNot(Inventory.search_product, before[0]["search_product"])
+        self.assertEqual(Inventory.search_product.__name__, "search_product")
+        self.assertIs(vars(Product)["quantity"], before[1]["quantity"])  # Properties are not wrapped
+        self.assertIn(self.instrumentation._validation_failed, validation.failure_listeners)
+        self.instrumentation.disable()
+        self.assertEqual(attributes(), before)
+        self.assertNotIn(self.instrumentation._validation_failed, validation.failure_listeners)
+        self.assertFalse(self.instrumentation.enabled)
+
+    def test_calls_are_timed_while_enabled(self):
+        inventory = Inventory()
+        inventory.add_product(Product(1, "a", 1.0, 1, "c", date(2024, 1, 1)))
+        self.instrumentation.enable()
+        inventory.search_product(1)
+        inventory.search_product(2)
+        with self.assertRaises(ValueError):
+            inventory.apply_bulk_discount(200)
+        self.instrumentation.disable()
+        inventory.search_product(1)
+        operations = self.instrumentation.snapshot()["operations"]
+        self.assertEqual(operations["Inventory.search_product"]["count"], 2)
+        self.assertEqual(operations["Inventory.apply_bulk_discount"]["errors"], 1)
+        self.assertIn("Inventory.search_product", self.instrumentation.report())
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,36 @@
+import unittest
+from datetime import date
+from inventory import Inventory
+from product import Product
+
+
+class ApplyMovementsTest(unittest.TestCase):
+
+    def setUp(self):
+        self.inventory = Inventory()
+        self.inventory.add_products([Product(id, f"p{id}", 1.0, 10, "c", date(2024, 1, 1)) for id in (1, 2)])
+
+    def quantities(self):
+        return [self.inventory.search_product(id).quantity for id in (1, 2)]
+
+    def test_batch_is_applied_once_per_product(self):
+        # The exit of 15 uses the units received earlier in the same batch
+        result = self.inventory.apply_movements([(1, 10), (1, -15), (2, -3), (1, 2)])
+        self.assertTrue(result.applied)
+        self.assertEqual((result.movements, result.products, result.units_in, result.units_out), (4, 2, 12, 18))
+        self.assertEqual(self.quantities(), [7, 7])
+        self.assertEqual([quantity for _, quantity in self.inventory.search_product(1).quantity_history], [10, 7])
+
+    def test_invalid_movement_rejects_the_whole_batch(self):
+        result = self.inventory.apply_movements([(1, 5), (2, -11), (3, 1), (1, 0), (2, 1.5)])
+        self.assertFalse(result.applied)
+        self.assertEqual([(position, message) for position, _, _, message in result.errors],
+                         [(1, "Not enough units in stock."), (2, "Product with ID 3 not found."),
+                          (3, "Quantity must be different from 0."), (4, "Quantity must be an integer.")])
+        self.assertEqual(self.quantities(), [10, 10])
+        self.assertEqual(len(self.inventory.search_product(1).quantity_history), 1)
+        self.assertEqual(str(result), "Batch of 5 movements rejected: 4 invalid movements.")
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,54 @@
+import unittest
+from array import array
+from datetime import date
+from inventory import Inventory
+from pricing import apply_prices, discount_factor, scale_prices
+from product import Product
+
+
+class PricingTest(unittest.TestCase):
+
+    def setUp(self):
+        self.inventory = Inventory()
+        self.inventory.add_products([Product(1, "a", 10.0, 1, "Bebidas", date(2024, 1, 1)),
+                                     Product(2, "b", 20.0, 1, "Bebidas", date(2024, 1, 1)),
+                                     Product(3, "c", 40.0, 1, "Snacks", date(2024, 1, 1))])
+        self.inventory._dirty_ids.clear()
+
+    def prices(self):
+        return [self.inventory.search_product(id).price for id in (1, 2, 3)]
+
+    def test_scale_prices(self):
+        scaled = scale_prices(array("d", [10.0, 2.5]), discount_factor(20))
+        self.assertEqual((scaled.typecode, list(scaled)), ("d", [8.0, 2.0]))
+        self.assertEqual(len(scale_prices(array("d"), 0.5)), 0)
+
+    def test_invalid_percentage_touches_no_price(self):
+        for pct in (-1, 100, 101):
+            with self.assertRaises(ValueError):
+                self.inventory.apply_bulk_discount(pct)
+        self.assertEqual(self.prices(), [10.0, 20.0, 40.0])
+
+    def test_apply_prices_writes_changed_prices_and_totals(self):
+        products = [self.inventory.search_product(id) for id in (1, 2)]
+        summary = apply_prices(products, array("d", [5.0, 20.0]), "discount", 50.0)
+        self.assertEqual(self.prices(), [5.0, 20.0, 40.0])
+        self.assertEqual(list(self.inventory._dirty_ids), [1])  # The unchanged price is not recorded
+        self.assertEqual((summary.updated, summary.old_total, summary.new_total), (2, 30.0, 25.0))
+
+    def test_bulk_discount_summaries(self):
+        summary = self.inventory.apply_bulk_discount(50, category="Bebidas")
+        self.assertEqual((summary.operation, summary.updated, summary.old_total, summary.new_total),
+                         ("discount", 2, 30.0, 15.0))
+        self.assertEqual(self.prices(), [5.0, 10.0, 40.0])
+        summary = self.inventory.apply_bulk_discount(50, category="Bebidas", incremental=True)
+        self.assertEqual((summary.old_total, summary.new_total), (15.0, 7.5))
+        summary = self.inventory.reset_prices()
+        self.assertEqual((summary.operation, summary.updated, summary.old_total, summary.new_total),
+                         ("reset", 3, 47.5, 70.0))
+        self.assertEqual(self.prices(), [10.0, 20.0, 40.0])
+        self.assertIn("Sum of prices: $47.50 -> $70.00", str(summary))
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,53 @@
+import unittest
+from datetime import date
+from inventory import Inventory
+from product import Product
+
+
+class QueryIndexesTest(unittest.TestCase):
+
+    def setUp(self):
+        self.inventory = Inventory()
+        for id in range(20):
+            self.inventory.add_product(Product(id, f"p{id}", 1.0 + id, id, "Bebidas", date(2024, 1, 1)))
+
+    def ids(self, order_by: str):
+        return [row.id for row in self.inventory.query(order_by=order_by, limit=100).rows]
+
+    def test_change_after_the_index_was_built_with_the_new_value(self):
+        # A query builds the index between the field being set and the index being told
+        product = self.inventory.search_product(3)
+        product._quantity = 50
+        self.assertEqual(self.ids("quantity")[-1], 3)
+        self.inventory.query_indexes.changed(product, "quantity", 3)
+        self.assertEqual(sorted(self.ids("quantity")), list(range(20)))
+
+    def test_add_after_the_index_was_built_with_the_product(self):
+        product = Product(99, "p99", 5.0, 0, "Bebidas", date(2024, 1, 1))
+        self.inventory._products[99] = product  # Stored, not indexed yet
+        self.assertIn(99, self.ids("price"))
+        self.inventory.query_indexes.add(product)
+        self.assertEqual(self.ids("price").count(99), 1)
+
+    def test_changes_keep_the_order(self):
+        self.assertEqual(self.ids("quantity"), list(range(20)))
+        self.inventory.search_product(0).register_entry(100)
+        self.inventory.search_product(19).register_exit(19)
+        self.assertEqual(self.ids("quantity"), [19] + list(range(1, 19)) + [0])
+
+    def test_range_on_the_sort_field(self):
+        page = self.inventory.query(order_by="quantity", descending=True, limit=3, quantity=(5, 12), price=(None, 12.0))
+        self.assertEqual([row.id for row in page], [11, 10, 9])
+        page = self.inventory.query(order_by="quantity", descending=True, limit=3, after=page.next_cursor,
+                                    quantity=(5, 12), price=(None, 12.0))
+        self.assertEqual([row.id for row in page], [8, 7, 6])
+
+    def test_date_range_on_the_sort_field_leaves_out_products_without_a_date(self):
+        self.inventory.add_product(Product(50, "p50", 1.0, 1, "Bebidas", None))
+        self.inventory.search_product(3).entry_date = date(2023, 6, 1)
+        page = self.inventory.query(order_by="entry_date", limit=100, entry_date=(None, date(2023, 12, 31)))
+        self.assertEqual([row.id for row in page], [3])
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,43 @@
+import unittest
+from datetime import date
+from schema import IMPORT_SCHEMA, PRODUCT_SCHEMA, Field, Schema
+
+
+class SchemaBatchTest(unittest.TestCase):
+
+    def test_batch_with_rejected_rows(self):
+        rows = [["1", "a", "2.5", "3", "c", "2024-01-01", "", "2.5"],
+                ["x", "b", "-1", "3", "c", "", "", "1.0"],       # bad id and price: two errors, one reject
+                ["3", "c", "1.0", "4", "", "garbage", "later", "1.0"],  # dates fall back, kept
+                ["4", "d", "1.0", "", "c", "", "", "0"]]         # empty quantity, bad base price
+        report = PRODUCT_SCHEMA.validate_batch(rows)
+        self.assertEqual((report.rejected, report.positions), (2, [0, 2]))
+        self.assertEqual(report.records[0], (1, "a", 2.5, 3, "c", date(2024, 1, 1), None, 2.5))
+        self.assertEqual(report.records[1][5:7], (date.today(), None))
+        self.assertEqual([(position, name) for position, name, _ in report.errors],
+                         [(1, "id"), (1, "price"), (3, "quantity"), (3, "base_price")])
+        self.assertEqual(report.row_errors()[1], "Invalid input for id: invalid literal for int() with base 10: 'x'; "
+                                                 "Price must be greater than 0.")
+        self.assertFalse(report.ok)
+        self.assertEqual(str(report), "2 rows valid, 2 rows rejected.")
+
+    def test_columns_short_rows_and_dict_rows(self):
+        columns = {"id": 2, "name": 0, "price": 1, "quantity": 3, "category": 4}
+        report = IMPORT_SCHEMA.validate_batch([["a", "1.0", "1", "5", "c"], ["b", "1.0", "2", "-5"]], columns)
+        self.assertEqual(report.positions, [0])
+        self.assertEqual(report.records[0][:5], (1, "a", 1.0, 5, "c"))
+        self.assertEqual(report.records[0][5], date.today())
+        self.assertEqual([name for _, name, _ in report.errors], ["quantity", "category"])
+        record, errors = IMPORT_SCHEMA.validate_row({"id": "7", "name": "n", "price": "2", "quantity": "0", "category": "c"})
+        self.assertEqual((record[0], record[3], errors), (7, 0, []))
+
+    def test_clean_batch_takes_the_fast_path(self):
+        schema = Schema({"n": int, "when": Field(date, required=False), "text": Field(str, required=False, default="-")})
+        report = schema.validate_batch([[str(i), "2024-02-03" if i % 2 else "", ""] for i in range(1000)])
+        self.assertTrue(report.ok)
+        self.assertEqual(report.records[1], (1, date(2024, 2, 3), "-"))
+        self.assertEqual(report.records[2][1], None)
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,49 @@
+import unittest
+from datetime import date
+from inventory import Inventory
+from product import Product
+
+PRODUCTS = [
+    (1, "Leche entera", "Lácteos"),
+    (2, "Lechuga", "Verduras"),
+    (3, "Chocolate con leche", "Dulces"),
+    (4, "Queso fresco", "Leche y derivados"),
+    (5, "Café molido", "Bebidas"),
+    (6, "Cafetera italiana", "Hogar"),
+    (7, "Galletas de chocolate", "Dulces"),
+]
+
+
+class SearchRankingTest(unittest.TestCase):
+
+    def setUp(self):
+        self.inventory = Inventory()
+        for id, name, category in PRODUCTS:
+            self.inventory.add_product(Product(id, name, 1.0, 1, category, date(2024, 1, 1)))
+
+    def ids(self, query: str, limit: int = 50):
+        return [product.id for product in self.inventory.search_text(query, limit)]
+
+    def test_exact_word_in_the_name_ranks_first(self):
+        # Name matches weigh double than category matches; ties go to the shorter name
+        self.assertEqual(self.ids("leche"), [1, 3, 4])
+
+    def test_prefix_and_accents(self):
+        self.assertEqual(self.ids("lech"), [2, 1, 3, 4])
+        self.assertEqual(self.ids("cafe"), [5, 6])  # The exact word "café" before the prefix of "cafetera"
+
+    def test_typos(self):
+        self.assertEqual(self.ids("lehce"), [1, 3, 4])     # Two letters swapped
+        self.assertEqual(self.ids("chocolte"), [3, 7])     # A letter missing
+        self.assertEqual(self.ids("galetas chocolate"), [7])
+        self.assertEqual(self.ids("leche xyz"), [])        # Every term must match
+
+    def test_index_follows_the_inventory(self):
+        self.assertEqual(self.ids("leche"), [1, 3, 4])
+        self.inventory.remove_product(1)
+        self.inventory.add_product(Product(8, "Leche", 1.0, 1, "Lácteos", date(2024, 1, 1)))
+        self.assertEqual(self.ids("leche", limit=2), [8, 3])
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,87 @@
+import asyncio
+import json
+import unittest
+from unittest import mock
+from datetime import date
+from inventory import Inventory
+from product import Product
+from server import InventoryServer
+
+
+class ServerMovementsTest(unittest.TestCase):
+
+    def setUp(self):
+        self.inventory = Inventory()
+        self.inventory.add_product(Product(1, "a", 1.0, 10, "Bebidas", date(2024, 1, 1)))
+
+    def run_requests(self, requests):
+        ''' Sends every request pipelined on one connection, returns the responses by id '''
+        async def session():
+            server = await InventoryServer(self.inventory, port=0).start()
+            try:
+                reader, writer = await asyncio.open_connection("127.0.0.1", server.port)
+                writer.write(b"".join((json.dumps(request) + "\n").encode() for request in requests))
+                await writer.drain()
+                responses = [json.loads(await asyncio.wait_for(reader.readline(), 5)) for _ in requests]
+                writer.close()
+                return {response["id"]: response for response in responses}
+            finally:
+                await server.close()
+        return asyncio.run(session())
+
+    def test_each_request_gets_its_own_quantity(self):
+        responses = self.run_requests([
+            {"id": 1, "op": "register_entry", "product_id": 1, "quantity": 5},
+            {"id": 2, "op": "register_exit", "product_id": 1, "quantity": 3},
+            {"id": 3, "op": "register_entry", "product_id": 1, "quantity": 1},
+        ])
+        self.assertEqual([responses[i]["result"]["quantity"] for i in (1, 2, 3)], [15, 12, 13])
+        self.assertEqual(self.inventory.search_product(1).quantity, 13)
+
+    def test_a_failed_group_answers_every_request(self):
+        apply = self.inventory.apply_movements
+        calls = []
+
+        def failing(batch):  # The first group fails as if the log could not be written
+            calls.append(batch)
+            if len(calls) == 1:
+                raise OSError("disk full")
+            return apply(batch)
+
+        with mock.patch.object(self.inventory, "apply_movements", failing):
+            responses = self.run_requests([
+                {"id": 1, "op": "register_entry", "product_id": 1, "quantity": 5},
+                {"id": 2, "op": "register_entry", "product_id": 1, "quantity": 5},
+            ])
+            self.assertTrue(all(not response["ok"] and "disk full" in response["error"] for response in responses.values()))
+            # The writer task is still running
+            responses = self.run_requests([{"id": 3, "op": "register_exit", "product_id": 1, "quantity": 4}])
+        self.assertEqual(responses[3], {"id": 3, "ok": True, "result": {"quantity": 6}})
+
+    def test_unknown_product_is_rejected_alone(self):
+        responses = self.run_requests([
+            {"id": 1, "op": "register_entry", "product_id": 1, "quantity": 2},
+            {"id": 2, "op": "register_entry", "product_id": 99, "quantity": 2},
+        ])
+        self.assertEqual(responses[1]["result"], {"quantity": 12})
+        self.assertFalse(responses[2]["ok"])
+
+    def test_add_validates_the_product(self):
+        product = {"id": 2, "name": "b", "price": 2.5, "quantity": 4, "category": "Snacks", "entry_date": "2024-03-01"}
+        responses = self.run_requests([
+            {"id": 1, "op": "add", "product": {**product, "quantity": -4}},
+            {"id": 2, "op": "add", "product": {**product, "price": -1, "entry_date": "soon"}},
+            {"id": 3, "op": "add", "product": {**product, "category": None}},
+            {"id": 4, "op": "add", "product": product},
+        ])
+        self.assertEqual(responses[1]["error"], "Quantity cannot be negative.")
+        self.assertIn("Price must be greater than 0.", responses[2]["error"])
+        self.assertIn("Invalid input for entry_date", responses[2]["error"])
+        self.assertEqual(responses[3]["error"], "Input for category cannot be empty.")
+        self.assertTrue(responses[4]["ok"])
+        added = self.inventory.search_product(2)
+        self.assertEqual((added.price, added.base_price, added.quantity, added.entry_date), (2.5, 2.5, 4, date(2024, 3, 1)))
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,50 @@
+import threading
+import unittest
+from datetime import date
+from product import Product
+from sharding import ShardedInventory, _check_movements
+
+
+class RacingInventory(ShardedInventory):
+    ''' Starts a register_exit from another thread right after a batch has been checked '''
+
+    def __init__(self, shards: int):
+        super().__init__(shards)
+        self.racer = None
+
+    def _submit(self, shard: int, func, *args):
+        future = super()._submit(shard, func, *args)
+        if func is _check_movements and self.racer is not None:
+            future.result()
+            racer, self.racer = self.racer, None
+            racer.start()
+            racer.join(0.5)  # Long enough for the exit to land if nothing stops it
+        return future
+
+
+class ShardedMovementsTest(unittest.TestCase):
+
+    def setUp(self):
+        self.inventory = RacingInventory(shards=2)
+        self.first, self.second = 2, 1  # One product on each shard
+        self.assertNotEqual(self.inventory.shard_of(self.first), self.inventory.shard_of(self.second))
+        for id in (self.first, self.second):
+            self.inventory.add_product(Product(id, f"p{id}", 1.0, 10, "Bebidas", date(2024, 1, 1)))
+
+    def tearDown(self):
+        self.inventory.close()
+
+    def test_single_exit_cannot_land_between_check_and_apply(self):
+        exits = []
+        racer = threading.Thread(target=lambda: exits.append(self.inventory.register_exit(self.first, 10)))
+        self.inventory.racer = racer
+        result = self.inventory.apply_movements([(self.first, -10), (self.second, -5)])
+        racer.join()
+        self.assertTrue(result.applied)
+        self.assertEqual(exits, [False])  # The exit waited for the batch, then found no stock
+        self.assertEqual(self.inventory.search_product(self.first).quantity, 0)
+        self.assertEqual(self.inventory.search_product(self.second).quantity, 5)
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,131 @@
+import os
+import tempfile
+import unittest
+from datetime import date
+from inventory import Inventory
+from product import Product
+from query import product_row
+from snapshot import Snapshot, SnapshotStorage, write_snapshot
+from storage import SqliteStorage
+from tasks import TaskCancelled
+
+
+class LazyStorageTest(unittest.TestCase):
+
+    def setUp(self):
+        self.folder = tempfile.TemporaryDirectory()
+        self.full = Inventory()
+        for id in range(30):
+            self.full.add_product(Product(id, f"p{id}", 2.0, id, "Bebidas" if id % 3 else "Snacks", date(2024, 1, 1)))
+
+    def tearDown(self):
+        self.folder.cleanup()
+
+    def open_lazily(self, storage):
+        storage.save(self.full)
+        storage.close()
+        storage = type(storage)(storage.path)
+        self.addCleanup(storage.close)
+        inventory = Inventory()
+        inventory.open_storage(storage, lazy=True)
+        inventory.search_product(1)  # One product of the category already read
+        return inventory
+
+    def check_categories(self, inventory):
+        self.assertEqual(sorted(p.id for p in inventory.search_by_category("Snacks")), list(range(0, 30, 3)))
+        summary = inventory.apply_bulk_discount(10, category="Bebidas")
+        self.assertEqual(summary.updated, 20)
+        inventory.remove_product(4)
+        self.assertNotIn(4, [p.id for p in inventory.search_by_category("Bebidas")])
+
+    def check_whole_catalog_refused(self, inventory):
+        for operation in (lambda: inventory.products, inventory.stock_summary, inventory.category_summary,
+                          lambda: inventory.query(order_by="price"), lambda: list(inventory.iter_rows()),
+                          lambda: inventory.apply_bulk_discount(10), lambda: inventory.search_by_name_prefix("p")):
+            with self.assertRaises(ValueError):
+                operation()
+
+    def test_sqlite_categories_use_the_storage_index(self):
+        inventory = self.open_lazily(SqliteStorage(os.path.join(self.folder.name, "inventory.db")))
+        self.check_categories(inventory)
+        self.check_whole_catalog_refused(inventory)
+
+    def test_snapshot_categories_use_the_category_column(self):
+        inventory = self.open_lazily(SnapshotStorage(os.path.join(self.folder.name, "inventory.snap")))
+        self.check_categories(inventory)
+        self.check_whole_catalog_refused(inventory)
+
+    def check_cancelled_load(self, storage):
+        storage.save(self.full)
+        inventory = Inventory()
+        inventory.add_product(Product(99, "kept", 1.0, 1, "Otros", date(2024, 1, 1)))
+
+        def progress(done, read, total):
+            if done >= 10:
+                raise TaskCancelled()
+        with self.assertRaises(TaskCancelled):
+            storage.load(inventory, chunk_size=5, progress=progress)
+        self.assertEqual([product.id for product in inventory.products], [99])
+        self.assertEqual([product.id for product in inventory.search_by_category("Otros")], [99])
+        self.assertEqual(list(inventory._dirty_ids), [99])
+        self.assertEqual(storage.load(inventory).loaded, 30)
+
+    def test_sqlite_cancelled_load_keeps_the_inventory(self):
+        storage = SqliteStorage(os.path.join(self.folder.name, "inventory.db"))
+        self.addCleanup(storage.close)
+        self.check_cancelled_load(storage)
+
+    def test_snapshot_cancelled_load_keeps_the_inventory(self):
+        storage = SnapshotStorage(os.path.join(self.folder.name, "inventory.snap"))
+        self.addCleanup(storage.close)
+        self.check_cancelled_load(storage)
+
+
+class SnapshotRoundTripTest(unittest.TestCase):
+
+    def setUp(self):
+        self.folder = tempfile.TemporaryDirectory()
+        self.path = os.path.join(self.folder.name, "inventory.snap")
+        self.products = [Product(5, "Café ñandú", 3.25, 7, "Bebidas", date(2024, 1, 1), date(2024, 5, 2), 4.0),
+                         Product(2, "", 1.5, 0, "", None),
+                         Product(9, "Galletas", 2.0, 12, "Snacks", date(2023, 12, 31))]
+        self.products[0].register_entry(3)
+        self.products[0].register_exit(2)
+
+    def tearDown(self):
+        self.folder.cleanup()
+
+    def test_write_then_read_through_the_mapping(self):
+        self.assertEqual(write_snapshot(self.path, self.products), 3)
+        snapshot = Snapshot(self.path)
+        self.addCleanup(snapshot.close)
+        self.assertEqual(len(snapshot), 3)
+        for product in self.products:
+            read = snapshot.get(product.id)
+            self.assertEqual(product_row(read), product_row(product))
+            self.assertEqual(list(read.quantity_history.raw_entries()), list(product.quantity_history.raw_entries()))
+        self.assertIsNone(snapshot.get(3))
+        self.assertEqual(sorted(snapshot.ids_by_category("Bebidas")), [5])
+
+    def test_lazy_search_reads_products_on_demand(self):
+        write_snapshot(self.path, self.products)
+        storage = SnapshotStorage(self.path)
+        self.addCleanup(storage.close)
+        inventory = Inventory()
+        inventory.open_storage(storage, lazy=True)
+        self.assertEqual(len(inventory._products), 0)
+        self.assertEqual(product_row(inventory.search_product(5)), product_row(self.products[0]))
+        self.assertEqual(list(inventory._products), [5])  # Only the product searched was read
+        self.assertIsNone(inventory.search_product(3))
+        # Changes are merged into the next snapshot, unchanged products are copied from the old one
+        inventory.search_product(5).register_exit(1)
+        inventory.remove_product(2)
+        self.assertEqual(inventory.save_storage(), 2)
+        reopened = Inventory()
+        reopened.open_storage(SnapshotStorage(self.path))
+        self.addCleanup(reopened.storage.close)
+        self.assertEqual(sorted((p.id, p.quantity) for p in reopened.products), [(5, 7), (9, 12)])
+
+
+if __name__ == "__main__":
+    unittest.main()
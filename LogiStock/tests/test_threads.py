@@ -0,0 +1,13 @@
+import unittest
+from benchmarks import stress_threads
+
+
+class StressThreadsTest(unittest.TestCase):
+
+    def test_totals_are_conserved(self):
+        # Scaled down from the default 16 threads x 5000 operations of the benchmark
+        self.assertTrue(stress_threads.main(threads=8, operations=500))
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,128 @@
+import os
+import tempfile
+import unittest
+from datetime import date
+from csv_writer import write_csv_atomic
+from inventory import Inventory
+from product import Product
+from snapshot import write_snapshot
+from storage import SqliteStorage
+from tasks import TaskCancelled
+from wal import read_log
+
+
+def state(inventory):
+    return sorted((p.id, p.name, p.price, p.quantity, p.category, p.entry_date, p.base_price) for p in inventory.products)
+
+
+def product(id: int, quantity: int = 10):
+    return Product(id, f"p{id}", 2.0, quantity, "Bebidas", date(2024, 1, 1))
+
+
+class WriteAheadLogTest(unittest.TestCase):
+
+    def setUp(self):
+        self.folder = tempfile.TemporaryDirectory()
+        self.path = os.path.join(self.folder.name, "inventory.wal")
+        self.inventory = Inventory()
+        self.inventory.open_log(self.path, synchronous=True)
+
+    def tearDown(self):
+        self.inventory.close_log()
+        self.folder.cleanup()
+
+    def reopen(self):
+        self.inventory.close_log()
+        recovered = Inventory()
+        recovered.open_log(self.path)
+        recovered.close_log()
+        return recovered
+
+    def test_torn_last_line_is_cut_off(self):
+        for id in (1, 2):
+            self.inventory.add_product(product(id))
+        self.inventory.search_product(1).register_exit(4)
+        expected = state(self.inventory)
+        self.inventory.close_log()
+        with open(self.path, "ab") as file:
+            file.write(b'{"lsn":99,"op":"set","id":1,"fie')  # Crash in the middle of a write
+
+        self.inventory = Inventory()
+        self.assertEqual(self.inventory.open_log(self.path, synchronous=True), 3)
+        self.assertEqual(state(self.inventory), expected)
+        self.inventory.search_product(2).register_entry(1)  # Appended after the cut, readable again
+        records, valid = read_log(self.path)
+        self.assertEqual(valid, os.path.getsize(self.path))
+        self.assertEqual(records[-1]["value"], 11)
+
+    def test_records_replay_over_a_newer_checkpoint(self):
+        # A fuzzy checkpoint: changes made while it is written are in the checkpoint and in the log
+        for id in (1, 2):
+            self.inventory.add_product(product(id))
+
+        def products():
+            yield self.inventory.search_product(1)
+            self.inventory.search_product(2).register_exit(3)
+            self.inventory.add_product(product(3))
+            yield self.inventory.search_product(2)
+
+        self.inventory.wal.checkpoint(products())
+        expected = state(self.inventory)
+        self.assertEqual(state(self.reopen()), expected)
+
+    def test_crash_between_snapshot_and_log_rewrite(self):
+        for id in (1, 2, 3):
+            self.inventory.add_product(product(id))
+        self.inventory.remove_product(1)
+        self.inventory.add_product(product(1, 7))
+        self.inventory.search_product(2).register_exit(5)
+        self.inventory.remove_product(3)
+        expected = state(self.inventory)
+        # The checkpoint is written but the log still holds every record since the previous one
+        write_snapshot(self.inventory.wal.checkpoint_path, list(self.inventory.products))
+        self.assertEqual(state(self.reopen()), expected)
+
+    def test_checkpoint_keeps_the_quantity_history(self):
+        self.inventory.add_product(product(1))
+        for units in range(1, 6):
+            self.inventory.search_product(1).register_entry(units)
+        history = list(self.inventory.search_product(1).quantity_history)
+        self.assertEqual(len(history), 6)
+        self.inventory.checkpoint_log()
+        recovered = self.reopen()
+        self.assertEqual(list(recovered.search_product(1).quantity_history), history)
+
+    def test_lazy_storage_closes_the_log(self):
+        self.inventory.add_product(product(1))
+        storage = SqliteStorage(os.path.join(self.folder.name, "inventory.db"))
+        storage.save(self.inventory)
+        events = []
+        self.inventory.subscribe(lambda event, product: events.append(event))
+        self.inventory.open_storage(storage, lazy=True)
+        self.assertIn("reset", events)
+        self.assertIsNone(self.inventory.wal)
+        self.assertEqual(self.inventory.search_product(1).quantity, 10)
+        storage.close()
+
+    def test_cancelled_load_restores_the_inventory(self):
+        for id in (1, 2):
+            self.inventory.add_product(product(id))
+        self.inventory.search_product(1).register_exit(4)
+        expected = state(self.inventory)
+        csv_path = os.path.join(self.folder.name, "other.csv")
+        write_csv_atomic(csv_path, [product(id) for id in range(100, 200)])
+
+        def progress(rows, done, total):
+            if rows >= 10:
+                raise TaskCancelled()
+
+        with self.assertRaises(TaskCancelled):
+            self.inventory.load_csv_stream(csv_path, chunk_size=10, progress=progress)
+        self.assertEqual(state(self.inventory), expected)
+        self.assertFalse(os.path.exists(self.inventory.wal.checkpoint_path))  # Nothing was checkpointed
+        self.assertEqual(self.inventory.search_product(1).quantity_history[-1][1], 6)  # Same product objects, with their history
+        self.assertEqual(state(self.reopen()), expected)
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -1,19 +1,25 @@
 from tkinter import messagebox
+from schema import Schema
+
+# Called with (function name, input name, message) when an input is rejected; see instrumentation.py
+failure_listeners = []
+
+def _reject(func, key, message):
+    for listener in failure_listeners:
+        listener(func.__name__, key, message)
+    messagebox.showerror("Error", message)
 
 def validate_inputs(expected_inputs):
+    # Compiled once per decorated method, not on every click
+    schema = Schema(expected_inputs)
     def decorator(func):
         def wrapper(self, *args, **kwargs):
-            validated_data = {}
-            for key, value in expected_inputs.items():
-                entry_value = getattr(self, key).get().strip()
-                if not entry_value:
-                    messagebox.showerror("Error", f"Input for {key} cannot be empty.")
-                    return
-                try:
-                    validated_data[key] = value(entry_value)
-                except ValueError as e:
-                    messagebox.showerror("Error", f"Invalid input for {key}: {e}")
-                    return
-            return func(self, **validated_data)
+            values = [getattr(self, key).get().strip() for key in schema.names]
+            record, errors = schema.validate_row(values)
+            if errors:
+                key, message = errors[0]
+                _reject(func, key, message)
+                return
+            return func(self, **dict(zip(schema.names, record)))
         return wrapper
-    return decorator
\ No newline at end of file
+    return decorator
@@ -0,0 +1,396 @@
+import json
+import os
+import sys
+import threading
+import time
+import zlib
+from contextlib import contextmanager
+from datetime import date, datetime
+from csv_loader import DEFAULT_CHUNK_SIZE, LoadResult, iter_product_chunks
+from csv_writer import product_to_row, write_csv_atomic
+from notifier import notifier
+from product import Product
+from snapshot import SNAPSHOT_EXTENSIONS, Snapshot, write_snapshot
+
+FLUSH_INTERVAL = 0.01          # Seconds the flusher waits to gather a group of records before each fsync
+CHECKPOINT_RECORDS = 100000    # Records after which a checkpoint is due, this bounds the replay on startup
+CHECKPOINT_INTERVAL = 300      # Seconds after which a checkpoint is due if anything was logged
+ARCHIVE_SUFFIX = ".archive"
+SNAPSHOT_SUFFIX = ".snap"
+
+# Product fields a "set" record can change; dates are stored as iso strings
+_DATE_FIELDS = ("entry_date", "exit_date")
+
+
+def _encode(record: dict):
+    ''' One line per record: the json text, a tab and its crc32, so a torn last line is detected '''
+    text = json.dumps(record, ensure_ascii=False, separators=(",", ":"))
+    return f"{text}\t{zlib.crc32(text.encode('utf-8')):08x}\n"
+
+
+def _decode(line: str):
+    ''' The record of a line, or None if the line is incomplete or corrupt '''
+    text, tab, crc = line.rstrip("\n").rpartition("\t")
+    if not tab or len(crc) != 8 or not line.endswith("\n"):
+        return None
+    try:
+        if int(crc, 16) != zlib.crc32(text.encode("utf-8")):
+            return None
+        return json.loads(text)
+    except ValueError:
+        return None
+
+
+def read_log(path: str):
+    '''
+    Returns (records, valid_bytes): the records of the log at path up to the first line that is
+    incomplete or fails its checksum (what a crash in the middle of a write leaves), and the length
+    of the valid part of the file.
+    '''
+    records, valid = [], 0
+    if not os.path.exists(path):
+        return records, valid
+    with open(path, "rb") as file:
+        for raw in file:
+            record = _decode(raw.decode("utf-8", errors="replace"))
+            if record is None:
+                break
+            records.append(record)
+            valid += len(raw)
+    return records, valid
+
+
+def iter_audit(path: str, product_id: int = None):
+    '''
+    Every record ever logged, oldest first: the archive of compacted records and then the live log.
+    With product_id only the changes of that product are yielded (batches are expanded).
+    '''
+    for source in (path + ARCHIVE_SUFFIX, path):
+        for record in read_log(source)[0]:
+            if record["op"] == "checkpoint":
+                continue
+            if record["op"] != "batch":
+                if product_id is None or record["id"] == product_id:
+                    yield record
+                continue
+            for change in record["changes"]:
+                if product_id is None or change["id"] == product_id:
+                    yield dict(change, lsn=record["lsn"], ts=record["ts"])
+
+
+def _value(product, field: str):
+    value = getattr(product, "_" + field)
+    return value.isoformat() if field in _DATE_FIELDS and value is not None else value
+
+
+def _product_from_row(row: list):
+    id, name, price, base_price, quantity, category, entry_date, exit_date = row
+    return Product(id, name, price, quantity, category, date.fromisoformat(entry_date) if entry_date else None,
+                   date.fromisoformat(exit_date) if exit_date else None, base_price)
+
+
+class WriteAheadLog:
+    """
+    Append-only log of every change of an Inventory, so a crash only loses the last moments of work.
+
+    Records are json lines with a sequence number (lsn), a timestamp and a checksum. append() only
+    queues the record; a flusher thread writes everything queued in one write and one fsync (group
+    commit), at most flush_interval after the first record of the group. In synchronous mode append()
+    waits until its record is on disk, and concurrent writers still share the same fsync.
+    The changes made inside batch() are logged as a single record, so a batch is replayed whole or not
+    at all. Every record holds the new value of what changed (and the old one, for the audit trail),
+    so replaying a record twice leaves the same state.
+
+    A checkpoint writes the whole inventory to checkpoint_path (a snapshot, or a csv if the name ends
+    in .csv) and compacts the log to the records written since the checkpoint started. The compacted
+    records are appended to path + ".archive", which with the log is the full audit trail (iter_audit).
+    Recovery loads the checkpoint and replays the log, so its time is bounded by checkpoint_records.
+
+    Attributes:
+        path (str): The log file.
+        checkpoint_path (str): Where checkpoints are written, path + ".snap" by default.
+        lsn (int): Last sequence number handed out.
+        durable_lsn (int): Last sequence number written and synced to disk.
+        records (int): Records logged since the last checkpoint.
+
+    Methods:
+        recover(self) -> list:
+            Records to replay over the checkpoint, and opens the log for appending.
+        append(self, record: dict) -> int, log_change / log_add / log_remove:
+            Log a change, return its lsn (0 inside a batch).
+        batch(self):
+            Context manager, the changes made inside are logged as one record.
+        commit(self, timeout: float = None):
+            Waits until everything logged so far is on disk.
+        checkpoint(self, products) -> int:
+            Writes products to checkpoint_path and compacts the log.
+        close(self):
+            Flushes and stops the flusher.
+    """
+
+    def __init__(self, path: str, checkpoint_path: str = None, flush_interval: float = FLUSH_INTERVAL,
+                 synchronous: bool = False, checkpoint_records: int = CHECKPOINT_RECORDS,
+                 checkpoint_interval: float = CHECKPOINT_INTERVAL, archive: bool = True):
+        self.path = path
+        self.checkpoint_path = checkpoint_path or path + SNAPSHOT_SUFFIX
+        self.flush_interval = flush_interval
+        self.synchronous = synchronous
+        self.checkpoint_records = checkpoint_records
+        self.checkpoint_interval = checkpoint_interval
+        self.archive = archive
+        self.lsn = 0
+        self.durable_lsn = 0
+        self.checkpoint_lsn = 0
+        self.records = 0
+        self.error = None          # OSError of the last failed flush, raised by commit()
+        self._last_checkpoint = time.monotonic()
+        self._pending = []         # encoded lines not written yet
+        self._urgent = False       # a writer is waiting, flush without gathering
+        self._closed = False
+        self._file = None
+        self._thread = None
+        self._cond = threading.Condition()
+        self._io_lock = threading.Lock()  # The flusher and a checkpoint never write the file at the same time
+        self._local = threading.local()   # .changes of the batch open in each thread
+
+    def recover(self):
+        '''
+        Reads the log, cuts a torn last record off, starts the flusher and returns the records written
+        after the last checkpoint, in order. Must be called once, before anything is appended.
+        '''
+        records, valid = read_log(self.path)
+        if records and records[0]["op"] == "checkpoint":
+            self.checkpoint_lsn = records[0]["lsn"]
+            records = records[1:]
+        records = [record for record in records if record["lsn"] > self.checkpoint_lsn]
+        self.lsn = self.durable_lsn = records[-1]["lsn"] if records else self.checkpoint_lsn
+        self.records = len(records)
+
+        if not valid:
+            self._write_log(self.path, [_encode(self._checkpoint_record())])  # New log, or not even its header is readable
+        self._file = open(self.path, "r+b")
+        if valid:
+            self._file.truncate(valid)
+        self._file.seek(0, os.SEEK_END)
+        self._thread = threading.Thread(target=self._flusher, name="wal-flusher", daemon=True)
+        self._thread.start()
+        return records
+
+    def _checkpoint_record(self):
+        return {"lsn": self.checkpoint_lsn, "ts": datetime.now().isoformat(), "op": "checkpoint",
+                "base": os.path.basename(self.checkpoint_path)}
+
+    @staticmethod
+    def _write_log(path: str, lines):
+        tmp_path = path + ".tmp"
+        with open(tmp_path, "w", encoding="utf-8", newline="") as file:
+            file.writelines(lines)
+            file.flush()
+            os.fsync(file.fileno())
+        os.replace(tmp_path, path)
+
+    def append(self, record: dict):
+        changes = getattr(self._local, "changes", None)
+        if changes is not None:
+            changes.append(record)
+            return 0
+        with self._cond:
+            self.lsn += 1
+            lsn = record["lsn"] = self.lsn
+            record["ts"] = datetime.now().isoformat()
+            self._pending.append(_encode(record))
+            self.records += 1
+            if len(self._pending) == 1:
+                self._cond.notify_all()
+        if self.synchronous:
+            self.commit()
+        return lsn
+
+    def log_change(self, product, field: str, old):
+        if field in _DATE_FIELDS and old is not None:
+            old = old.isoformat()
+        return self.append({"op": "set", "id": product.id, "field": field, "value": _value(product, field), "old": old})
+
+    def log_add(self, product):
+        row = product_to_row(product)
+        row[2], row[3] = product._price, product._base_price  # Exact floats, not their csv text
+        return self.append({"op": "add", "id": product.id, "product": row})
+
+    def log_remove(self, id: int):
+        return self.append({"op": "remove", "id": id})
+
+    @contextmanager
+    def batch(self):
+        ''' The changes logged by this thread inside the block become one "batch" record '''
+        if getattr(self._local, "changes", None) is not None:
+            yield  # Nested batch, part of the outer one
+            return
+        self._local.changes = []
+        try:
+            yield
+        finally:
+            changes, self._local.changes = self._local.changes, None
+            if changes:
+                self.append({"op": "batch", "changes": changes})
+
+    def commit(self, timeout: float = None):
+        ''' Blocks until every record appended so far is on disk; raises the OSError of a failed flush '''
+        with self._cond:
+            target = self.lsn
+            self._urgent = True
+            self._cond.notify_all()
+            if not self._cond.wait_for(lambda: self.durable_lsn >= target or self.error or self._closed, timeout):
+                raise TimeoutError(f"Write-ahead log not synced after {timeout} s.")
+            if self.error is not None:
+                raise self.error
+
+    def _flusher(self):
+        while True:
+            with self._cond:
+                self._cond.wait_for(lambda: self._pending or self._closed)
+                if not self._pending and self._closed:
+                    return
+                if not self._urgent and not self._closed:
+                    # Gather the records of other writers into the same fsync
+                    self._cond.wait_for(lambda: self._urgent or self._closed, self.flush_interval)
+            self._flush()
+
+    def _flush(self):
+        with self._io_lock:
+            with self._cond:
+                lines, self._pending = self._pending, []
+                lsn = self.lsn
+                self._urgent = False
+            if lines:
+                try:
+                    self._file.write("".join(lines).encode("utf-8"))
+                    self._file.flush()
+                    os.fsync(self._file.fileno())
+                except OSError as e:
+                    notifier.error("Error", f"Write-ahead log {self.path} failed: {e}")
+                    with self._cond:
+                        self.error = e
+                        self._cond.notify_all()
+                    return
+        with self._cond:
+            self.durable_lsn = max(self.durable_lsn, lsn)
+            self._cond.notify_all()
+
+    @property
+    def checkpoint_due(self):
+        return self.records >= self.checkpoint_records or (
+            self.records > 0 and time.monotonic() - self._last_checkpoint >= self.checkpoint_interval)
+
+    def checkpoint(self, products):
+        '''
+        Writes products (read while this runs, the caller keeps products from being added or removed)
+        to checkpoint_path, then rewrites the log with only the records appended since the checkpoint
+        started. Changes made meanwhile may or may not be in the checkpoint; replaying their records
+        leaves the right values either way. Returns the number of products written.
+        '''
+        with self._cond:
+            start_lsn = self.lsn
+        if self.checkpoint_path.lower().endswith(".csv"):
+            rows = write_csv_atomic(self.checkpoint_path, products)
+        else:
+            rows = write_snapshot(self.checkpoint_path, products)
+
+        self._flush()  # Everything appended so far is in the file, read it back below
+        with self._io_lock:
+            records, _ = read_log(self.path)
+            kept, archived = [], []
+            for record in records:
+                if record["op"] == "checkpoint":
+                    continue
+                (kept if record["lsn"] > start_lsn else archived).append(record)
+            if self.archive and archived:
+                with open(self.path + ARCHIVE_SUFFIX, "a", encoding="utf-8", newline="") as file:
+                    file.writelines(_encode(record) for record in archived)
+                    file.flush()
+                    os.fsync(file.fileno())
+            with self._cond:
+                self.checkpoint_lsn = start_lsn
+                self.records = len(kept) + len(self._pending)
+            self._write_log(self.path, [_encode(self._checkpoint_record())] + [_encode(record) for record in kept])
+            self._file.close()
+            self._file = open(self.path, "r+b")
+            self._file.seek(0, os.SEEK_END)
+        self._last_checkpoint = time.monotonic()
+        return rows
+
+    def iter_checkpoint(self, result: LoadResult, chunk_size: int = DEFAULT_CHUNK_SIZE):
+        ''' Yields the products of the last checkpoint in chunks, nothing if there is none '''
+        if not os.path.exists(self.checkpoint_path):
+            return
+        if self.checkpoint_path.lower().endswith(SNAPSHOT_EXTENSIONS):
+            snapshot = Snapshot(self.checkpoint_path)
+            try:
+                for chunk in snapshot.iter_products(chunk_size):
+                    result.loaded += len(chunk)
+                    yield chunk
+            finally:
+                snapshot.close()
+        else:
+            yield from iter_product_chunks(self.checkpoint_path, result, chunk_size)
+
+    def close(self):
+        with self._cond:
+            if self._closed:
+                return
+            self._closed = True
+            self._cond.notify_all()
+        if self._thread is not None:
+            self._thread.join()
+        self._flush()
+        if self._file is not None:
+            self._file.close()
+            self._file = None
+
+
+def apply_record(inventory, record: dict, when: datetime = None):
+    '''
+    Replays a logged record on inventory. It must not have a log attached, so nothing is logged twice.
+    Records of products that are not there (removed after the change) are skipped.
+    '''
+    op = record["op"]
+    when = datetime.fromisoformat(record["ts"]) if "ts" in record else when
+    if op == "batch":
+        for change in record["changes"]:
+            apply_record(inventory, change, when)
+    elif op == "add":
+        product = _product_from_row(record["product"])
+        if product.id in inventory._products:
+            inventory._unindex_product(inventory._products[product.id])
+        inventory._index_product(product)
+        inventory._dirty_ids[product.id] = None
+        inventory._removed_ids.pop(product.id, None)
+    elif op == "remove":
+        product = inventory._products.get(record["id"])
+        if product is not None:
+            inventory._unindex_product(product)
+            inventory._dirty_ids.pop(product.id, None)
+            inventory._removed_ids[product.id] = None
+    elif op == "set":
+        product = inventory._products.get(record["id"])
+        if product is None:
+            return
+        field, value = record["field"], record["value"]
+        if field in _DATE_FIELDS and value is not None:
+            value = date.fromisoformat(value)
+        old = getattr(product, "_" + field)
+        setattr(product, "_" + field, value)
+        if field == "quantity":
+            product.quantity_history.record(value, when)
+        product._changed(field, old)
+
+
+if __name__ == "__main__":
+    # Audit trail: python wal.py inventory.wal [product id]
+    for change in iter_audit(sys.argv[1], int(sys.argv[2]) if len(sys.argv) > 2 else None):
+        if change["op"] == "set":
+            detail = f"{change['field']} {change['old']} -> {change['value']}"
+        elif change["op"] == "add":
+            detail = f"added {change['product'][1]} ({change['product'][4]} units)"
+        else:
+            detail = "removed"
+        print(f"{change['ts']}  #{change['lsn']:<8} product {change['id']}: {detail}")